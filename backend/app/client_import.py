@@ -0,0 +1,254 @@
+"""
+Importación masiva de clientes desde CSV o NDJSON.
+
+El fichero se lee fila a fila (sin cargarlo entero) y cada fila se valida con ClientCreate.
+Las filas válidas se agrupan en lotes de batch_size; por lote:
+  - los DNI repetidos dentro del fichero se detectan con un set en memoria,
+  - los que ya existen en la tabla se descartan con un único SELECT ... IN,
+  - el resto se inserta con un INSERT multi-fila en su propia transacción.
+Igual que POST /clientes/, un DNI que ya existe no es un error (se cuenta como existente).
+Si el fichero deja de poderse leer a mitad (CSV mal formado, bytes que no son UTF-8), se
+guardan las filas válidas anteriores y el informe indica en qué línea se paró (aborted_at).
+
+Uso:  python -m app.client_import clientes.csv [--format csv|ndjson] [--batch-size 1000]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models.client import Client
+from .schemas.client import ClientCreate
+from .utils.validation import validation_message
+
+IMPORT_BATCH_SIZE = 1000
+# errores que se devuelven detallados en el informe (el total se cuenta siempre)
+MAX_REPORTED_ERRORS = 1000
+IMPORT_FORMATS = ("csv", "ndjson")
+
+Row = Tuple[int, Dict]  # (número de línea en el fichero, campos)
+
+
+class MalformedFile(ValueError):
+    """El fichero no se puede seguir leyendo a partir de `line`."""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+
+
+class ImportReport:
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS):
+        self.total = 0
+        self.inserted = 0
+        self.existing = 0
+        self.error_count = 0
+        self.errors: List[Dict] = []
+        self.max_errors = max_errors
+        self.aborted_at: Optional[int] = None
+        self._start = time.perf_counter()
+        self.seconds = 0.0
+
+    def add_error(self, row: int, dni: Optional[str], error: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "dni": dni, "error": error})
+
+    def tick(self) -> None:
+        self.seconds = time.perf_counter() - self._start
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "inserted": self.inserted,
+            "existing": self.existing,
+            "error_count": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+            "aborted_at": self.aborted_at,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+# ---------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def iter_rows(stream: io.TextIOBase, fmt: str) -> Iterator[Row]:
+    """
+    Genera (línea, dict) desde un fichero de texto. Una línea NDJSON inválida se entrega como str;
+    si el fichero no se puede seguir leyendo lanza MalformedFile.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format {fmt!r} (expected one of {IMPORT_FORMATS})")
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        try:
+            for fields in reader:
+                yield reader.line_num, fields
+        except csv.Error as exc:
+            raise MalformedFile(reader.line_num + 1, f"CSV mal formado: {exc}") from exc
+        except UnicodeDecodeError as exc:
+            raise MalformedFile(reader.line_num + 1, f"El fichero no es UTF-8: {exc}") from exc
+        return
+    line_no = 0
+    try:
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as exc:
+                yield line_no, f"JSON inválido: {exc}"
+    except UnicodeDecodeError as exc:
+        raise MalformedFile(line_no + 1, f"El fichero no es UTF-8: {exc}") from exc
+
+
+def open_text(binary) -> io.TextIOWrapper:
+    """Envuelve un fichero binario (UploadFile.file, open(..., 'rb')) como texto UTF-8."""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+def _clean(fields: Dict) -> Dict:
+    # en CSV un campo opcional vacío llega como "": se trata como ausente
+    return {k: (v.strip() if isinstance(v, str) else v) for k, v in fields.items()
+            if k is not None and v not in ("", None)}
+
+
+# ---------------------------------------------------------------------
+# Importación
+# ---------------------------------------------------------------------
+def _existing_dnis(db: Session, dnis: Iterable[str]) -> set:
+    return set(db.execute(select(Client.dni).where(Client.dni.in_(list(dnis)))).scalars())
+
+
+def _flush(db: Session, batch: Dict[str, Tuple[int, Dict]], report: ImportReport) -> None:
+    """batch: DNI -> (línea, valores). Un lote = una transacción."""
+    if not batch:
+        return
+    for _ in range(2):  # segundo intento si otro proceso insertó alguno de los DNI entre medias
+        existing = _existing_dnis(db, batch)
+        rows = [values for dni, (_, values) in batch.items() if dni not in existing]
+        try:
+            if rows:
+                db.execute(insert(Client.__table__).values(rows))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            continue
+        report.existing += len(existing)
+        report.inserted += len(rows)
+        return
+    for dni, (line_no, _) in batch.items():
+        report.add_error(line_no, dni, "No se pudo insertar el lote (conflicto de DNI concurrente)")
+
+
+def import_clients(
+    db: Session,
+    rows: Iterable[Row],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Importa las filas en lotes; progress(report) se llama tras cada lote. Si la lectura falla
+    (MalformedFile) se guardan las filas válidas leídas hasta ahí y se anota report.aborted_at.
+    """
+    report = ImportReport()
+    seen: Dict[str, int] = {}  # DNI -> línea en la que apareció primero
+    batch: Dict[str, Tuple[int, Dict]] = {}
+
+    rows = iter(rows)
+    while True:
+        try:
+            line_no, fields = next(rows)
+        except StopIteration:
+            break
+        except MalformedFile as exc:
+            report.aborted_at = exc.line
+            report.add_error(exc.line, None, str(exc))
+            break
+        report.total += 1
+        if isinstance(fields, str):
+            report.add_error(line_no, None, fields)
+            continue
+        if not isinstance(fields, dict):
+            report.add_error(line_no, None, "La fila no es un objeto")
+            continue
+        try:
+            client = ClientCreate(**_clean(fields))
+        except ValidationError as exc:
+            report.add_error(line_no, fields.get("dni") or None, validation_message(exc))
+            continue
+        first = seen.get(client.dni)
+        if first is not None:
+            report.add_error(line_no, client.dni, f"DNI duplicado en el fichero (línea {first})")
+            continue
+        seen[client.dni] = line_no
+        batch[client.dni] = (line_no, client.model_dump())
+
+        if len(batch) >= batch_size:
+            _flush(db, batch, report)
+            batch = {}
+            report.tick()
+            if progress:
+                progress(report)
+
+    _flush(db, batch, report)
+    report.tick()
+    if progress:
+        progress(report)
+    return report
+
+
+def main(argv=None):
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Importa clientes desde CSV o NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    def progress(report: ImportReport):
+        print(f"\r{report.total} filas  {report.rows_per_second:,.0f} filas/s  "
+              f"insertadas={report.inserted} existentes={report.existing} errores={report.error_count}",
+              end="", file=sys.stderr, flush=True)
+
+    fmt = args.format or detect_format(args.path)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as f:
+            report = import_clients(db, iter_rows(open_text(f), fmt), args.batch_size, progress)
+    finally:
+        db.close()
+    print(file=sys.stderr)
+    for error in report.errors:
+        print(f"línea {error['row']}: {error['dni'] or '-'}: {error['error']}")
+    if report.error_count > len(report.errors):
+        print(f"... y {report.error_count - len(report.errors)} errores más")
+    if report.aborted_at is not None:
+        print(f"importación detenida en la línea {report.aborted_at}: las filas siguientes no se han leído")
+    return 1 if report.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,131 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import os
 
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+
+from .utils.cache import TTLCache
+
+# ---------------------------------------------------------------------
+# Configuración (variables de entorno)
+# ---------------------------------------------------------------------
 # URL para SQLite en desarrollo (archivo en la carpeta backend)
-DATABASE_URL = "sqlite:///./clinica.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./clinica.db")
+# Perfil del engine: "default" (sin ajustes), "sqlite" (producción SQLite) o "postgres".
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+
+# PRAGMAs del perfil "sqlite"; se aplican en cada conexión nueva.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL"),   # lectores no bloquean al escritor
+    "synchronous": os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL"),  # seguro con WAL, sin fsync por commit
+    "busy_timeout": int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("DB_SQLITE_CACHE_SIZE", "-65536")),  # negativo = KiB (64 MiB)
+    "mmap_size": int(os.getenv("DB_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": os.getenv("DB_SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Opciones de pool del perfil "postgres".
+POSTGRES_POOL = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "False"),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+}
+
+DB_PROFILES = ("default", "sqlite", "postgres")
+
+# URL del engine async; por defecto se deriva de DATABASE_URL (aiosqlite / asyncpg).
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# BDD para lecturas (réplica). Sin definir, las lecturas usan la principal.
+# Con SQLite puede ser la misma URL: se abre un pool aparte en modo query_only.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+# Segundos durante los que un cliente que acaba de escribir lee de la principal (0 = off).
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "0"))
+
+
+def _sqlite_pragmas(profile: str, read_only: bool) -> dict:
+    pragmas = dict(SQLITE_PRAGMAS) if profile == "sqlite" else {}
+    if read_only:
+        pragmas.pop("journal_mode", None)  # cambiarlo requiere escribir
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def _apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def build_engine(url: str = DATABASE_URL, profile: str = DB_PROFILE, read_only: bool = False, **engine_kwargs) -> Engine:
+    """
+    Crea el engine según el perfil:
+      - default: ajustes por defecto de SQLAlchemy (comportamiento original).
+      - sqlite: WAL, synchronous=NORMAL, busy_timeout, cache_size y mmap_size por conexión.
+      - postgres: pool_size / max_overflow / pre-ping / recycle configurables.
+    read_only: en SQLite abre las conexiones con PRAGMA query_only.
+    engine_kwargs se pasan tal cual a create_engine (tienen prioridad).
+    """
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r} (expected one of {DB_PROFILES})")
+    is_sqlite = make_url(url).get_backend_name() == "sqlite"
+
+    kwargs = {}
+    if is_sqlite:
+        # Para SQLite necesitamos connect_args
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if profile == "postgres":
+        kwargs.update(POSTGRES_POOL)
+    kwargs.update(engine_kwargs)
 
-# Para SQLite necesitamos connect_args
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    if profile == "sqlite" and not is_sqlite:
+        raise ValueError("DB_PROFILE 'sqlite' requires a sqlite:// DATABASE_URL")
+    engine = create_engine(url, **kwargs)
+    if is_sqlite and (profile == "sqlite" or read_only):
+        _apply_sqlite_pragmas(engine, _sqlite_pragmas(profile, read_only))
+    return engine
+
+
+def to_async_url(url: str) -> str:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db, postgresql://... -> postgresql+asyncpg://..."""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend!r}")
+    return u.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def build_async_engine(url: str = None, profile: str = DB_PROFILE, read_only: bool = False, **engine_kwargs):
+    """
+    Equivalente async de build_engine (mismos perfiles). Necesita aiosqlite o asyncpg,
+    que se importan al crear el engine, no al importar este módulo.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or ASYNC_DATABASE_URL or to_async_url(DATABASE_URL)
+    if profile not in DB_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r} (expected one of {DB_PROFILES})")
+    kwargs = {}
+    if profile == "postgres":
+        kwargs.update(POSTGRES_POOL)
+    kwargs.update(engine_kwargs)
+
+    async_engine = create_async_engine(url, **kwargs)
+    if make_url(url).get_backend_name() == "sqlite" and (profile == "sqlite" or read_only):
+        _apply_sqlite_pragmas(async_engine.sync_engine, _sqlite_pragmas(profile, read_only))
+    return async_engine
+
+
+engine = build_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,3 +139,117 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------------------------------------------------------------------
+# Capa async (AsyncSession) para los endpoints de lectura
+# ---------------------------------------------------------------------
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    """Engine async compartido, creado la primera vez que se usa."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_engine = build_async_engine()
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    """Dependency async: yield de un AsyncSession (análogo a get_db)."""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+
+# ---------------------------------------------------------------------
+# Sesiones de lectura (réplica) y de escritura
+# ---------------------------------------------------------------------
+ReadSessionLocal = None
+_AsyncReadSessionLocal = None
+_read_engines = []
+
+# clientes (por token o IP) que han hecho commit recientemente
+recent_writers = TTLCache(maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+
+def configure_read_replica(url: str = None, read_your_writes_seconds: float = READ_YOUR_WRITES_SECONDS):
+    """
+    (Re)configura las sesiones de lectura. url=None hace que las lecturas usen la BDD principal.
+    El engine async de la réplica se crea aquí solo si hay URL.
+    """
+    global ReadSessionLocal, _AsyncReadSessionLocal
+    for old in _read_engines:
+        (old.sync_engine if hasattr(old, "sync_engine") else old).dispose()
+    _read_engines.clear()
+    ReadSessionLocal = _AsyncReadSessionLocal = None
+    recent_writers.ttl = read_your_writes_seconds
+    recent_writers.maxsize = 10000 if read_your_writes_seconds > 0 else 0
+    recent_writers.clear()
+    if not url:
+        return
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    read_engine = build_engine(url, DB_PROFILE, read_only=True)
+    async_read_engine = build_async_engine(to_async_url(url), DB_PROFILE, read_only=True)
+    _read_engines.extend([read_engine, async_read_engine])
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    _AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+
+def _client_key(request: Request) -> str:
+    auth = request.headers.get("authorization")
+    if auth:
+        return auth
+    return request.client.host if request.client else "unknown"
+
+
+def _reads_from_primary(request: Request) -> bool:
+    return recent_writers.maxsize > 0 and recent_writers.get(_client_key(request)) is not None
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_recent_writer(session):
+    # se marca en el commit (no al cerrar la sesión) para que la siguiente lectura ya lo vea
+    key = session.info.get("writer_key")
+    if key is not None and recent_writers.maxsize > 0:
+        recent_writers.set(key, True)
+
+
+def get_write_db(request: Request, db: Session = Depends(get_db)):
+    """Sesión para mutaciones (BDD principal); registra al cliente para read-your-writes."""
+    db.info["writer_key"] = _client_key(request)
+    yield db
+
+
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    """
+    Sesión de solo lectura: réplica si está configurada, si no (o si el cliente acaba de
+    escribir y read-your-writes está activo) la principal. La sesión principal es perezosa:
+    si no se usa no abre conexión.
+    """
+    if ReadSessionLocal is None or _reads_from_primary(request):
+        yield primary
+        return
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request, primary=Depends(get_async_db)):
+    """Equivalente async de get_read_db."""
+    if _AsyncReadSessionLocal is None or _reads_from_primary(request):
+        yield primary
+        return
+    async with _AsyncReadSessionLocal() as db:
+        yield db
+
+
+configure_read_replica(READ_DATABASE_URL)
@@ -1,24 +1,52 @@
 from fastapi import FastAPI
-from .routers import clientes, mascotas, citas, facturacion, auth, informes  # importa routers aquí
-from .database import engine
+from fastapi.responses import PlainTextResponse
+from .routers import clientes, mascotas, citas, facturacion, auth, informes, export, veterinarios  # importa routers aquí
+from .database import SessionLocal, engine
+from .reminders import REMINDER_SINK_PATH, REMINDERS_IN_PROCESS, FileSink, ReminderScheduler
+from .utils.sqlstats import SQLStatsMiddleware
+from .utils import metrics
 # importa modelos para que se registren
-from .models import user, client, pet, appointment
+from .models import user, client, pet, appointment, veterinarian
 
 app = FastAPI(title="Clínica Veterinaria - Backend")
 
+# recordatorios de citas en un hilo del backend (REMINDERS_IN_PROCESS=1); si no, python -m app.reminders
+reminder_scheduler = ReminderScheduler(SessionLocal, FileSink(REMINDER_SINK_PATH))
+
+# nº de sentencias SQL y tiempo de BDD por petición (cabecera Server-Timing, aviso N+1)
+app.add_middleware(SQLStatsMiddleware)
+# métricas Prometheus (la más externa, para medir la petición completa)
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(clientes.router)
 app.include_router(mascotas.router)
 app.include_router(citas.router)
 app.include_router(facturacion.router)
 app.include_router(auth.router)
 app.include_router(informes.router)
+app.include_router(export.router)
+app.include_router(veterinarios.router)
 
 @app.on_event("startup")
 def on_startup():
-    from .database import Base
-    Base.metadata.create_all(bind=engine)
+    from .migrations import run_migrations
+    from .database import get_async_engine
+    run_migrations(engine)
+    metrics.instrument_pool(engine, "primary")
+    metrics.instrument_pool(get_async_engine().sync_engine, "async")
+    if REMINDERS_IN_PROCESS:
+        reminder_scheduler.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    from .utils.password_pool import password_pool
+    password_pool.shutdown()
+    reminder_scheduler.stop(timeout=5)
 
 @app.get("/")
 def root():
     return {"status": "ok", "service": "clinica-veterinaria backend"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
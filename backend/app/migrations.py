@@ -0,0 +1,280 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es una función que recibe una conexión y se registra con @migration(versión,
+descripción). run_migrations() aplica en orden las que no estén en la tabla
+schema_migrations, cada una en su propia transacción. Las migraciones deben ser idempotentes
+(IF NOT EXISTS / comprobar columnas) porque la versión 1 crea el esquema a partir de los
+modelos actuales.
+
+Uso:  python -m app.migrations        (aplica las pendientes y muestra el estado)
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from .database import Base, engine as default_engine
+# importa modelos para que se registren en Base.metadata
+from . import models  # noqa: F401
+from .utils.search import (
+    CLIENT_SEARCH_FIELDS, FTS_PREFIX_LENGTHS, HISTORY_SEARCH_FIELDS, PG_CLIENT_SEARCH_EXPR, PG_HISTORY_SEARCH_TSV,
+    PG_UNACCENT_FUNCTION,
+)
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return register
+
+
+# ---------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------
+def create_index(conn: Connection, name: str, table: str, *columns: str) -> None:
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def add_column(conn: Connection, table: str, column: str, ddl_type: str) -> None:
+    """ALTER TABLE ADD COLUMN si la columna no existe todavía."""
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def create_fts5_table(conn: Connection, name: str, table: str, fields, prefix_lengths=()) -> None:
+    """
+    Tabla FTS5 de contenido externo sobre `table` (rowid = id), sin distinguir acentos, con
+    triggers que replican cada INSERT/UPDATE/DELETE y poblada con las filas existentes.
+    """
+    cols = ", ".join(fields)
+    new = ", ".join(f"new.{f}" for f in fields)
+    old = ", ".join(f"old.{f}" for f in fields)
+    prefix = f", prefix='{' '.join(str(n) for n in prefix_lengths)}'" if prefix_lengths else ""
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({cols}, "
+        f"content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'{prefix})"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE ON {table} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+    conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+
+
+def create_pg_client_search_index(conn: Connection) -> None:
+    """Índice de trigramas de la búsqueda de clientes en Postgres, con el envoltorio inmutable de unaccent."""
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    conn.execute(text(
+        f"CREATE OR REPLACE FUNCTION {PG_UNACCENT_FUNCTION}(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_clients_search_trgm ON clients "
+        f"USING gin (({PG_CLIENT_SEARCH_EXPR}) gin_trgm_ops)"
+    ))
+
+
+# ---------------------------------------------------------------------
+# Migraciones
+# ---------------------------------------------------------------------
+@migration(1, "esquema inicial")
+def _initial_schema(conn):
+    Base.metadata.create_all(bind=conn)
+
+
+@migration(2, "índices de consultas frecuentes")
+def _hot_path_indexes(conn):
+    create_index(conn, "ix_appointments_veterinarian_date", "appointments", "veterinarian", "date")
+    create_index(conn, "ix_invoices_date", "invoices", "date")
+    create_index(conn, "ix_payments_invoice_id", "payments", "invoice_id")
+    create_index(conn, "ix_pets_owner_id", "pets", "owner_id")
+    create_index(conn, "ix_medical_history_pet_id_timestamp", "medical_history", "pet_id", "timestamp")
+
+
+@migration(3, "índices de filtros de clientes")
+def _client_filter_indexes(conn):
+    create_index(conn, "ix_clients_name", "clients", "name")
+    create_index(conn, "ix_clients_email", "clients", "email")
+    create_index(conn, "ix_clients_subscription_id", "clients", "subscription_id")
+
+
+@migration(4, "búsqueda de texto de clientes")
+def _client_search(conn):
+    if conn.dialect.name == "postgresql":
+        create_pg_client_search_index(conn)
+        return
+    create_fts5_table(conn, "clients_fts", "clients", CLIENT_SEARCH_FIELDS, FTS_PREFIX_LENGTHS)
+
+
+@migration(5, "índices de la ficha de cliente")
+def _client_overview_indexes(conn):
+    create_index(conn, "ix_medical_history_client_id_timestamp", "medical_history", "client_id", "timestamp")
+    create_index(conn, "ix_appointments_client_id_date", "appointments", "client_id", "date")
+    create_index(conn, "ix_invoices_client_id", "invoices", "client_id")
+
+
+@migration(6, "índices de filtros de mascotas")
+def _pet_filter_indexes(conn):
+    create_index(conn, "ix_pets_species", "pets", "species")
+    create_index(conn, "ix_pets_breed", "pets", "breed")
+    create_index(conn, "ix_pets_age", "pets", "age")
+
+
+@migration(7, "índice de la línea temporal del historial")
+def _history_timeline_index(conn):
+    # (pet_id, timestamp, id) cubre el orden completo del keyset; sustituye a (pet_id, timestamp)
+    create_index(conn, "ix_medical_history_pet_id_timestamp_id", "medical_history", "pet_id", "timestamp", "id")
+    conn.execute(text("DROP INDEX IF EXISTS ix_medical_history_pet_id_timestamp"))
+
+
+@migration(8, "búsqueda de texto del historial clínico")
+def _history_search(conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_medical_history_search_tsv ON medical_history "
+            f"USING gin ({PG_HISTORY_SEARCH_TSV})"
+        ))
+        return
+    create_fts5_table(conn, "medical_history_fts", "medical_history", HISTORY_SEARCH_FIELDS, FTS_PREFIX_LENGTHS)
+
+
+@migration(9, "duración de las citas")
+def _appointment_duration(conn):
+    add_column(conn, "appointments", "duration_minutes", "INTEGER NOT NULL DEFAULT 30")
+
+
+@migration(10, "veterinarios como entidad")
+def _veterinarians(conn):
+    vets = Base.metadata.tables["veterinarians"]
+    vets.create(bind=conn, checkfirst=True)
+    add_column(conn, "appointments", "veterinarian_id", "INTEGER REFERENCES veterinarians(id)")
+
+    # un veterinario por cada usuario con rol veterinarian y por cada nombre usado en citas
+    existing = set(conn.execute(select(vets.c.name)).scalars())
+    users = conn.execute(text(
+        "SELECT users.id, coalesce(users.full_name, users.email) FROM users "
+        "JOIN roles ON roles.id = users.role_id WHERE roles.name = 'veterinarian' "
+        "AND users.id NOT IN (SELECT user_id FROM veterinarians WHERE user_id IS NOT NULL)"
+    )).all()
+    for user_id, name in users:
+        if name not in existing:
+            conn.execute(insert(vets).values(user_id=user_id, name=name))
+            existing.add(name)
+    names = conn.execute(text(
+        "SELECT DISTINCT veterinarian FROM appointments WHERE veterinarian IS NOT NULL AND veterinarian <> ''"
+    )).scalars()
+    for name in names:
+        if name not in existing:
+            conn.execute(insert(vets).values(name=name))
+            existing.add(name)
+    conn.execute(text(
+        "UPDATE appointments SET veterinarian_id = "
+        "(SELECT id FROM veterinarians WHERE veterinarians.name = appointments.veterinarian) "
+        "WHERE veterinarian_id IS NULL AND veterinarian IS NOT NULL"
+    ))
+
+    create_index(conn, "ix_appointments_veterinarian_id_date", "appointments", "veterinarian_id", "date")
+    conn.execute(text("DROP INDEX IF EXISTS ix_appointments_veterinarian_date"))
+
+
+@migration(11, "series de citas periódicas")
+def _appointment_series(conn):
+    Base.metadata.tables["appointment_series"].create(bind=conn, checkfirst=True)
+    add_column(conn, "appointments", "series_id", "INTEGER REFERENCES appointment_series(id)")
+    create_index(conn, "ix_appointments_series_id", "appointments", "series_id")
+
+
+@migration(12, "feed de la agenda: fecha del último cambio y versión del token")
+def _calendar_feed(conn):
+    add_column(conn, "veterinarians", "schedule_changed_at", "DATETIME")
+    add_column(conn, "veterinarians", "calendar_token_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(13, "recordatorios de citas")
+def _appointment_reminders(conn):
+    add_column(conn, "appointments", "reminder_sent_at", "DATETIME")
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_appointments_reminder_due ON appointments (date) "
+        "WHERE reminder_sent_at IS NULL"
+    ))
+
+
+@migration(14, "versión de los tokens de usuario")
+def _user_token_version(conn):
+    add_column(conn, "users", "token_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(15, "búsqueda de clientes sin acentos en Postgres")
+def _client_search_unaccent(conn):
+    # SQLite ya ignora los acentos (FTS5 remove_diacritics 2); en Postgres se rehace el índice
+    # de trigramas sobre la expresión con unaccent
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("DROP INDEX IF EXISTS ix_clients_search_trgm"))
+    create_pg_client_search_index(conn)
+
+
+# ---------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------
+def applied_versions(bind: Engine) -> List[int]:
+    with bind.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return [row[0] for row in conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+
+
+def run_migrations(bind: Engine = default_engine) -> List[int]:
+    """Aplica las migraciones pendientes. Devuelve las versiones aplicadas en esta llamada."""
+    done = set(applied_versions(bind))
+    applied = []
+    for m in MIGRATIONS:
+        if m.version in done:
+            continue
+        with bind.begin() as conn:
+            m.apply(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=m.version, description=m.description, applied_at=datetime.utcnow()
+            ))
+        applied.append(m.version)
+    return applied
+
+
+if __name__ == "__main__":
+    newly = run_migrations()
+    current = applied_versions(default_engine)
+    print(f"Aplicadas ahora: {newly or 'ninguna'}; versión actual: {current[-1] if current else 0}")
@@ -3,6 +3,8 @@ from .client import Client
 from .pet import Pet
 from .user import User
 from .appointment import Appointment
+from .appointment_series import AppointmentSeries
+from .veterinarian import Veterinarian
 from .invoice import Invoice
 from .payment import Payment
 from .history import MedicalHistory as History
@@ -13,6 +15,8 @@ __all__ = [
     "Pet",
     "User",
     "Appointment",
+    "AppointmentSeries",
+    "Veterinarian",
     "Invoice",
     "Payment",
     "History",
@@ -1,19 +1,42 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from ..database import Base
 
+DEFAULT_APPOINTMENT_MINUTES = 30
+
+
 class Appointment(Base):
     __tablename__ = "appointments"
 
     id = Column(Integer, primary_key=True, index=True)
     date = Column(DateTime, nullable=False)
+    duration_minutes = Column(Integer, nullable=False, default=DEFAULT_APPOINTMENT_MINUTES,
+                              server_default=str(DEFAULT_APPOINTMENT_MINUTES))
     reason = Column(String)
-    veterinarian = Column(String)
+    veterinarian_id = Column(Integer, ForeignKey("veterinarians.id"))
+    veterinarian = Column(String)  # nombre del veterinario (copia de veterinarians.name)
 
     pet_id = Column(Integer, ForeignKey("pets.id"))
     client_id = Column(Integer, ForeignKey("clients.id"))
 
     completed = Column(Boolean, default=False)
+    # NULL en las citas sueltas
+    series_id = Column(Integer, ForeignKey("appointment_series.id"), index=True)
+    # recordatorio al cliente ya enviado (app/reminders.py)
+    reminder_sent_at = Column(DateTime)
 
     pet = relationship("Pet")
     client = relationship("Client")
+    vet = relationship("Veterinarian")
+    series = relationship("AppointmentSeries", back_populates="appointments")
+
+    __table_args__ = (
+        # solapamientos y disponibilidad (utils/availability.py)
+        Index("ix_appointments_veterinarian_id_date", "veterinarian_id", "date"),
+        # próximas citas del cliente en /clientes/{id}/overview
+        Index("ix_appointments_client_id_date", "client_id", "date"),
+        # recordatorios pendientes: solo las citas sin recordatorio (app/reminders.py)
+        Index("ix_appointments_reminder_due", "date", sqlite_where=text("reminder_sent_at IS NULL"),
+              postgresql_where=text("reminder_sent_at IS NULL")),
+    )
+
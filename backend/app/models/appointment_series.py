@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+
+class AppointmentSeries(Base):
+    """Citas periódicas: la regla y los datos comunes; cada repetición es una fila de appointments."""
+    __tablename__ = "appointment_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rrule = Column(String, nullable=False)  # subconjunto de RRULE (utils/recurrence.py)
+    start = Column(DateTime, nullable=False)  # primera cita (DTSTART)
+    duration_minutes = Column(Integer, nullable=False)
+    reason = Column(String)
+    veterinarian_id = Column(Integer, ForeignKey("veterinarians.id"), nullable=False)
+    pet_id = Column(Integer, ForeignKey("pets.id"))
+    client_id = Column(Integer, ForeignKey("clients.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    appointments = relationship("Appointment", back_populates="series", order_by="Appointment.date")
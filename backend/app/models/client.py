@@ -16,12 +16,12 @@ class Client(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     dni = Column(String, unique=True, index=True, nullable=False)
-    name = Column(String, nullable=False)
-    email = Column(String)
+    name = Column(String, nullable=False, index=True)
+    email = Column(String, index=True)
     phone = Column(String)
     address = Column(String)
 
-    subscription_id = Column(Integer, ForeignKey("subscription_plans.id"))
+    subscription_id = Column(Integer, ForeignKey("subscription_plans.id"), index=True)
     subscription = relationship("SubscriptionPlan", backref="clients")
     history = relationship("MedicalHistory", back_populates="client",cascade="all, delete-orphan")
     
\ No newline at end of file
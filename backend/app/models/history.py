@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -22,3 +22,10 @@ class MedicalHistory(Base):
 
     client = relationship("Client", back_populates="history")
     pet = relationship("Pet", back_populates="history")
+
+    __table_args__ = (
+        # línea temporal por mascota, más reciente primero, paginada por (timestamp, id)
+        Index("ix_medical_history_pet_id_timestamp_id", "pet_id", "timestamp", "id"),
+        # historial reciente del cliente en /clientes/{id}/overview
+        Index("ix_medical_history_client_id_timestamp", "client_id", "timestamp"),
+    )
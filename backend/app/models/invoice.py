@@ -11,8 +11,8 @@ class Invoice(Base):
     __tablename__ = "invoices"
 
     id = Column(Integer, primary_key=True, index=True)
-    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
-    date = Column(Date, default=date.today, nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=False, index=True)
+    date = Column(Date, default=date.today, nullable=False, index=True)
     total = Column(Float, nullable = False)
     pet_id = Column(Integer, ForeignKey("pets.id"), nullable=True)
     appointment_id = Column(Integer, ForeignKey("appointments.id"), nullable=True)
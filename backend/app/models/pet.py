@@ -7,11 +7,11 @@ class Pet(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    species = Column(String)
-    breed = Column(String)
-    age = Column(Integer)
+    species = Column(String, index=True)
+    breed = Column(String, index=True)
+    age = Column(Integer, index=True)
     weight = Column(Integer)
 
-    owner_id = Column(Integer, ForeignKey("clients.id"))
+    owner_id = Column(Integer, ForeignKey("clients.id"), index=True)
     owner = relationship("Client", backref="pets")
     history = relationship("MedicalHistory", back_populates="pet",cascade="all, delete-orphan")
\ No newline at end of file
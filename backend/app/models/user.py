@@ -16,6 +16,8 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
+    # versión vigente de sus tokens (claim "ver"): cambiar el rol o desactivarlo la incrementa
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     role_id = Column(Integer, ForeignKey("roles.id"))
     role = relationship("Role")
@@ -0,0 +1,35 @@
+from datetime import datetime, time
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Time
+from sqlalchemy.orm import relationship
+from ..database import Base
+
+DEFAULT_WORK_DAYS = "1,2,3,4,5"  # días ISO (1 = lunes)
+
+
+class Veterinarian(Base):
+    __tablename__ = "veterinarians"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # usuario con rol veterinarian; NULL en los creados desde nombres antiguos de citas
+    user_id = Column(Integer, ForeignKey("users.id"), unique=True)
+    name = Column(String, unique=True, nullable=False)
+
+    # horario de consulta (UTC), usado por GET /citas/disponibilidad
+    work_start = Column(Time, nullable=False, default=time(9, 0))
+    work_end = Column(Time, nullable=False, default=time(17, 0))
+    work_days = Column(String, nullable=False, default=DEFAULT_WORK_DAYS)
+    active = Column(Boolean, nullable=False, default=True)
+
+    # se incrementa en cada reserva (control optimista, ver utils/availability.book) y en
+    # cualquier otro cambio de sus citas; ETag y Last-Modified del feed .ics
+    schedule_version = Column(Integer, nullable=False, default=0)
+    schedule_changed_at = Column(DateTime, default=datetime.utcnow)
+    # entra en la firma del token del feed .ics: incrementarla revoca la URL anterior
+    calendar_token_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    user = relationship("User")
+
+    @property
+    def weekdays(self):
+        return {int(d) for d in self.work_days.split(",") if d}
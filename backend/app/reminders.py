@@ -0,0 +1,272 @@
+"""
+Recordatorios de citas para los clientes.
+
+Uso:  python -m app.reminders [--once] [--sink FICHERO] [--lead-hours H] [--interval S]
+      (o REMINDERS_IN_PROCESS=1 para ejecutarlo en un hilo del propio backend)
+
+Cada pasada busca las citas que empiezan en las próximas `lead` horas sin recordatorio
+(appointments.reminder_sent_at IS NULL) con un rango sobre el índice parcial
+ix_appointments_reminder_due, que solo contiene las citas sin recordatorio: el coste depende de
+los recordatorios pendientes, no del tamaño de la tabla. Se agrupan por cliente (un mensaje con
+todas sus citas de la ventana) y se entregan a un ReminderSink.
+
+Sin envíos dobles: antes de entregar, las citas de REMINDER_CLAIM_BATCH clientes se marcan con
+UPDATE ... SET reminder_sent_at = ahora WHERE reminder_sent_at IS NULL RETURNING id, y se
+confirma. Otro worker o una pasada tras reiniciar ya no las ve, y solo se entregan las que marcó
+esta pasada. Si una entrega falla se desmarcan para la siguiente. Si el proceso muere entre
+marcar y entregar, esos mensajes se pierden: como mucho un envío, nunca dos.
+
+Si una cita ya recordada cambia de fecha (con el ORM), se le quita la marca al hacer flush para
+que la pasada siguiente avise de la hora nueva.
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Protocol, Set, Tuple
+
+from sqlalchemy import event, inspect, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from .models.appointment import Appointment
+from .models.client import Client
+from .models.pet import Pet
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_IN_PROCESS = os.getenv("REMINDERS_IN_PROCESS", "0") not in ("0", "false", "False")
+REMINDER_SINK_PATH = os.getenv("REMINDER_SINK_PATH", "reminders.ndjson")
+REMINDER_LEAD_HOURS = float(os.getenv("REMINDER_LEAD_HOURS", "24"))
+REMINDER_INTERVAL_SECONDS = float(os.getenv("REMINDER_INTERVAL_SECONDS", "60"))
+# filas por consulta al recorrer la ventana (keyset por (date, id))
+REMINDER_SCAN_BATCH = 1000
+# clientes marcados por transacción (y mensajes que se pierden si el proceso muere a medias)
+REMINDER_CLAIM_BATCH = 100
+
+
+class ReminderItem(NamedTuple):
+    appointment_id: int
+    date: datetime
+    duration_minutes: int
+    reason: Optional[str]
+    pet: Optional[str]
+    veterinarian: Optional[str]
+
+
+class Reminder(NamedTuple):
+    """Un mensaje por cliente con sus citas de la ventana."""
+    client_id: int
+    client_name: str
+    email: Optional[str]
+    phone: Optional[str]
+    appointments: Tuple[ReminderItem, ...]
+
+    def as_dict(self) -> dict:
+        data = self._asdict()
+        data["appointments"] = [dict(i._asdict(), date=i.date.isoformat()) for i in self.appointments]
+        return data
+
+
+class ReminderRun(NamedTuple):
+    scanned: int       # citas leídas (las pendientes de la ventana)
+    reminders: int     # mensajes entregados
+    appointments: int  # citas recordadas
+
+
+# ---------------------------------------------------------------------
+# Sinks
+# ---------------------------------------------------------------------
+class ReminderSink(Protocol):
+    def deliver(self, reminder: Reminder) -> None:
+        """Entrega el mensaje; una excepción lo desmarca para la siguiente pasada."""
+
+
+class FileSink:
+    """Cola en fichero: una línea JSON por mensaje (NDJSON), para pruebas o para otro proceso."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def deliver(self, reminder: Reminder) -> None:
+        line = json.dumps(reminder.as_dict(), ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class QueueSink:
+    """Cola en memoria, para un consumidor en el mismo proceso."""
+
+    def __init__(self, maxsize: int = 0):
+        self.queue: "queue.Queue[Reminder]" = queue.Queue(maxsize)
+
+    def deliver(self, reminder: Reminder) -> None:
+        self.queue.put(reminder)
+
+
+@event.listens_for(Session, "before_flush")
+def _reset_rescheduled(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, Appointment) and obj.reminder_sent_at is not None \
+                and inspect(obj).attrs.date.history.has_changes():
+            obj.reminder_sent_at = None
+
+
+# ---------------------------------------------------------------------
+# Pasada
+# ---------------------------------------------------------------------
+def due_statement(start: datetime, end: datetime, after: Optional[Tuple[datetime, int]] = None,
+                  limit: int = REMINDER_SCAN_BATCH):
+    """Citas sin recordatorio que empiezan en [start, end), por (date, id) a partir de `after`."""
+    stmt = (
+        select(Appointment.id, Appointment.date, Appointment.duration_minutes, Appointment.reason,
+               Appointment.veterinarian, Appointment.client_id, Pet.name.label("pet"),
+               Client.name.label("client_name"), Client.email, Client.phone)
+        .join(Client, Client.id == Appointment.client_id)
+        .outerjoin(Pet, Pet.id == Appointment.pet_id)
+        .where(
+            Appointment.reminder_sent_at.is_(None),
+            Appointment.date >= start,
+            Appointment.date < end,
+            Appointment.completed.isnot(True),
+        )
+        .order_by(Appointment.date, Appointment.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(Appointment.date, Appointment.id) > after)
+    return stmt
+
+
+def _claim(db: Session, ids: List[int], now: datetime) -> Set[int]:
+    table = Appointment.__table__
+    claimed = db.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.reminder_sent_at.is_(None))
+        .values(reminder_sent_at=now)
+        .returning(table.c.id)
+    ).scalars().all()
+    db.commit()
+    return set(claimed)
+
+
+def _release(db: Session, ids: Iterable[int], now: datetime) -> None:
+    table = Appointment.__table__
+    db.execute(update(table).where(table.c.id.in_(list(ids)), table.c.reminder_sent_at == now)
+               .values(reminder_sent_at=None))
+    db.commit()
+
+
+def run_once(session_factory: Callable[[], Session], sink: ReminderSink, now: Optional[datetime] = None,
+             lead: timedelta = timedelta(hours=REMINDER_LEAD_HOURS), scan_batch: int = REMINDER_SCAN_BATCH) -> ReminderRun:
+    """Recorre la ventana [now, now + lead) y entrega un mensaje por cliente."""
+    now = now or datetime.utcnow()
+    clients: Dict[int, Reminder] = {}
+    items: Dict[int, List[ReminderItem]] = {}
+    scanned = reminders = appointments = 0
+    db = session_factory()
+    try:
+        after = None
+        while True:
+            rows = db.execute(due_statement(now, now + lead, after, scan_batch)).all()
+            for r in rows:
+                clients.setdefault(r.client_id, Reminder(r.client_id, r.client_name, r.email, r.phone, ()))
+                items.setdefault(r.client_id, []).append(
+                    ReminderItem(r.id, r.date, r.duration_minutes, r.reason, r.pet, r.veterinarian))
+            scanned += len(rows)
+            if len(rows) < scan_batch:
+                break
+            after = (rows[-1].date, rows[-1].id)
+        db.rollback()  # termina la lectura antes de empezar a marcar
+
+        owners = list(items)
+        for k in range(0, len(owners), REMINDER_CLAIM_BATCH):
+            batch = owners[k:k + REMINDER_CLAIM_BATCH]
+            claimed = _claim(db, [i.appointment_id for c in batch for i in items[c]], now)
+            failed: List[int] = []
+            for client_id in batch:
+                mine = tuple(i for i in items[client_id] if i.appointment_id in claimed)
+                if not mine:
+                    continue  # otro worker se adelantó
+                try:
+                    sink.deliver(clients[client_id]._replace(appointments=mine))
+                except Exception:
+                    logger.exception("Reminder delivery failed for client %s; will retry", client_id)
+                    failed.extend(i.appointment_id for i in mine)
+                    continue
+                reminders += 1
+                appointments += len(mine)
+            if failed:
+                _release(db, failed, now)
+    finally:
+        db.close()
+    if reminders:
+        logger.info("Sent %d reminders (%d appointments)", reminders, appointments)
+    return ReminderRun(scanned, reminders, appointments)
+
+
+class ReminderScheduler:
+    """Llama a run_once cada `interval` segundos en un hilo en segundo plano."""
+
+    def __init__(self, session_factory: Callable[[], Session], sink: ReminderSink,
+                 lead: timedelta = timedelta(hours=REMINDER_LEAD_HOURS),
+                 interval: float = REMINDER_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.lead = lead
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="reminders", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        """Bucle de pasadas en el hilo actual hasta stop()."""
+        while not self._stop.is_set():
+            try:
+                run_once(self.session_factory, self.sink, lead=self.lead)
+            except Exception:
+                logger.exception("Reminder pass failed")
+            self._stop.wait(self.interval)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.reminders", description="Worker de recordatorios de citas")
+    parser.add_argument("--once", action="store_true", help="una sola pasada y salir")
+    parser.add_argument("--sink", default=REMINDER_SINK_PATH, help="fichero NDJSON donde se escriben los mensajes")
+    parser.add_argument("--lead-hours", type=float, default=REMINDER_LEAD_HOURS)
+    parser.add_argument("--interval", type=float, default=REMINDER_INTERVAL_SECONDS, help="segundos entre pasadas")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    sink, lead = FileSink(args.sink), timedelta(hours=args.lead_hours)
+    if args.once:
+        result = run_once(SessionLocal, sink, lead=lead)
+        print(f"Citas pendientes leídas: {result.scanned}; mensajes: {result.reminders} "
+              f"({result.appointments} citas)")
+        return
+    try:
+        ReminderScheduler(SessionLocal, sink, lead, args.interval).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
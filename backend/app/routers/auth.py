@@ -1,38 +1,66 @@
-from typing import Optional
+import math
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from jose import JWTError
 
 from ..database import get_db
 from ..models.user import User, Role
 from ..schemas.auth import UserCreate, Token
+from ..utils import ratelimit
+from ..utils.password_pool import PoolSaturated, password_pool, hash_password, verify_password
 from ..utils.security import (
-    hash_password,
-    verify_password,
-    create_access_token,
-    decode_access_token,
+    create_user_token,
+    principal_cache,
+    # las dependencias de autorización viven en utils.security (con caché de principal);
+    # se reexportan aquí porque varios routers las importan desde .auth
+    get_current_user,
+    require_role,
+    require_any_role,
 )
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+
+def _busy_exc():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service busy, retry later",
+        headers={"Retry-After": "1"},
+    )
 
 
 @router.post("/token", response_model=Token)
 def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     """
     OAuth2 password grant token endpoint.
     Expects form fields: username (email) and password.
     Returns: {"access_token": "<jwt>", "token_type": "bearer"}
+    Rate limited per username and client IP (429 + Retry-After) before any hashing.
     """
+    client_ip = request.client.host if request.client else "unknown"
+    wait = ratelimit.check_login_allowed(form_data.username, client_ip)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+
     user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    try:
+        valid = bool(user) and verify_password(form_data.password, user.hashed_password)
+    except PoolSaturated:
+        raise _busy_exc()
+    if not valid:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Incorrect username or password")
-    access_token = create_access_token(data={"sub": user.email})
+    if user.is_active is False:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
+    ratelimit.login_succeeded(form_data.username, client_ip)
+    access_token = create_user_token(user.id, user.email, user.role.name if user.role else None, user.token_version,
+                                     user.full_name)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -45,6 +73,11 @@ def register(payload: UserCreate, db: Session = Depends(get_db)):
     if db.query(User).filter(User.email == payload.email).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already exists")
 
+    try:
+        hashed = hash_password(payload.password)
+    except PoolSaturated:
+        raise _busy_exc()
+
     role = db.query(Role).filter(Role.name == payload.role).first()
     if not role:
         role = Role(name=payload.role)
@@ -54,7 +87,7 @@ def register(payload: UserCreate, db: Session = Depends(get_db)):
 
     user = User(
         email=payload.email,
-        hashed_password=hash_password(payload.password),
+        hashed_password=hashed,
         full_name=payload.full_name,
         role_id=role.id,
     )
@@ -62,70 +95,28 @@ def register(payload: UserCreate, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(user)
 
-    token = create_access_token(data={"sub": user.email})
+    token = create_user_token(user.id, user.email, role.name, user.token_version, user.full_name)
     return {"access_token": token, "token_type": "bearer"}
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """
-    Dependency that returns the current user based on the bearer token.
-    Raises 401 on invalid token or missing user.
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = decode_access_token(token)
-        email: Optional[str] = None
-        if isinstance(payload, dict):
-            email = payload.get("sub")
-        if not email:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise credentials_exception
-    return user
-
-
-def require_role(role_name: str):
-    """
-    Dependency factory: requires the current user to have exactly role_name.
-    Usage in routers: Depends(require_role("admin"))
-    """
-    def inner(user: User = Depends(get_current_user)):
-        if not user.role or user.role.name != role_name:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-        return user
-
-    return inner
-
-
-def require_any_role(*roles):
-    """
-    Dependency factory: requires the current user to have any of the provided roles.
-    Usage in routers: Depends(require_any_role("admin", "recep"))
-    """
-    def inner(user: User = Depends(get_current_user)):
-        if user.role and user.role.name in roles:
-            return user
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-
-    return inner
-from fastapi import Depends
-
 @router.get("/me")
 def read_current_user(user = Depends(get_current_user)):
     """
     Devuelve el usuario autenticado (para que el frontend conozca rol/email).
     """
     # Devuelve información mínima necesaria por el frontend
-    role = None
-    if getattr(user, "role", None):
-        role = {"name": user.role.name}
-    return {"id": user.id, "email": user.email, "role": role, "full_name": getattr(user, "full_name", None)}
\ No newline at end of file
+    role = {"name": user.role_name} if user.role_name else None
+    return {"id": user.id, "email": user.email, "role": role, "full_name": user.full_name}
+
+
+@router.get("/stats")
+def auth_stats(user = Depends(require_role("admin"))):
+    """
+    Métricas del pool de hashing, la caché de usuarios y los límites de login (solo admin).
+    """
+    return {
+        "password_pool": password_pool.stats(),
+        "principal_cache": principal_cache.stats(),
+        "login_user_limiter": ratelimit.login_user_limiter.stats(),
+        "login_ip_limiter": ratelimit.login_ip_limiter.stats(),
+    }
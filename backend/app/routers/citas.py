@@ -1,48 +1,445 @@
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from datetime import date, datetime, time, timedelta, timezone
 
-from ..database import get_db
+from ..database import get_read_db, get_write_db, get_async_read_db
 from ..models.appointment import Appointment
+from ..models.appointment_series import AppointmentSeries
 from ..models.client import Client
+from ..models.invoice import Invoice
 from ..models.pet import Pet
-from ..schemas.appointment import AppointmentCreate, AppointmentOut, AppointmentUpdate
+from ..models.veterinarian import Veterinarian
+from ..schemas.appointment import (
+    AppointmentCreate, AppointmentOut, AppointmentUpdate, Availability, SeriesCreate, SeriesOut, SeriesUpdate,
+)
+from ..utils.availability import (
+    DEFAULT_APPOINTMENT_MINUTES, MAX_APPOINTMENT_MINUTES, MAX_AVAILABILITY_DAYS, Interval, ScheduleConflict,
+    VetSchedule, appointment_end, book, book_many, naive_utc, touch_schedules, working_windows,
+)
+from ..utils.export import iter_rows
+from ..utils.icalendar import ICS_MEDIA_TYPE, encode_calendar
+from ..utils.recurrence import format_rrule, occurrences, parse_rrule
+from ..utils.schedule_cache import VetHours, get_veterinarian, invalidate_days, load_days
+
+from ..utils.security import calendar_feed_token, verify_calendar_feed_token
 
 from .auth import get_current_user, require_any_role, require_role
 
 router = APIRouter(prefix="/citas", tags=["citas"])
 
+# días como máximo de GET /citas/agenda
+MAX_AGENDA_DAYS = 31
+# días pasados que incluye el feed .ics (las citas futuras van todas)
+CALENDAR_PAST_DAYS = 30
+
 
 def _now_utc() -> datetime:
     return datetime.now(timezone.utc)
 
 
-# Listar citas (autenticado) - opcional filtro por date/veterinarian
+def _resolve_vet(db: Session, veterinarian_id: Optional[int], name: Optional[str]) -> Optional[Veterinarian]:
+    """Veterinario por id o, si no se da, por nombre; 404 si no existe."""
+    if veterinarian_id is not None:
+        vet = db.get(Veterinarian, veterinarian_id)
+    elif name:
+        vet = db.query(Veterinarian).filter(Veterinarian.name == name).first()
+    else:
+        return None
+    if not vet:
+        raise HTTPException(status_code=404, detail="Veterinarian not found")
+    if not vet.active:
+        raise HTTPException(status_code=400, detail="Veterinarian is not active")
+    return vet
+
+
+def _conflict_detail(exc: ScheduleConflict):
+    """Detalle del 409; en las series, con las repeticiones que chocan."""
+    if not exc.conflicts:
+        return str(exc)
+    return {
+        "message": str(exc),
+        "conflicts": [{"start": i.start.isoformat(), "end": i.end.isoformat()} for i in exc.conflicts],
+    }
+
+
+async def _get_vet(db: AsyncSession, vet_id: int) -> VetHours:
+    vet = await get_veterinarian(db, vet_id)
+    if not vet:
+        raise HTTPException(status_code=404, detail="Veterinarian not found")
+    return vet
+
+
+# Listar citas (autenticado) - opcional filtro por date/veterinarian(_id)
 @router.get("/", response_model=List[AppointmentOut])
-def list_citas(
+async def list_citas(
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
     veterinarian: Optional[str] = None,
+    veterinarian_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     user = Depends(get_current_user),
 ):
-    q = db.query(Appointment)
+    q = select(Appointment)
     if date_from:
-        q = q.filter(Appointment.date >= date_from)
+        q = q.where(Appointment.date >= date_from)
     if date_to:
-        q = q.filter(Appointment.date <= date_to)
-    if veterinarian:
-        q = q.filter(Appointment.veterinarian == veterinarian)
-    return q.order_by(Appointment.date.desc()).offset(skip).limit(limit).all()
+        q = q.where(Appointment.date <= date_to)
+    if veterinarian_id is not None:
+        q = q.where(Appointment.veterinarian_id == veterinarian_id)
+    elif veterinarian:
+        q = q.where(Appointment.veterinarian_id == select(Veterinarian.id).where(Veterinarian.name == veterinarian)
+                    .scalar_subquery())
+    result = await db.execute(q.order_by(Appointment.date.desc()).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+# Citas de un veterinario por días (vista de día / semana), desde la caché de agendas
+@router.get("/agenda", response_model=List[AppointmentOut])
+async def agenda(
+    vet: int,
+    day: date,
+    days: int = Query(1, ge=1, le=MAX_AGENDA_DAYS),
+    db: AsyncSession = Depends(get_async_read_db),
+    user = Depends(get_current_user),
+):
+    await _get_vet(db, vet)
+    schedules = await load_days(db, vet, day, day + timedelta(days=days - 1))
+    return [row for d in sorted(schedules) for row in schedules[d]]
+
+
+# Huecos libres (dentro del horario del veterinario) y citas entre from y to
+@router.get("/disponibilidad", response_model=Availability)
+async def disponibilidad(
+    vet: int,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    duration: int = Query(DEFAULT_APPOINTMENT_MINUTES, gt=0, le=MAX_APPOINTMENT_MINUTES, description="minutos"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user = Depends(get_current_user),
+):
+    """
+    free: huecos de al menos `duration` minutos sin citas dentro del horario de consulta;
+    busy: citas que ocupan la ventana. Las fechas sin zona se interpretan en UTC.
+    """
+    start, end = naive_utc(start), naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window too large (max {MAX_AVAILABILITY_DAYS} days)")
+    veterinarian = await _get_vet(db, vet)
+
+    # el día anterior, por las citas que empiezan antes de la ventana y terminan dentro
+    first_day = (start - timedelta(minutes=MAX_APPOINTMENT_MINUTES)).date()
+    schedules = await load_days(db, vet, first_day, (end - timedelta(microseconds=1)).date())
+    schedule = VetSchedule(start, end, (
+        Interval(row["date"], appointment_end(row["date"], row["duration_minutes"]), row["id"])
+        for rows in schedules.values() for row in rows
+    ))
+    slot = timedelta(minutes=duration)
+    windows = working_windows(start, end, veterinarian.work_start, veterinarian.work_end, veterinarian.weekdays)
+    return {
+        "veterinarian_id": veterinarian.id,
+        "veterinarian": veterinarian.name,
+        "start": start,
+        "end": end,
+        "duration_minutes": duration,
+        "free": [i._asdict() for w in windows for i in schedule.free_slots(slot, w.start, w.end)],
+        "busy": [i._asdict() for i in schedule.busy()],
+    }
+
+
+# ---------------------------------------------------------------------
+# Feed iCalendar por veterinario
+# ---------------------------------------------------------------------
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Petición condicional satisfecha; If-None-Match manda sobre If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = naive_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since
+    return False
+
+
+# Agenda del veterinario en iCalendar (URL con token, ver /calendar/{vet}/suscripcion)
+@router.get("/calendar/{vet}.ics")
+def calendar_feed(vet: int, request: Request, token: Optional[str] = None, db: Session = Depends(get_read_db)):
+    """
+    Citas del veterinario desde hace CALENDAR_PAST_DAYS días, en streaming desde un rango sobre
+    ix_appointments_veterinarian_id_date. ETag y Last-Modified salen de la versión de su agenda
+    (veterinarians.schedule_version / schedule_changed_at): un sondeo sin cambios responde 304
+    leyendo solo la fila del veterinario.
+    """
+    row = db.execute(
+        select(Veterinarian.name, Veterinarian.schedule_version, Veterinarian.schedule_changed_at,
+               Veterinarian.calendar_token_version)
+        .where(Veterinarian.id == vet)
+    ).first()
+    # sin distinguir veterinario inexistente de token no válido
+    if not row or not verify_calendar_feed_token(vet, row.calendar_token_version, token):
+        raise HTTPException(status_code=401, detail="Invalid calendar token")
+
+    # la ventana avanza cada día: el día forma parte del ETag
+    since = datetime.combine(datetime.utcnow().date() - timedelta(days=CALENDAR_PAST_DAYS), time.min)
+    etag = f'"{vet}-{row.schedule_version}-{since:%Y%m%d}"'
+    last_modified = max(row.schedule_changed_at or since, since).replace(microsecond=0)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    stmt = (
+        select(Appointment.id, Appointment.date, Appointment.duration_minutes, Appointment.reason,
+               Pet.name.label("pet_name"))
+        .outerjoin(Pet, Pet.id == Appointment.pet_id)
+        .where(Appointment.veterinarian_id == vet, Appointment.date >= since)
+        .order_by(Appointment.date)
+    )
+    rows = (r._mapping for r in iter_rows(db, stmt))
+    headers["Content-Disposition"] = f'inline; filename="agenda-{vet}.ics"'
+    return StreamingResponse(encode_calendar(row.name, rows, last_modified), media_type=ICS_MEDIA_TYPE,
+                             headers=headers)
+
+
+def _check_calendar_owner(veterinarian: Optional[Veterinarian], user) -> Veterinarian:
+    if not veterinarian:
+        raise HTTPException(status_code=404, detail="Veterinarian not found")
+    # un veterinario solo accede a su propio feed
+    if user.role_name == "veterinarian" and veterinarian.user_id != user.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return veterinarian
+
+
+def _subscription_url(request: Request, veterinarian: Veterinarian) -> dict:
+    token = calendar_feed_token(veterinarian.id, veterinarian.calendar_token_version)
+    return {"url": str(request.url_for("calendar_feed", vet=veterinarian.id).include_query_params(token=token))}
+
+
+# URL de suscripción al feed
+@router.get("/calendar/{vet}/suscripcion")
+async def calendar_subscription(vet: int, request: Request, db: AsyncSession = Depends(get_async_read_db),
+                                user = Depends(require_any_role("admin", "receptionist", "veterinarian"))):
+    veterinarian = _check_calendar_owner(await db.get(Veterinarian, vet), user)
+    return _subscription_url(request, veterinarian)
+
+
+# Nueva URL de suscripción: la anterior deja de funcionar (p. ej. si se ha filtrado)
+@router.post("/calendar/{vet}/suscripcion")
+def rotate_calendar_subscription(vet: int, request: Request, db: Session = Depends(get_write_db),
+                                 user = Depends(require_any_role("admin", "veterinarian"))):
+    veterinarian = _check_calendar_owner(db.get(Veterinarian, vet), user)
+    veterinarian.calendar_token_version += 1
+    db.commit()
+    return _subscription_url(request, veterinarian)
+
+
+# ---------------------------------------------------------------------
+# Series de citas periódicas
+# ---------------------------------------------------------------------
+def _get_series(db: Session, series_id: int) -> AppointmentSeries:
+    series = db.get(AppointmentSeries, series_id)
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+
+def _following(db: Session, series: AppointmentSeries, cita_id: Optional[int]) -> List[Appointment]:
+    """
+    Citas pendientes de la serie desde cita_id (incluida) o, sin cita_id, las que aún no han
+    empezado (las pasadas sin completar no se mueven ni se borran); por fecha.
+    """
+    q = db.query(Appointment).filter(Appointment.series_id == series.id, Appointment.completed.isnot(True))
+    if cita_id is not None:
+        pivot = db.get(Appointment, cita_id)
+        if not pivot or pivot.series_id != series.id:
+            raise HTTPException(status_code=404, detail="Appointment not found in series")
+        q = q.filter(Appointment.date >= pivot.date)
+    else:
+        q = q.filter(Appointment.date >= datetime.utcnow())
+    return q.order_by(Appointment.date).all()
+
+
+def _has_earlier(db: Session, series: AppointmentSeries, when: datetime) -> bool:
+    return db.query(Appointment.id).filter(Appointment.series_id == series.id, Appointment.date < when).first() is not None
+
+
+def _end_series_before(series: AppointmentSeries, when: datetime) -> None:
+    """Corta la regla de la serie para que termine antes de `when`."""
+    rule = parse_rrule(series.rrule)
+    series.rrule = format_rrule(rule._replace(count=None, until=when - timedelta(seconds=1)))
+
+
+# Crear una serie (receptionist o veterinarian)
+@router.post("/series", response_model=SeriesOut, status_code=status.HTTP_201_CREATED)
+def create_series(payload: SeriesCreate, db: Session = Depends(get_write_db),
+                  user = Depends(require_any_role("receptionist", "veterinarian"))):
+    """
+    Expande la regla y reserva todas las citas a la vez: los solapamientos se comprueban con una
+    sola consulta por rango y las citas se insertan en una transacción (todas o ninguna).
+    409 con las repeticiones que chocan.
+    """
+    if not db.query(Client.id).filter(Client.id == payload.client_id).first():
+        raise HTTPException(status_code=404, detail="Client not found")
+    if not db.query(Pet.id).filter(Pet.id == payload.pet_id).first():
+        raise HTTPException(status_code=404, detail="Pet not found")
+    vet = _resolve_vet(db, payload.veterinarian_id, payload.veterinarian)
+    if not vet:
+        raise HTTPException(status_code=400, detail="A series needs a veterinarian")
+
+    start = naive_utc(payload.start)
+    if start < naive_utc(_now_utc()):
+        raise HTTPException(status_code=400, detail="Cannot create appointment in the past")
+    try:
+        rule = parse_rrule(payload.rrule)
+        starts = occurrences(rule, start)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not starts:
+        raise HTTPException(status_code=400, detail="The rule produces no appointments")
+
+    common = {"duration_minutes": payload.duration_minutes, "reason": payload.reason, "veterinarian_id": vet.id,
+              "pet_id": payload.pet_id, "client_id": payload.client_id}
+
+    def write():
+        series = AppointmentSeries(rrule=format_rrule(rule), start=start, **common)
+        db.add(series)
+        db.flush()
+        # un solo executemany (el ORM insertaría cita a cita en SQLite para leer cada id)
+        db.execute(insert(Appointment), [
+            dict(date=s, veterinarian=vet.name, series_id=series.id, **common) for s in starts
+        ])
+        return series
+
+    intervals = [Interval(s, appointment_end(s, payload.duration_minutes)) for s in starts]
+    try:
+        series = book_many(db, vet.id, intervals, write)
+    except ScheduleConflict as exc:
+        raise HTTPException(status_code=409, detail=_conflict_detail(exc))
+    # la inserción masiva no pasa por los eventos del ORM
+    invalidate_days(vet.id, {s.date() for s in starts})
+    db.refresh(series)
+    return series
+
+
+# Obtener una serie con sus citas
+@router.get("/series/{series_id}", response_model=SeriesOut)
+async def get_series(series_id: int, db: AsyncSession = Depends(get_async_read_db), user = Depends(get_current_user)):
+    series = await db.get(AppointmentSeries, series_id, options=[selectinload(AppointmentSeries.appointments)])
+    if not series:
+        raise HTTPException(status_code=404, detail="Series not found")
+    return series
+
+
+# Cambiar "esta y las siguientes" (receptionist o veterinarian)
+@router.patch("/series/{series_id}", response_model=SeriesOut)
+def update_series(
+    series_id: int,
+    payload: SeriesUpdate,
+    cita_id: Optional[int] = Query(None, description="desde esta cita (incluida); sin ella, las que aún no han empezado"),
+    db: Session = Depends(get_write_db),
+    user = Depends(require_any_role("receptionist", "veterinarian")),
+):
+    """
+    Aplica los cambios a las citas pendientes desde cita_id. Si quedan citas anteriores, la serie
+    se parte: la original termina antes de cita_id y las siguientes pasan a una serie nueva.
+    Los solapamientos se comprueban como en el alta (una consulta, todo o nada).
+    """
+    series = _get_series(db, series_id)
+    following = _following(db, series, cita_id)
+    if not following:
+        raise HTTPException(status_code=400, detail="No pending appointments to change")
+    data = payload.model_dump(exclude_none=True)
+    vet = _resolve_vet(db, data.get("veterinarian_id"), data.get("veterinarian")) \
+        or db.get(Veterinarian, series.veterinarian_id)
+
+    shift = timedelta(minutes=data.get("shift_minutes", 0))
+    changes = {a.id: (a.date + shift, data.get("duration_minutes", a.duration_minutes)) for a in following}
+    first = min(start for start, _ in changes.values())
+    if shift and first < naive_utc(_now_utc()):
+        raise HTTPException(status_code=400, detail="Cannot set appointment in the past")
+    split = _has_earlier(db, series, following[0].date)
+    pivot_date = following[0].date
+    rule = parse_rrule(series.rrule)
+    # BYDAY se mueve con las citas si el cambio las pasa a otro día de la semana
+    days = (first.weekday() - pivot_date.weekday()) % 7
+    rule = rule._replace(count=None, until=max(start for start, _ in changes.values()),
+                         byday=tuple(sorted((d + days) % 7 for d in rule.byday)))
+
+    def write():
+        target = series
+        if split:
+            target = AppointmentSeries(pet_id=series.pet_id, client_id=series.client_id, reason=series.reason,
+                                       duration_minutes=series.duration_minutes)
+            db.add(target)
+            _end_series_before(series, pivot_date)
+        target.rrule, target.start, target.veterinarian_id = format_rrule(rule), first, vet.id
+        for k in ("duration_minutes", "reason"):
+            if k in data:
+                setattr(target, k, data[k])
+        for a in following:
+            a.date, a.duration_minutes = changes[a.id]
+            a.veterinarian_id, a.veterinarian, a.series = vet.id, vet.name, target
+            if "reason" in data:
+                a.reason = data["reason"]
+        return target
+
+    intervals = [Interval(s, appointment_end(s, m)) for s, m in changes.values()]
+    try:
+        target = book_many(db, vet.id, intervals, write, exclude_ids=set(changes))
+    except ScheduleConflict as exc:
+        raise HTTPException(status_code=409, detail=_conflict_detail(exc))
+    db.refresh(target)
+    return target
+
+
+# Anular "esta y las siguientes" (receptionist o admin)
+@router.delete("/series/{series_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_series(
+    series_id: int,
+    cita_id: Optional[int] = Query(None, description="desde esta cita (incluida); sin ella, las que aún no han empezado"),
+    db: Session = Depends(get_write_db),
+    user = Depends(require_any_role("receptionist", "admin")),
+):
+    """Borra las citas pendientes desde cita_id; las completadas se conservan en la serie."""
+    series = _get_series(db, series_id)
+    following = _following(db, series, cita_id)
+    ids = [a.id for a in following]
+    days = {(a.veterinarian_id, a.date.date()) for a in following if a.veterinarian_id}
+    # en bloque: las facturas de esas citas se quedan sin cita, como al borrar una con el ORM
+    db.execute(update(Invoice).where(Invoice.appointment_id.in_(ids)).values(appointment_id=None))
+    db.execute(delete(Appointment).where(Appointment.id.in_(ids)), execution_options={"synchronize_session": False})
+    touch_schedules(db, {vet_id for vet_id, _ in days})
+    if following and _has_earlier(db, series, following[0].date):
+        _end_series_before(series, following[0].date)
+    elif not db.query(Appointment.id).filter(Appointment.series_id == series.id).first():
+        db.delete(series)
+    db.commit()
+    # el borrado en bloque no pasa por los eventos del ORM
+    for vet_id, day in days:
+        invalidate_days(vet_id, [day])
+    return None
 
 
 # Obtener cita por id
 @router.get("/{cita_id}", response_model=AppointmentOut)
-def get_cita(cita_id: int, db: Session = Depends(get_db), user = Depends(get_current_user)):
-    c = db.query(Appointment).filter(Appointment.id == cita_id).first()
+async def get_cita(cita_id: int, db: AsyncSession = Depends(get_async_read_db), user = Depends(get_current_user)):
+    c = await db.get(Appointment, cita_id)
     if not c:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return c
@@ -50,7 +447,7 @@ def get_cita(cita_id: int, db: Session = Depends(get_db), user = Depends(get_cur
 
 # Crear cita (receptionist o veterinarian)
 @router.post("/", response_model=AppointmentOut, status_code=status.HTTP_201_CREATED)
-def create_cita(payload: AppointmentCreate, db: Session = Depends(get_db), user = Depends(require_any_role("receptionist", "veterinarian"))):
+def create_cita(payload: AppointmentCreate, db: Session = Depends(get_write_db), user = Depends(require_any_role("receptionist", "veterinarian"))):
     # Validaciones: client y pet existen
     client = db.query(Client).filter(Client.id == payload.client_id).first()
     if not client:
@@ -70,26 +467,35 @@ def create_cita(payload: AppointmentCreate, db: Session = Depends(get_db), user
         if dt < now:
             raise HTTPException(status_code=400, detail="Cannot create appointment in the past")
 
-    # Evitar solapamiento por veterinario (misma fecha/hora)
-    if payload.veterinarian and payload.date:
-        conflict = db.query(Appointment).filter(
-            Appointment.veterinarian == payload.veterinarian,
-            Appointment.date == payload.date
-        ).first()
-        if conflict:
-            raise HTTPException(status_code=409, detail="Veterinarian already has an appointment at that time")
-
-    # Crear
-    a = Appointment(**payload.model_dump())
-    db.add(a)
-    db.commit()
+    # Crear (fechas guardadas en UTC sin zona, como las compara la disponibilidad)
+    vet = _resolve_vet(db, payload.veterinarian_id, payload.veterinarian)
+    data = payload.model_dump()
+    data["date"] = naive_utc(data["date"])
+    data["veterinarian_id"] = vet.id if vet else None
+    data["veterinarian"] = vet.name if vet else None
+
+    def write():
+        a = Appointment(**data)
+        db.add(a)
+        return a
+
+    # Sin solapamientos por veterinario ([date, date + duration_minutes)), atómico frente a
+    # reservas simultáneas (ver utils/availability.book)
+    if vet:
+        try:
+            a = book(db, vet.id, data["date"], payload.duration_minutes, write)
+        except ScheduleConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+    else:
+        a = write()
+        db.commit()
     db.refresh(a)
     return a
 
 
 # Actualizar cita (receptionist or veterinarian)
 @router.put("/{cita_id}", response_model=AppointmentOut)
-def update_cita(cita_id: int, payload: AppointmentUpdate, db: Session = Depends(get_db), user = Depends(require_any_role("receptionist", "veterinarian"))):
+def update_cita(cita_id: int, payload: AppointmentUpdate, db: Session = Depends(get_write_db), user = Depends(require_any_role("receptionist", "veterinarian"))):
     a = db.query(Appointment).filter(Appointment.id == cita_id).first()
     if not a:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -97,7 +503,9 @@ def update_cita(cita_id: int, payload: AppointmentUpdate, db: Session = Depends(
     # Si se cambia fecha o veterinario, validar como en create
     data = payload.model_dump(exclude_none=True)
     new_date = data.get("date", None)
-    new_vet = data.get("veterinarian", None)
+    new_vet = _resolve_vet(db, data.get("veterinarian_id"), data.get("veterinarian"))
+    if new_vet:
+        data["veterinarian_id"], data["veterinarian"] = new_vet.id, new_vet.name
 
     if new_date:
         now = _now_utc()
@@ -106,30 +514,34 @@ def update_cita(cita_id: int, payload: AppointmentUpdate, db: Session = Depends(
         if new_date < now:
             raise HTTPException(status_code=400, detail="Cannot set appointment in the past")
 
-    vet_to_check = new_vet if new_vet is not None else a.veterinarian
+    vet_to_check = new_vet.id if new_vet is not None else a.veterinarian_id
     date_to_check = new_date if new_date is not None else a.date
+    duration_to_check = data.get("duration_minutes", a.duration_minutes)
+
+    if "date" in data:
+        data["date"] = naive_utc(data["date"])
+
+    def write():
+        for k, v in data.items():
+            setattr(a, k, v)
+        db.add(a)
+        return a
 
     if vet_to_check and date_to_check:
-        conflict = db.query(Appointment).filter(
-            Appointment.veterinarian == vet_to_check,
-            Appointment.date == date_to_check,
-            Appointment.id != cita_id
-        ).first()
-        if conflict:
-            raise HTTPException(status_code=409, detail="Veterinarian already has an appointment at that time")
-
-    # Aplicar cambios
-    for k, v in data.items():
-        setattr(a, k, v)
-    db.add(a)
-    db.commit()
+        try:
+            book(db, vet_to_check, date_to_check, duration_to_check, write, exclude_id=cita_id)
+        except ScheduleConflict as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+    else:
+        write()
+        db.commit()
     db.refresh(a)
     return a
 
 
 # Borrar cita (receptionist or admin)
 @router.delete("/{cita_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cita(cita_id: int, db: Session = Depends(get_db), user = Depends(require_any_role("receptionist", "admin"))):
+def delete_cita(cita_id: int, db: Session = Depends(get_write_db), user = Depends(require_any_role("receptionist", "admin"))):
     a = db.query(Appointment).filter(Appointment.id == cita_id).first()
     if not a:
         raise HTTPException(status_code=404, detail="Appointment not found")
@@ -1,23 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import sys
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from ..database import get_db
-from ..models.client import Client
-from ..schemas.client import ClientCreate, ClientRead
+from ..client_import import IMPORT_FORMATS, detect_format, import_clients, iter_rows, open_text
+from ..database import get_write_db, get_async_read_db
+from ..models.appointment import Appointment
+from ..models.client import Client, SubscriptionPlan
+from ..models.history import MedicalHistory
+from ..models.invoice import Invoice
+from ..schemas.invoice import InvoiceOut
+from ..schemas.client import ClientCreate, ClientImportReport, ClientOverview, ClientRead
+from ..utils.search import client_search_statement
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, set_next_cursor
 from ..utils.security import require_any_role, get_current_user  # ajusta si tus nombres son distintos
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
-# Listar clientes (ejemplo)
+
+def _prefix_range(column, prefix: str):
+    # prefijo como rango (col >= 'ab' AND col < 'ac'): usa el índice, a diferencia de LIKE en SQLite.
+    # Los U+10FFFF finales no tienen siguiente: se incrementa el carácter anterior ('a\U0010ffff' -> 'b')
+    # y, si todos lo son, no hay cota superior
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    upper = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return (column >= prefix) & (column < upper)
+
+
+# Listar clientes: paginación keyset por id (cabecera X-Next-Cursor) y filtros opcionales
 @router.get("/", response_model=List[ClientRead])
-def list_clients(db: Session = Depends(get_db), user = Depends(require_any_role("admin", "recepcionista"))):
-    return db.query(Client).all()
+async def list_clients(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    name: Optional[str] = Query(None, min_length=1, description="Prefijo del nombre (distingue mayúsculas)"),
+    dni: Optional[str] = None,
+    email: Optional[str] = None,
+    subscription_id: Optional[int] = None,
+    plan: Optional[str] = Query(None, description="Nombre del plan de suscripción"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user = Depends(require_any_role("admin", "receptionist")),
+):
+    q = select(Client)
+    after = decode_cursor(cursor)
+    if after is not None:
+        if not isinstance(after.get("id"), int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        q = q.where(Client.id > after["id"])
+    if name:
+        q = q.where(_prefix_range(Client.name, name))
+    if dni:
+        q = q.where(Client.dni == dni)
+    if email:
+        q = q.where(Client.email == email)
+    if subscription_id is not None:
+        q = q.where(Client.subscription_id == subscription_id)
+    if plan:
+        q = q.where(Client.subscription_id.in_(select(SubscriptionPlan.id).where(SubscriptionPlan.name == plan)))
+    result = await db.execute(q.order_by(Client.id).limit(limit + 1))
+    return set_next_cursor(response, result.scalars().all(), limit, lambda c: {"id": c.id})
+
+# Búsqueda de texto (nombre, DNI, email, teléfono, dirección) por prefijos, ordenada por relevancia
+@router.get("/search", response_model=List[ClientRead])
+async def search_clients(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    user = Depends(require_any_role("admin", "receptionist")),
+):
+    stmt = client_search_statement(db.bind.dialect.name, q, limit)
+    if stmt is None:
+        return []
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+# Ficha completa del cliente en una llamada: número fijo de consultas sea cual sea el volumen
+# (cliente + mascotas, próximas citas, facturas pendientes + pagos, historial reciente)
+@router.get("/{client_id}/overview", response_model=ClientOverview)
+async def client_overview(
+    client_id: int,
+    limit: int = Query(10, ge=1, le=100, description="Máximo de próximas citas y de entradas de historial"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user = Depends(require_any_role("admin", "receptionist")),
+):
+    client = await db.get(Client, client_id, options=[selectinload(Client.pets)])
+    if not client:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    appointments = await db.execute(
+        select(Appointment)
+        .where(Appointment.client_id == client_id, Appointment.date >= datetime.utcnow(), Appointment.completed.isnot(True))
+        .order_by(Appointment.date)
+        .limit(limit)
+    )
+    invoices = await db.execute(
+        select(Invoice)
+        .where(Invoice.client_id == client_id, Invoice.paid.isnot(True))
+        .options(selectinload(Invoice.payments))
+        .order_by(Invoice.date, Invoice.id)
+    )
+    history = await db.execute(
+        select(MedicalHistory)
+        .where(MedicalHistory.client_id == client_id)
+        .order_by(MedicalHistory.timestamp.desc())
+        .limit(limit)
+    )
+
+    open_invoices = []
+    for inv in invoices.scalars():
+        paid_amount = sum(p.amount for p in inv.payments)
+        open_invoices.append({
+            **InvoiceOut.model_validate(inv, from_attributes=True).model_dump(),
+            "paid_amount": paid_amount,
+            "pending_amount": max(inv.total - paid_amount, 0.0),
+        })
+    return {
+        **ClientRead.model_validate(client, from_attributes=True).model_dump(),
+        "address": client.address,
+        "subscription_id": client.subscription_id,
+        "pets": client.pets,
+        "upcoming_appointments": appointments.scalars().all(),
+        "open_invoices": open_invoices,
+        "recent_history": history.scalars().all(),
+    }
+
 
 # Crear cliente — versión corregida para evitar UNIQUE constraint error si ya existe el DNI
 @router.post("/", response_model=ClientRead, status_code=status.HTTP_200_OK)
-def create_client(payload: ClientCreate, db: Session = Depends(get_db), user = Depends(require_any_role("admin", "recepcionista"))):
+def create_client(payload: ClientCreate, db: Session = Depends(get_write_db), user = Depends(require_any_role("admin", "receptionist"))):
     """
     Crea un cliente nuevo. Si ya existe un cliente con el mismo DNI,
     devuelve el cliente existente en lugar de lanzar error por UNIQUE constraint.
@@ -54,9 +172,27 @@ def create_client(payload: ClientCreate, db: Session = Depends(get_db), user = D
     db.refresh(new_client)
     return new_client
 
+# Importación masiva (CSV con cabecera o NDJSON); el fichero se procesa en streaming por lotes
+@router.post("/import", response_model=ClientImportReport)
+def import_clients_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv | ndjson (por defecto, según la extensión)"),
+    db: Session = Depends(get_write_db),
+    user = Depends(require_any_role("admin")),
+):
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {fmt}")
+    report = import_clients(db, iter_rows(open_text(file.file), fmt))
+    if report.aborted_at is not None and not (report.inserted or report.existing):
+        raise HTTPException(status_code=400, detail=f"Fichero no válido a partir de la línea {report.aborted_at}")
+    # si ya se guardaron filas, 200 con el informe: aborted_at indica dónde se paró
+    return report.as_dict()
+
+
 # Endpoint para eliminar cliente (ejemplo, sólo admin)
 @router.delete("/{client_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_client(client_id: int, db: Session = Depends(get_db), user = Depends(require_any_role("admin"))):
+def delete_client(client_id: int, db: Session = Depends(get_write_db), user = Depends(require_any_role("admin"))):
     client = db.query(Client).get(client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
@@ -0,0 +1,78 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..database import get_read_db
+from ..models.appointment import Appointment
+from ..models.client import Client
+from ..models.invoice import Invoice
+from ..models.pet import Pet
+from ..utils.export import EXPORT_FORMATS, MEDIA_TYPES, encode_rows, gzip_chunks, iter_rows
+from ..utils.security import require_any_role
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+# entidad -> (modelo, columna de fecha para fecha_inicio/fecha_fin o None)
+EXPORTS = {
+    "clientes": (Client, None),
+    "mascotas": (Pet, None),
+    "citas": (Appointment, Appointment.date),
+    "facturas": (Invoice, Invoice.date),
+}
+
+
+def _date_filters(stmt, column, fecha_inicio: Optional[date], fecha_fin: Optional[date]):
+    # en columnas DateTime se incluye el día completo de fecha_fin
+    is_datetime = column.type.python_type is datetime
+    if fecha_inicio:
+        stmt = stmt.where(column >= (datetime.combine(fecha_inicio, time.min) if is_datetime else fecha_inicio))
+    if fecha_fin:
+        if is_datetime:
+            stmt = stmt.where(column < datetime.combine(fecha_fin + timedelta(days=1), time.min))
+        else:
+            stmt = stmt.where(column <= fecha_fin)
+    return stmt
+
+
+@router.get("/{entity}")
+def export_entity(
+    entity: str,
+    format: str = Query("csv", description="csv | ndjson"),
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    gzip: bool = False,
+    db: Session = Depends(get_read_db),
+    user = Depends(require_any_role("admin")),
+):
+    """
+    Exporta todas las filas de la entidad en streaming (memoria constante).
+    fecha_inicio / fecha_fin (YYYY-MM-DD, inclusivas) solo para citas y facturas.
+    gzip=true devuelve el fichero comprimido (.gz).
+    """
+    if entity not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Entidad no exportable: {entity}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato no soportado: {format}")
+    model, date_column = EXPORTS[entity]
+    if (fecha_inicio or fecha_fin) and date_column is None:
+        raise HTTPException(status_code=400, detail=f"{entity} no admite filtro de fechas")
+
+    columns = [c.name for c in model.__table__.columns]
+    stmt = select(*model.__table__.columns)
+    if date_column is not None:
+        stmt = _date_filters(stmt, date_column, fecha_inicio, fecha_fin)
+    stmt = stmt.order_by(model.__table__.c.id)
+
+    body = encode_rows(iter_rows(db, stmt), columns, format)
+    filename = f"{entity}.{format}"
+    media_type = MEDIA_TYPES[format]
+    if gzip:
+        body = gzip_chunks(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
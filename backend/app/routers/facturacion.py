@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 
-from ..database import SessionLocal, get_db 
+from ..database import get_write_db, get_async_read_db
 from ..models.invoice import Invoice
 from ..models.payment import Payment
 from ..schemas.invoice import InvoiceCreate, InvoiceOut, InvoiceUpdate
@@ -14,7 +16,7 @@ router = APIRouter(prefix="/facturacion", tags=["facturacion"])
 
 # Crear factura
 @router.post("/crear", response_model=InvoiceOut, status_code=status.HTTP_201_CREATED)
-def create_invoice(payload: InvoiceCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def create_invoice(payload: InvoiceCreate, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
     invoice = Invoice(client_id=payload.client_id, date=payload.date, total=payload.total)
     db.add(invoice)
     db.commit()
@@ -22,24 +24,36 @@ def create_invoice(payload: InvoiceCreate, db: Session = Depends(get_db), user=D
     return invoice
 
 # Listar facturas (opcional filter: paid)
+# payments se carga con selectinload: en async no hay lazy-load y así son 2 consultas en total
 @router.get("/", response_model=List[InvoiceOut])
-def list_invoices(paid: Optional[bool] = None, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    q = db.query(Invoice)
+async def list_invoices(paid: Optional[bool] = None, db: AsyncSession = Depends(get_async_read_db), user=Depends(get_current_user)):
+    q = select(Invoice).options(selectinload(Invoice.payments))
     if paid is not None:
-        q = q.filter(Invoice.paid == paid)
-    return q.all()
+        q = q.where(Invoice.paid == paid)
+    result = await db.execute(q)
+    return result.scalars().all()
+
+# Listar pagos (por factura o global)
+# (declarado antes de /{invoice_id} para que "payments" no se interprete como id)
+@router.get("/payments", response_model=List[PaymentOut])
+async def list_payments(invoice_id: Optional[int] = None, db: AsyncSession = Depends(get_async_read_db), user=Depends(get_current_user)):
+    q = select(Payment)
+    if invoice_id is not None:
+        q = q.where(Payment.invoice_id == invoice_id)
+    result = await db.execute(q)
+    return result.scalars().all()
 
 # Obtener factura por id
 @router.get("/{invoice_id}", response_model=InvoiceOut)
-def get_invoice(invoice_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    inv = db.get(Invoice, invoice_id)
+async def get_invoice(invoice_id: int, db: AsyncSession = Depends(get_async_read_db), current_user=Depends(get_current_user)):
+    inv = await db.get(Invoice, invoice_id, options=[selectinload(Invoice.payments)])
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return inv
 
 # Actualizar factura (marcar pagada, ajustar total)
 @router.put("/{invoice_id}", response_model=InvoiceOut)
-def update_invoice(invoice_id: int, payload: InvoiceUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def update_invoice(invoice_id: int, payload: InvoiceUpdate, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
     inv = db.get(Invoice, invoice_id)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -54,7 +68,7 @@ def update_invoice(invoice_id: int, payload: InvoiceUpdate, db: Session = Depend
 
 # Registrar pago para una factura
 @router.post("/{invoice_id}/payments", response_model=PaymentOut, status_code=status.HTTP_201_CREATED)
-def create_payment(invoice_id: int, payload: PaymentCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def create_payment(invoice_id: int, payload: PaymentCreate, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
     inv = db.get(Invoice, invoice_id)
     if not inv:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -64,9 +78,7 @@ def create_payment(invoice_id: int, payload: PaymentCreate, db: Session = Depend
     db.commit()
     db.refresh(payment)
 
-    # actualizar estado invoice si suma pagos >= total
-    total_payments = sum(p.amount for p in inv.payments)  # inv.payments puede no actualizarse inmediatamente
-    # recalc desde DB
+    # actualizar estado invoice si suma pagos >= total (recalc desde DB)
     from sqlalchemy import func
     paid_sum = db.query(func.coalesce(func.sum(Payment.amount), 0.0)).filter(Payment.invoice_id == invoice_id).scalar()
     if paid_sum >= (inv.total or 0):
@@ -76,11 +88,3 @@ def create_payment(invoice_id: int, payload: PaymentCreate, db: Session = Depend
         db.refresh(inv)
 
     return payment
-
-# Listar pagos (por factura o global)
-@router.get("/payments", response_model=List[PaymentOut])
-def list_payments(invoice_id: Optional[int] = None, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    q = db.query(Payment)
-    if invoice_id is not None:
-        q = q.filter(Payment.invoice_id == invoice_id)
-    return q.all()
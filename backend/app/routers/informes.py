@@ -4,14 +4,14 @@ from sqlalchemy import func
 from datetime import datetime
 from typing import List, Dict, Any
 
-from ..database import get_db
+from ..database import get_read_db
 from ..models.invoice import Invoice
 from ..utils.security import get_current_user
 
 router = APIRouter(prefix="/informes", tags=["informes"])
 
 @router.get("/ingresos")
-def get_ingresos(fecha_inicio: str, fecha_fin: str, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def get_ingresos(fecha_inicio: str, fecha_fin: str, db: Session = Depends(get_read_db), user=Depends(get_current_user)):
     """
     fecha_inicio, fecha_fin: ISO dates YYYY-MM-DD
     Returns:
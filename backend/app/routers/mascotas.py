@@ -1,36 +1,91 @@
 # backend/app/routers/mascotas.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime
 
-from ..database import get_db
+from ..database import get_write_db, get_async_read_db
+from ..models.client import Client
+from ..models.history import MedicalHistory
 from ..models.pet import Pet  # archivo app/models/pet.py
-from ..schemas.pet import PetCreate, PetRead, PetUpdate
-from ..utils.security import get_current_user
+from ..schemas.history import HistoryCreate, HistoryOut, HistorySearchHit, HistorySummary
+from ..schemas.pet import (
+    PetBulkResponse, PetBulkResult, PetBulkUpdate, PetCreate, PetListItem, PetRead, PetUpdate,
+)
+from ..utils.availability import touch_pet_schedules
+from ..utils.search import history_search_statement
+from ..utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, set_next_cursor
+from ..utils.security import get_current_user, require_any_role
+from ..utils.validation import validation_message
 
 router = APIRouter(prefix="/mascotas", tags=["mascotas"])
 
+# elementos como máximo por petición en /mascotas/bulk
+MAX_BULK_ITEMS = 1000
+
 
 def _assert_admin_or_recep(user):
-    if not user or not getattr(user, "role", None) or user.role.name not in ("admin", "receptionist"):
+    if not user or user.role_name not in ("admin", "receptionist"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
 
-@router.get("/", response_model=List[PetRead])
-def list_pets(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    pets = db.query(Pet).order_by(Pet.id).all()
-    return pets
+# Listado paginado por id (cabecera X-Next-Cursor) con filtros; include=owner añade owner_name
+# con un JOIN en la misma consulta
+@router.get("/", response_model=List[PetListItem])
+async def list_pets(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    owner_id: Optional[int] = None,
+    species: Optional[str] = None,
+    breed: Optional[str] = None,
+    age_min: Optional[int] = Query(None, ge=0),
+    age_max: Optional[int] = Query(None, ge=0),
+    include: Optional[str] = Query(None, pattern="^owner$", description="owner: añade owner_name"),
+    db: AsyncSession = Depends(get_async_read_db),
+    user=Depends(get_current_user),
+):
+    with_owner = include == "owner"
+    q = select(Pet, Client.name).outerjoin(Client, Client.id == Pet.owner_id) if with_owner else select(Pet)
+    after = decode_cursor(cursor)
+    if after is not None:
+        if not isinstance(after.get("id"), int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        q = q.where(Pet.id > after["id"])
+    if owner_id is not None:
+        q = q.where(Pet.owner_id == owner_id)
+    if species:
+        q = q.where(Pet.species == species)
+    if breed:
+        q = q.where(Pet.breed == breed)
+    if age_min is not None:
+        q = q.where(Pet.age >= age_min)
+    if age_max is not None:
+        q = q.where(Pet.age <= age_max)
+    result = await db.execute(q.order_by(Pet.id).limit(limit + 1))
+
+    if with_owner:
+        rows = [PetListItem.model_validate(pet, from_attributes=True).model_copy(update={"owner_name": name})
+                for pet, name in result.all()]
+    else:
+        rows = result.scalars().all()
+    return set_next_cursor(response, rows, limit, lambda p: {"id": p.id})
 
 
 @router.post("/", response_model=PetRead, status_code=status.HTTP_201_CREATED)
-def create_pet(payload: PetCreate, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    # basic validation: owner exists? (optional)
+def create_pet(payload: PetCreate, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
+    if db.get(Client, payload.owner_id) is None:
+        raise HTTPException(status_code=400, detail="Owner not found")
     pet = Pet(
-        client_id=payload.client_id,
+        owner_id=payload.owner_id,
         name=payload.name,
         species=payload.species,
         breed=payload.breed,
         age=payload.age,
+        weight=payload.weight,
     )
     db.add(pet)
     db.commit()
@@ -38,21 +93,253 @@ def create_pet(payload: PetCreate, db: Session = Depends(get_db), user=Depends(g
     return pet
 
 
+# ---------------------------------------------------------------------
+# Altas y modificaciones masivas
+# ---------------------------------------------------------------------
+# columnas con las que se casa cada fila del RETURNING con su elemento; weight va aparte porque
+# la columna es entera y la BDD puede redondear el valor enviado
+_BULK_KEY = tuple(c for c in PetCreate.model_fields if c != "weight")
+
+
+def _validate_items(items: List[Dict[str, Any]], schema, results: List[PetBulkResult]):
+    """Valida cada elemento; los erróneos van a results y se devuelven los válidos como (índice, modelo)."""
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Máximo {MAX_BULK_ITEMS} elementos por petición")
+    valid = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as exc:
+            results.append(PetBulkResult(index=index, status="error", error=validation_message(exc)))
+    return valid
+
+
+def _existing_ids(db: Session, column, ids) -> set:
+    ids = {i for i in ids if i is not None}
+    return set(db.execute(select(column).where(column.in_(ids))).scalars()) if ids else set()
+
+
+def _bulk_response(results: List[PetBulkResult]) -> PetBulkResponse:
+    results.sort(key=lambda r: r.index)
+    errors = sum(1 for r in results if r.status == "error")
+    return PetBulkResponse(applied=len(results) - errors, errors=errors, results=results)
+
+
+@router.post("/bulk", response_model=PetBulkResponse)
+def create_pets_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_write_db),
+    user=Depends(require_any_role("admin", "receptionist")),
+):
+    """
+    Alta de varias mascotas: cada elemento se valida con PetCreate, los dueños se comprueban
+    con una sola consulta y las válidas se insertan en una transacción (INSERT multi-fila).
+    """
+    results: List[PetBulkResult] = []
+    valid = _validate_items(items, PetCreate, results)
+    owners = _existing_ids(db, Client.id, (p.owner_id for _, p in valid))
+
+    rows: List[Dict[str, Any]] = []
+    pending: Dict[tuple, List[tuple]] = {}  # contenido de la fila -> [(índice, weight)]
+    for index, pet in valid:
+        if pet.owner_id not in owners:
+            results.append(PetBulkResult(index=index, status="error", error="Owner not found"))
+            continue
+        row = pet.model_dump()
+        rows.append(row)
+        pending.setdefault(tuple(row[c] for c in _BULK_KEY), []).append((index, row["weight"]))
+    if rows:
+        # un único INSERT ... VALUES (...), (...) RETURNING id + columnas: el orden del RETURNING no
+        # está garantizado, así que cada fila devuelta se casa por su contenido (las idénticas son
+        # intercambiables)
+        table = Pet.__table__
+        returned = db.execute(
+            insert(table).values(rows).returning(table.c.id, table.c.weight, *(table.c[c] for c in _BULK_KEY))
+        ).all()
+        db.commit()
+        for row in returned:
+            candidates = pending[tuple(row[2:])]
+            pick = next((k for k, (_, weight) in enumerate(candidates) if weight == row.weight), 0)
+            index, _ = candidates.pop(pick)
+            results.append(PetBulkResult(index=index, id=row.id, status="created"))
+    return _bulk_response(results)
+
+
+@router.patch("/bulk", response_model=PetBulkResponse)
+def update_pets_bulk(
+    items: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_write_db),
+    user=Depends(require_any_role("admin", "receptionist")),
+):
+    """
+    Modificación de varias mascotas ({"id": ..., campos de PetUpdate}). Mascotas y dueños se
+    comprueban con una consulta cada uno y los cambios se aplican en una transacción
+    (UPDATE por lotes, agrupados por conjunto de campos).
+    """
+    results: List[PetBulkResult] = []
+    valid = _validate_items(items, PetBulkUpdate, results)
+    pets = _existing_ids(db, Pet.id, (p.id for _, p in valid))
+    owners = _existing_ids(db, Client.id, (p.owner_id for _, p in valid))
+
+    rows, applied = [], []
+    seen = set()
+    for index, change in valid:
+        values = change.model_dump(exclude_unset=True, exclude_none=True)
+        if change.id not in pets:
+            error = "Pet not found"
+        elif change.id in seen:
+            error = "Mascota repetida en la petición"
+        elif "owner_id" in values and change.owner_id not in owners:
+            error = "Owner not found"
+        elif len(values) == 1:
+            error = "Sin campos que modificar"
+        else:
+            seen.add(change.id)
+            rows.append(values)
+            applied.append(PetBulkResult(index=index, id=change.id, status="updated"))
+            continue
+        results.append(PetBulkResult(index=index, id=change.id, status="error", error=error))
+    if rows:
+        db.execute(update(Pet), rows)
+        # el nombre de la mascota sale en el feed .ics de sus veterinarios
+        touch_pet_schedules(db, (r["id"] for r in rows if "name" in r))
+        db.commit()
+        results.extend(applied)
+    return _bulk_response(results)
+
+
+# ---------------------------------------------------------------------
+# Historial clínico (solo alta: las entradas no se modifican ni se borran)
+# ---------------------------------------------------------------------
+@router.get("/historial/resumen", response_model=List[HistorySummary])
+async def history_summary(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+    user=Depends(get_current_user),
+):
+    """Último diagnóstico de cada mascota de la clínica (una consulta), paginado por pet_id."""
+    latest = (
+        select(
+            MedicalHistory.id,
+            MedicalHistory.pet_id,
+            MedicalHistory.timestamp,
+            MedicalHistory.diagnosis,
+            func.row_number().over(
+                partition_by=MedicalHistory.pet_id,
+                order_by=(MedicalHistory.timestamp.desc(), MedicalHistory.id.desc()),
+            ).label("rn"),
+        )
+        .where(MedicalHistory.diagnosis.isnot(None))
+    )
+    after = decode_cursor(cursor)
+    if after is not None:
+        if not isinstance(after.get("pet_id"), int):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        latest = latest.where(MedicalHistory.pet_id > after["pet_id"])
+    latest = latest.subquery()
+    q = (
+        select(latest.c.pet_id, Pet.name.label("pet_name"), Pet.species, latest.c.id.label("history_id"),
+               latest.c.timestamp, latest.c.diagnosis)
+        .join(Pet, Pet.id == latest.c.pet_id)
+        .where(latest.c.rn == 1)
+        .order_by(latest.c.pet_id)
+        .limit(limit + 1)
+    )
+    rows = (await db.execute(q)).mappings().all()
+    return set_next_cursor(response, list(rows), limit, lambda r: {"pet_id": r["pet_id"]})
+
+
+@router.get("/historial/buscar", response_model=List[HistorySearchHit])
+async def search_history(
+    q: str = Query(..., min_length=1, description='Palabras, "frases exactas" y prefijos (fractur*)'),
+    species: Optional[str] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_read_db),
+    user=Depends(get_current_user),
+):
+    """Búsqueda en diagnóstico, tratamiento y observaciones, ordenada por relevancia."""
+    stmt = history_search_statement(db.bind.dialect.name, q, limit, species, fecha_inicio, fecha_fin)
+    if stmt is None:
+        return []
+    return (await db.execute(stmt)).mappings().all()
+
+
+@router.get("/{pet_id}/historial", response_model=List[HistoryOut])
+async def list_pet_history(
+    pet_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+    user=Depends(get_current_user),
+):
+    """Historial de la mascota, más reciente primero; keyset sobre (timestamp, id)."""
+    q = select(MedicalHistory).where(MedicalHistory.pet_id == pet_id)
+    after = decode_cursor(cursor)
+    if after is not None:
+        try:
+            ts, last_id = datetime.fromisoformat(after["ts"]), int(after["id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        q = q.where(tuple_(MedicalHistory.timestamp, MedicalHistory.id) < (ts, last_id))
+    result = await db.execute(
+        q.order_by(MedicalHistory.timestamp.desc(), MedicalHistory.id.desc()).limit(limit + 1)
+    )
+    rows = result.scalars().all()
+    if not rows and after is None and await db.get(Pet, pet_id) is None:
+        raise HTTPException(status_code=404, detail="Pet not found")
+    return set_next_cursor(response, rows, limit, lambda h: {"ts": h.timestamp.isoformat(), "id": h.id})
+
+
+@router.post("/{pet_id}/historial", response_model=HistoryOut, status_code=status.HTTP_201_CREATED)
+def create_pet_history(
+    pet_id: int,
+    payload: HistoryCreate,
+    db: Session = Depends(get_write_db),
+    user=Depends(require_any_role("admin", "veterinarian")),
+):
+    pet = db.get(Pet, pet_id)
+    if not pet:
+        raise HTTPException(status_code=404, detail="Pet not found")
+    if pet.owner_id is None:
+        raise HTTPException(status_code=400, detail="Pet has no owner")
+    entry = MedicalHistory(
+        client_id=pet.owner_id,
+        pet_id=pet.id,
+        event=payload.event,
+        timestamp=payload.date or datetime.utcnow(),
+        diagnosis=payload.diagnosis,
+        treatment=payload.treatment,
+        observations=payload.observations,
+        created_by=payload.created_by or user.full_name or user.email,
+    )
+    db.add(entry)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
 @router.get("/{pet_id}", response_model=PetRead)
-def read_pet(pet_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    pet = db.query(Pet).filter(Pet.id == pet_id).first()
+async def read_pet(pet_id: int, db: AsyncSession = Depends(get_async_read_db), user=Depends(get_current_user)):
+    pet = await db.get(Pet, pet_id)
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
     return pet
 
 
 @router.put("/{pet_id}", response_model=PetRead)
-def update_pet(pet_id: int, payload: PetUpdate, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def update_pet(pet_id: int, payload: PetUpdate, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
     pet = db.query(Pet).filter(Pet.id == pet_id).first()
     if not pet:
         raise HTTPException(status_code=404, detail="Pet not found")
-    if payload.client_id is not None:
-        pet.client_id = payload.client_id
+    if payload.owner_id is not None:
+        if db.get(Client, payload.owner_id) is None:
+            raise HTTPException(status_code=400, detail="Owner not found")
+        pet.owner_id = payload.owner_id
     if payload.name is not None:
         pet.name = payload.name
     if payload.species is not None:
@@ -61,6 +348,8 @@ def update_pet(pet_id: int, payload: PetUpdate, db: Session = Depends(get_db), u
         pet.breed = payload.breed
     if payload.age is not None:
         pet.age = payload.age
+    if payload.weight is not None:
+        pet.weight = payload.weight
     db.add(pet)
     db.commit()
     db.refresh(pet)
@@ -68,7 +357,7 @@ def update_pet(pet_id: int, payload: PetUpdate, db: Session = Depends(get_db), u
 
 
 @router.delete("/{pet_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_pet(pet_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def delete_pet(pet_id: int, db: Session = Depends(get_write_db), user=Depends(get_current_user)):
     """
     Borrar mascota: admin o receptionist.
     """
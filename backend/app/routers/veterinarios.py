@@ -0,0 +1,92 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import get_async_read_db, get_write_db
+from ..models.appointment import Appointment
+from ..models.user import Role, User
+from ..models.veterinarian import Veterinarian
+from ..schemas.veterinarian import VeterinarianCreate, VeterinarianOut, VeterinarianUpdate
+from ..utils.availability import touch_schedules
+from ..utils.schedule_cache import invalidate_veterinarian
+from ..utils.security import get_current_user, require_any_role
+
+router = APIRouter(prefix="/veterinarios", tags=["veterinarios"])
+
+
+def _apply(vet: Veterinarian, data: dict) -> None:
+    if "work_days" in data:
+        data["work_days"] = ",".join(str(d) for d in sorted(set(data["work_days"])))
+    for k, v in data.items():
+        setattr(vet, k, v)
+    if vet.work_start and vet.work_end and vet.work_start >= vet.work_end:
+        raise HTTPException(status_code=400, detail="work_start must be before work_end")
+
+
+def _check_unique_name(db: Session, name: str, vet_id: int = None) -> None:
+    q = db.query(Veterinarian.id).filter(Veterinarian.name == name)
+    if vet_id is not None:
+        q = q.filter(Veterinarian.id != vet_id)
+    if q.first():
+        raise HTTPException(status_code=409, detail="A veterinarian with that name already exists")
+
+
+# Listar veterinarios (autenticado)
+@router.get("/", response_model=List[VeterinarianOut])
+async def list_veterinarians(db: AsyncSession = Depends(get_async_read_db), user=Depends(get_current_user)):
+    result = await db.execute(select(Veterinarian).order_by(Veterinarian.name))
+    return result.scalars().all()
+
+
+# Alta de veterinario para un usuario con rol veterinarian (solo admin)
+@router.post("/", response_model=VeterinarianOut, status_code=status.HTTP_201_CREATED)
+def create_veterinarian(payload: VeterinarianCreate, db: Session = Depends(get_write_db),
+                        user=Depends(require_any_role("admin"))):
+    row = (
+        db.query(User, Role.name)
+        .outerjoin(Role, User.role_id == Role.id)
+        .filter(User.id == payload.user_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    account, role_name = row
+    if role_name != "veterinarian":
+        raise HTTPException(status_code=400, detail="User does not have the veterinarian role")
+    if db.query(Veterinarian.id).filter(Veterinarian.user_id == account.id).first():
+        raise HTTPException(status_code=409, detail="User is already a veterinarian")
+
+    data = payload.model_dump(exclude_none=True)
+    data.setdefault("name", account.full_name or account.email)
+    _check_unique_name(db, data["name"])
+    vet = Veterinarian()
+    _apply(vet, data)
+    db.add(vet)
+    db.commit()
+    db.refresh(vet)
+    return vet
+
+
+# Horario, nombre o baja (solo admin)
+@router.patch("/{vet_id}", response_model=VeterinarianOut)
+def update_veterinarian(vet_id: int, payload: VeterinarianUpdate, db: Session = Depends(get_write_db),
+                        user=Depends(require_any_role("admin"))):
+    vet = db.get(Veterinarian, vet_id)
+    if not vet:
+        raise HTTPException(status_code=404, detail="Veterinarian not found")
+    data = payload.model_dump(exclude_none=True)
+    renamed = "name" in data and data["name"] != vet.name
+    if renamed:
+        _check_unique_name(db, data["name"], vet_id)
+        # las citas guardan una copia del nombre
+        db.execute(update(Appointment).where(Appointment.veterinarian_id == vet_id).values(veterinarian=data["name"]))
+        touch_schedules(db, [vet_id])  # el nombre sale en su feed .ics
+    _apply(vet, data)
+    db.commit()
+    if renamed:
+        invalidate_veterinarian(vet_id)
+    db.refresh(vet)
+    return vet
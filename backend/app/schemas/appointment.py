@@ -1,11 +1,16 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
+from ..models.appointment import DEFAULT_APPOINTMENT_MINUTES
+from ..utils.availability import MAX_APPOINTMENT_MINUTES
+
 class AppointmentBase(BaseModel):
     date: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_MINUTES)
     reason: Optional[str] = None
-    veterinarian: Optional[str] = None
+    veterinarian_id: Optional[int] = None
+    veterinarian: Optional[str] = None  # nombre; en altas y cambios se acepta en lugar de veterinarian_id
     pet_id: Optional[int] = None
     client_id: Optional[int] = None
 
@@ -13,16 +18,71 @@ class AppointmentBase(BaseModel):
 
 class AppointmentCreate(AppointmentBase):
     date: datetime
+    duration_minutes: int = Field(DEFAULT_APPOINTMENT_MINUTES, gt=0, le=MAX_APPOINTMENT_MINUTES)
     pet_id: int
     client_id: int
 
 class AppointmentUpdate(BaseModel):
     date: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_MINUTES)
     reason: Optional[str] = None
+    veterinarian_id: Optional[int] = None
     veterinarian: Optional[str] = None
 
     model_config = {"from_attributes": True}
 
 class AppointmentOut(AppointmentBase):
     id: int
+    series_id: Optional[int] = None
+    model_config = {"from_attributes": True}
+
+
+# Disponibilidad (GET /citas/disponibilidad)
+class TimeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+class BusySlot(TimeSlot):
+    id: int
+
+class Availability(BaseModel):
+    veterinarian_id: int
+    veterinarian: str
+    start: datetime
+    end: datetime
+    duration_minutes: int
+    free: List[TimeSlot]
+    busy: List[BusySlot]
+
+
+
+# Series de citas periódicas (/citas/series)
+class SeriesCreate(BaseModel):
+    rrule: str  # p. ej. "FREQ=WEEKLY;COUNT=52" (ver utils/recurrence.py)
+    start: datetime  # primera cita
+    duration_minutes: int = Field(DEFAULT_APPOINTMENT_MINUTES, gt=0, le=MAX_APPOINTMENT_MINUTES)
+    reason: Optional[str] = None
+    veterinarian_id: Optional[int] = None
+    veterinarian: Optional[str] = None
+    pet_id: int
+    client_id: int
+
+class SeriesUpdate(BaseModel):
+    shift_minutes: Optional[int] = None  # mueve cada cita (negativo: antes)
+    duration_minutes: Optional[int] = Field(None, gt=0, le=MAX_APPOINTMENT_MINUTES)
+    reason: Optional[str] = None
+    veterinarian_id: Optional[int] = None
+    veterinarian: Optional[str] = None
+
+class SeriesOut(BaseModel):
+    id: int
+    rrule: str
+    start: datetime
+    duration_minutes: int
+    reason: Optional[str] = None
+    veterinarian_id: int
+    pet_id: Optional[int] = None
+    client_id: Optional[int] = None
+    appointments: List[AppointmentOut]
+
     model_config = {"from_attributes": True}
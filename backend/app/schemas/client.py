@@ -1,6 +1,11 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
+from .appointment import AppointmentOut
+from .history import HistoryOut
+from .invoice import InvoiceOut
+from .pet import PetRead
+
 class ClientBase(BaseModel):
     dni: str
     name: str
@@ -20,4 +25,33 @@ class ClientRead(ClientBase):
     id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ClientImportError(BaseModel):
+    row: int
+    dni: Optional[str] = None
+    error: str
+
+class ClientImportReport(BaseModel):
+    total: int
+    inserted: int
+    existing: int
+    error_count: int
+    errors: List[ClientImportError]
+    errors_truncated: bool
+    aborted_at: Optional[int] = None  # línea en la que el fichero dejó de poderse leer
+    seconds: float
+    rows_per_second: float
+
+
+class OpenInvoice(InvoiceOut):
+    paid_amount: float
+    pending_amount: float
+
+class ClientOverview(ClientRead):
+    address: Optional[str] = None
+    subscription_id: Optional[int] = None
+    pets: List[PetRead]
+    upcoming_appointments: List[AppointmentOut]
+    open_invoices: List[OpenInvoice]
+    recent_history: List[HistoryOut]
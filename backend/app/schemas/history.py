@@ -3,6 +3,7 @@ from typing import Optional
 from datetime import datetime
 
 class HistoryBase(BaseModel):
+    event: Optional[str] = None
     diagnosis: Optional[str] = None
     treatment: Optional[str] = None
     observations: Optional[str] = None
@@ -14,7 +15,23 @@ class HistoryCreate(HistoryBase):
 class HistoryOut(HistoryBase):
     id: int
     pet_id: int
-    date: datetime
+    client_id: int
+    timestamp: datetime
 
     class Config:
         orm_mode = True
+
+
+class HistorySummary(BaseModel):
+    """Último diagnóstico de una mascota (resumen de toda la clínica)."""
+    pet_id: int
+    pet_name: str
+    species: Optional[str] = None
+    history_id: int
+    timestamp: datetime
+    diagnosis: str
+
+
+class HistorySearchHit(HistoryOut):
+    pet_name: str
+    species: Optional[str] = None
@@ -3,6 +3,8 @@ from typing import Optional, List
 from pydantic import BaseModel, ConfigDict, Field
 from datetime import date
 
+from .payment import PaymentOut
+
 
 class InvoiceBase(BaseModel):
     client_id: int
@@ -31,4 +33,4 @@ class InvoiceUpdate(BaseModel):
 
 class InvoiceOut(InvoiceBase):
     id: int
-    payments: List[dict] = Field(default_factory=list)
\ No newline at end of file
+    payments: List[PaymentOut] = Field(default_factory=list)
\ No newline at end of file
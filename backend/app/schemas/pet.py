@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
 class PetBase(BaseModel):
@@ -25,4 +25,22 @@ class PetRead(PetBase):
     id: int
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class PetListItem(PetRead):
+    owner_name: Optional[str] = None  # solo con include=owner
+
+
+class PetBulkUpdate(PetUpdate):
+    id: int
+
+class PetBulkResult(BaseModel):
+    index: int                     # posición en el array recibido
+    id: Optional[int] = None
+    status: Literal["created", "updated", "error"]
+    error: Optional[str] = None
+
+class PetBulkResponse(BaseModel):
+    applied: int
+    errors: int
+    results: List[PetBulkResult]
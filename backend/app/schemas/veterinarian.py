@@ -0,0 +1,45 @@
+from datetime import time
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+class VeterinarianBase(BaseModel):
+    name: Optional[str] = None
+    work_start: Optional[time] = None
+    work_end: Optional[time] = None
+    work_days: Optional[List[int]] = Field(None, description="días ISO: 1 = lunes ... 7 = domingo")
+    active: Optional[bool] = None
+
+    @field_validator("work_days")
+    @classmethod
+    def _valid_days(cls, days):
+        if days is not None and (not days or any(d < 1 or d > 7 for d in days)):
+            raise ValueError("work_days must be a non-empty list of ISO weekdays (1-7)")
+        return days
+
+    @model_validator(mode="after")
+    def _valid_hours(self):
+        if self.work_start and self.work_end and self.work_start >= self.work_end:
+            raise ValueError("work_start must be before work_end")
+        return self
+
+class VeterinarianCreate(VeterinarianBase):
+    user_id: int  # usuario con rol veterinarian; name por defecto su full_name
+
+class VeterinarianUpdate(VeterinarianBase):
+    pass
+
+class VeterinarianOut(BaseModel):
+    id: int
+    user_id: Optional[int] = None
+    name: str
+    work_start: time
+    work_end: time
+    work_days: List[int]
+    active: bool
+
+    model_config = {"from_attributes": True}
+
+    @field_validator("work_days", mode="before")
+    @classmethod
+    def _split_days(cls, days):
+        return sorted(int(d) for d in days.split(",") if d) if isinstance(days, str) else days
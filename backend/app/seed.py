@@ -4,6 +4,7 @@ from .models.client import Client, SubscriptionPlan
 from .models.pet import Pet
 from .models.user import User, Role
 from .models.appointment import Appointment
+from .models.veterinarian import Veterinarian
 from .models.invoice import Invoice
 from .models.payment import Payment
 from .models.history import MedicalHistory as History
@@ -12,9 +13,10 @@ from datetime import datetime, timedelta
 
 def create_all():
     """
-    Crea las tablas (usa el Base de app.database).
+    Crea/actualiza las tablas aplicando las migraciones pendientes.
     """
-    Base.metadata.create_all(bind=engine)
+    from .migrations import run_migrations
+    run_migrations(engine)
 
 def seed():
     """
@@ -57,6 +59,12 @@ def seed():
         admin = ensure_user("admin@example.com", "adminpass", "Admin Clinica", "admin")
         recep = ensure_user("recep@example.com", "receppass", "Recepcion", "receptionist")
         vet = ensure_user("vet@example.com", "vetpass", "Dr. Veterinario", "veterinarian")
+        vet_profile = db.query(Veterinarian).filter_by(user_id=vet.id).first()
+        if not vet_profile:
+            vet_profile = Veterinarian(user_id=vet.id, name=vet.full_name)
+            db.add(vet_profile)
+            db.commit()
+            db.refresh(vet_profile)
 
         # ---------- SUBSCRIPTION PLANS ----------
         existing_plans = {p.name for p in db.query(SubscriptionPlan).all()}
@@ -106,15 +114,16 @@ def seed():
             ap = db.query(Appointment).filter_by(date=date_dt, pet_id=pet_id).first()
             if ap:
                 return ap
-            a = Appointment(date=date_dt, reason=reason, veterinarian=veterinarian, pet_id=pet_id, client_id=client_id)
+            a = Appointment(date=date_dt, reason=reason, veterinarian_id=veterinarian.id, veterinarian=veterinarian.name,
+                            pet_id=pet_id, client_id=client_id)
             db.add(a)
             db.commit()
             db.refresh(a)
             return a
 
         now = datetime.utcnow()
-        ap1 = ensure_appointment(now + timedelta(days=1), "Consulta general", "Dr. Veterinario", pet1.id, c1.id)
-        ap2 = ensure_appointment(now + timedelta(days=2, hours=2), "Revisión vacuna", "Dr. Veterinario", pet2.id, c2.id)
+        ap1 = ensure_appointment(now + timedelta(days=1), "Consulta general", vet_profile, pet1.id, c1.id)
+        ap2 = ensure_appointment(now + timedelta(days=2, hours=2), "Revisión vacuna", vet_profile, pet2.id, c2.id)
 
         # ---------- INVOICES & PAYMENTS ----------
         def ensure_invoice(client_id, date_dt, total, paid=False):
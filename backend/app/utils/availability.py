@@ -0,0 +1,302 @@
+"""
+Disponibilidad de veterinarios: índice de intervalos por veterinario.
+
+Cada cita ocupa [date, date + duration_minutes). VetSchedule guarda las citas de un
+veterinario en una ventana de fechas ordenadas por inicio, junto con el máximo acumulado
+de los finales; con eso, saber si un intervalo choca con alguna cita es una búsqueda
+binaria (O(log n)) aunque haya citas antiguas solapadas entre sí, y listar los choques
+cuesta O(log n + k).
+
+Las citas se cargan con un rango sobre ix_appointments_veterinarian_id_date. Como la
+duración está acotada (MAX_APPOINTMENT_MINUTES), basta con empezar a leer
+MAX_APPOINTMENT_MINUTES antes de la ventana para ver las citas que entran en ella.
+
+Reservas concurrentes (book): comprobar solapamientos y luego insertar no es atómico, así
+que cada reserva lee la versión de la agenda del veterinario (veterinarians.schedule_version), comprueba,
+escribe la cita y la incrementa con UPDATE ... WHERE version = <leída> en la misma transacción.
+Si otra reserva del mismo veterinario se confirmó entre medias, el UPDATE no afecta a ninguna
+fila: se deshace y se repite la comprobación, que ya ve la cita nueva. Solo compiten las
+reservas del mismo veterinario y no hay bloqueos en la aplicación.
+
+Cualquier otro cambio de sus citas hecho con el ORM (mover una cita a otro veterinario, cambiar
+el motivo, borrarla) también sube la versión al hacer flush (touch_schedules), junto con
+schedule_changed_at: el feed .ics la usa como ETag. Como el feed lleva el nombre de la mascota,
+renombrar una mascota sube la versión de los veterinarios con citas suyas (touch_pet_schedules).
+Los cambios masivos fuera del ORM deben llamar a touch_schedules / touch_pet_schedules.
+"""
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, timezone
+from itertools import chain
+from typing import AbstractSet, Callable, Iterable, List, NamedTuple, Optional, TypeVar
+
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+
+from ..models.appointment import DEFAULT_APPOINTMENT_MINUTES, Appointment
+from ..models.pet import Pet
+from ..models.veterinarian import Veterinarian
+
+MAX_APPOINTMENT_MINUTES = 8 * 60
+# ventana máxima de GET /citas/disponibilidad
+MAX_AVAILABILITY_DAYS = 366
+# intentos de book() cuando otra reserva del mismo veterinario gana la carrera
+BOOKING_ATTEMPTS = 3
+# Session.info: veterinarios cuya versión sube book() (el flush no debe tocarla)
+_BOOKING_KEY = "booking_veterinarians"
+
+T = TypeVar("T")
+
+
+class ScheduleConflict(Exception):
+    """La cita se solapa con otra del veterinario, o su agenda cambió en todos los intentos."""
+
+    def __init__(self, message: str, conflicts: Iterable["Interval"] = ()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+
+class Interval(NamedTuple):
+    start: datetime
+    end: datetime
+    id: Optional[int] = None
+
+
+def naive_utc(dt: datetime) -> datetime:
+    """Las fechas se guardan sin zona (UTC); una fecha con zona se pasa a UTC sin zona."""
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def appointment_end(start: datetime, duration_minutes: Optional[int]) -> datetime:
+    return start + timedelta(minutes=duration_minutes or DEFAULT_APPOINTMENT_MINUTES)
+
+
+class VetSchedule:
+    """Citas de un veterinario en [start, end), ordenadas por inicio."""
+
+    def __init__(self, start: datetime, end: datetime, intervals: Iterable[Interval] = ()):
+        self.start = start
+        self.end = end
+        self.intervals: List[Interval] = sorted(intervals)
+        self._starts = [i.start for i in self.intervals]
+        # _max_end[k] = mayor final entre intervals[0..k]
+        self._max_end: List[datetime] = []
+        for interval in self.intervals:
+            self._max_end.append(max(interval.end, self._max_end[-1]) if self._max_end else interval.end)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def is_free(self, start: datetime, end: datetime) -> bool:
+        """True si [start, end) no se solapa con ninguna cita. O(log n)."""
+        k = bisect_left(self._starts, end)  # citas que empiezan antes de end
+        return k == 0 or self._max_end[k - 1] <= start
+
+    def conflicts(self, start: datetime, end: datetime, exclude_id: Optional[int] = None) -> List[Interval]:
+        """Citas que se solapan con [start, end), en orden de inicio."""
+        found = []
+        k = bisect_left(self._starts, end) - 1
+        # hacia atrás mientras alguna cita anterior pueda terminar después de start
+        while k >= 0 and self._max_end[k] > start:
+            interval = self.intervals[k]
+            if interval.end > start and interval.id != exclude_id:
+                found.append(interval)
+            k -= 1
+        found.reverse()
+        return found
+
+    def busy(self) -> List[Interval]:
+        """Citas que ocupan algún tramo de la ventana."""
+        return [i for i in self.intervals if i.end > self.start and i.start < self.end]
+
+    def free_slots(self, duration: timedelta, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> List[Interval]:
+        """Huecos libres de al menos `duration` en [start, end) (por defecto, la ventana), en orden."""
+        start = self.start if start is None else start
+        end = self.end if end is None else end
+        slots = []
+        k = bisect_left(self._starts, start)
+        cursor = max(start, self._max_end[k - 1]) if k else start
+        while k < len(self.intervals) and self.intervals[k].start < end:
+            interval = self.intervals[k]
+            if interval.start - cursor >= duration:
+                slots.append(Interval(cursor, interval.start))
+            cursor = max(cursor, interval.end)
+            k += 1
+        if end - cursor >= duration:
+            slots.append(Interval(cursor, end))
+        return slots
+
+
+def working_windows(start: datetime, end: datetime, work_start: time, work_end: time,
+                    weekdays: AbstractSet[int]) -> List[Interval]:
+    """Tramos de [start, end) dentro del horario de consulta (weekdays: días ISO, 1 = lunes)."""
+    windows = []
+    day = start.date()
+    while datetime.combine(day, time.min) < end:
+        if day.isoweekday() in weekdays:
+            opens = max(start, datetime.combine(day, work_start))
+            closes = min(end, datetime.combine(day, work_end))
+            if opens < closes:
+                windows.append(Interval(opens, closes))
+        day += timedelta(days=1)
+    return windows
+
+
+def schedule_statement(veterinarian_id: int, start: datetime, end: datetime):
+    """Citas del veterinario que pueden solaparse con [start, end): un rango sobre (veterinarian_id, date)."""
+    return (
+        select(Appointment.id, Appointment.date, Appointment.duration_minutes)
+        .where(
+            Appointment.veterinarian_id == veterinarian_id,
+            Appointment.date >= naive_utc(start) - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+            Appointment.date < naive_utc(end),
+        )
+        .order_by(Appointment.date)
+    )
+
+
+def build_schedule(rows, start: datetime, end: datetime) -> VetSchedule:
+    """VetSchedule a partir de las filas (id, date, duration_minutes) de schedule_statement."""
+    return VetSchedule(
+        naive_utc(start), naive_utc(end),
+        (Interval(naive_utc(d), appointment_end(naive_utc(d), m), i) for i, d, m in rows),
+    )
+
+
+def load_schedule(db: Session, veterinarian_id: int, start: datetime, end: datetime) -> VetSchedule:
+    return build_schedule(db.execute(schedule_statement(veterinarian_id, start, end)).all(), start, end)
+
+
+def find_conflicts(
+    db: Session,
+    veterinarian_id: int,
+    start: datetime,
+    duration_minutes: Optional[int],
+    exclude_id: Optional[int] = None,
+) -> List[Interval]:
+    """Citas del veterinario que se solapan con la nueva cita (excluyendo exclude_id). Siempre lee la BDD."""
+    start = naive_utc(start)
+    end = appointment_end(start, duration_minutes)
+    return load_schedule(db, veterinarian_id, start, end).conflicts(start, end, exclude_id)
+
+
+# ---------------------------------------------------------------------
+# Reservas (control optimista por veterinario)
+# ---------------------------------------------------------------------
+def schedule_version(db: Session, veterinarian_id: int) -> int:
+    return db.execute(select(Veterinarian.schedule_version).where(Veterinarian.id == veterinarian_id)).scalar_one()
+
+
+def claim_schedule(db: Session, veterinarian_id: int, version: int) -> bool:
+    """Incrementa la versión si sigue siendo `version`; False si otra reserva llegó antes."""
+    table = Veterinarian.__table__
+    result = db.execute(
+        update(table)
+        .where(table.c.id == veterinarian_id, table.c.schedule_version == version)
+        .values(schedule_version=version + 1, schedule_changed_at=datetime.utcnow())
+    )
+    return result.rowcount == 1
+
+
+def touch_schedules(db, veterinarian_ids: Iterable[int]) -> None:
+    """Sube la versión de la agenda sin comprobarla (cambios que no reservan). db: Session o Connection."""
+    ids = sorted({v for v in veterinarian_ids if v is not None})
+    if ids:
+        table = Veterinarian.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id.in_(ids))
+            .values(schedule_version=table.c.schedule_version + 1, schedule_changed_at=datetime.utcnow())
+        )
+
+
+def touch_pet_schedules(db, pet_ids: Iterable[int]) -> None:
+    """touch_schedules de los veterinarios con citas de esas mascotas (renombradas)."""
+    ids = sorted({p for p in pet_ids if p is not None})
+    if ids:
+        vets = db.execute(select(Appointment.veterinarian_id).where(Appointment.pet_id.in_(ids)).distinct())
+        touch_schedules(db, vets.scalars().all())
+
+
+@event.listens_for(Session, "after_flush")
+def _touch_changed_schedules(session, flush_context):
+    vets, pets = set(), set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Appointment):
+            history = inspect(obj).attrs.veterinarian_id.history
+            vets.update(history.added or history.unchanged or ())
+            vets.update(history.deleted or ())
+        elif isinstance(obj, Pet) and obj in session.dirty and inspect(obj).attrs.name.history.has_changes():
+            pets.add(obj.id)
+    vets -= session.info.get(_BOOKING_KEY, set())
+    if vets:
+        touch_schedules(session.connection(), vets)
+    if pets:
+        touch_pet_schedules(session.connection(), pets)
+
+
+def book(
+    db: Session,
+    veterinarian_id: int,
+    start: datetime,
+    duration_minutes: Optional[int],
+    write: Callable[[], T],
+    exclude_id: Optional[int] = None,
+) -> T:
+    """
+    Reserva [start, start + duration) para el veterinario de forma atómica.
+
+    write() aplica la cita en la sesión (alta o cambios) y devuelve lo que se quiera
+    devolver; se vuelve a llamar en cada intento porque el rollback descarta lo anterior.
+    Confirma la transacción o lanza ScheduleConflict.
+    """
+    start = naive_utc(start)
+    interval = Interval(start, appointment_end(start, duration_minutes))
+    return book_many(db, veterinarian_id, [interval], write, {exclude_id} if exclude_id else frozenset())
+
+
+def series_conflicts(schedule: VetSchedule, intervals: Iterable[Interval],
+                     exclude_ids: AbstractSet[int] = frozenset()) -> List[Interval]:
+    """Intervalos propuestos que chocan con alguna cita de `schedule` (salvo exclude_ids)."""
+    return [
+        interval for interval in intervals
+        if any(c.id not in exclude_ids for c in schedule.conflicts(interval.start, interval.end))
+    ]
+
+
+def book_many(
+    db: Session,
+    veterinarian_id: int,
+    intervals: List[Interval],
+    write: Callable[[], T],
+    exclude_ids: AbstractSet[int] = frozenset(),
+) -> T:
+    """
+    Como book, pero para varios intervalos del mismo veterinario (una serie de citas).
+
+    Todos se comprueban con una sola consulta por rango (del primero al último) y se escriben en
+    la misma transacción: o se reservan todos o ninguno. ScheduleConflict.conflicts lleva los
+    intervalos que chocan.
+    """
+    first = min(i.start for i in intervals)
+    last = max(i.end for i in intervals)
+    for _ in range(BOOKING_ATTEMPTS):
+        version = schedule_version(db, veterinarian_id)
+        conflicts = series_conflicts(load_schedule(db, veterinarian_id, first, last), intervals, exclude_ids)
+        if conflicts:
+            db.rollback()
+            raise ScheduleConflict("Veterinarian already has an appointment at that time", conflicts)
+        booking = db.info.setdefault(_BOOKING_KEY, set())
+        booking.add(veterinarian_id)
+        try:
+            result = write()
+            db.flush()
+        finally:
+            booking.discard(veterinarian_id)
+        if claim_schedule(db, veterinarian_id, version):
+            db.commit()
+            return result
+        db.rollback()
+    raise ScheduleConflict("Veterinarian schedule changed concurrently, please retry")
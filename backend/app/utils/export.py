@@ -0,0 +1,71 @@
+"""
+Serialización en streaming para las exportaciones (CSV / NDJSON, opcionalmente gzip).
+
+Las filas se leen con execution_options(yield_per=...) (cursor de servidor en Postgres,
+fetchmany en SQLite) seleccionando columnas, no entidades ORM, y se escriben por bloques:
+la memoria depende del tamaño del bloque, no del número de filas exportadas.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_YIELD_PER = 1000
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def iter_rows(db, stmt, yield_per: int = EXPORT_YIELD_PER) -> Iterator[Sequence]:
+    """Filas (tuplas) de stmt leídas de yield_per en yield_per."""
+    result = db.execute(stmt.execution_options(yield_per=yield_per))
+    try:
+        for partition in result.partitions():
+            yield from partition
+    finally:
+        result.close()
+
+
+def encode_rows(rows: Iterable[Sequence], columns: Sequence[str], fmt: str,
+                chunk_rows: int = EXPORT_YIELD_PER) -> Iterator[bytes]:
+    """Serializa las filas en bloques de bytes de chunk_rows filas (con cabecera en CSV)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {EXPORT_FORMATS})")
+    buf = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+        def write(row):
+            buf.write(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+            buf.write("\n")
+
+    pending = 0
+    for row in rows:
+        write(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime en streaming con formato gzip (wbits=31)."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
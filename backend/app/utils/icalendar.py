@@ -0,0 +1,76 @@
+"""
+Serialización en streaming de la agenda de un veterinario como iCalendar (RFC 5545).
+
+Como las exportaciones (utils/export.py), las citas llegan como filas de columnas leídas por
+bloques y se escriben en bloques de bytes: la memoria no depende del número de citas.
+Las fechas se guardan en UTC sin zona y se emiten en UTC ("...Z").
+"""
+from datetime import datetime
+from typing import Iterable, Iterator, Mapping
+
+from .availability import appointment_end
+from .export import EXPORT_YIELD_PER
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+PRODID = "-//Clinica Veterinaria//Agenda//ES"
+UID_DOMAIN = "clinica-veterinaria"
+
+
+def ics_datetime(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+def escape_text(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line: str) -> str:
+    """Parte la línea en trozos de como mucho 75 octetos (continuación con un espacio), con CRLF."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:  # no partir un carácter UTF-8
+            end -= 1
+        parts.append(data[start:end].decode())
+        start, limit = end, 74  # las continuaciones empiezan con un espacio
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _event(row: Mapping, dtstamp: str) -> str:
+    summary = row["reason"] or "Cita"
+    if row.get("pet_name"):
+        summary += f" - {row['pet_name']}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:cita-{row['id']}@{UID_DOMAIN}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{ics_datetime(row['date'])}",
+        f"DTEND:{ics_datetime(appointment_end(row['date'], row['duration_minutes']))}",
+        f"SUMMARY:{escape_text(summary)}",
+        "STATUS:CONFIRMED",
+        "END:VEVENT",
+    ]
+    return "".join(fold(line) for line in lines)
+
+
+def encode_calendar(name: str, rows: Iterable[Mapping], last_modified: datetime,
+                    chunk_rows: int = EXPORT_YIELD_PER) -> Iterator[bytes]:
+    """
+    VCALENDAR con un VEVENT por fila (id, date, duration_minutes, reason, pet_name).
+    DTSTAMP es last_modified: el mismo contenido para la misma versión de la agenda (ETag fuerte).
+    """
+    dtstamp = ics_datetime(last_modified)
+    header = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+              f"X-WR-CALNAME:{escape_text(name)}", "X-WR-TIMEZONE:UTC"]
+    chunk = ["".join(fold(line) for line in header)]
+    for row in rows:
+        chunk.append(_event(row, dtstamp))
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk).encode()
+            chunk = []
+    chunk.append(fold("END:VCALENDAR"))
+    yield "".join(chunk).encode()
@@ -0,0 +1,176 @@
+"""
+Métricas en formato de exposición de texto de Prometheus (sin dependencias externas).
+
+MetricsMiddleware registra, por método + router + plantilla de ruta (p. ej. /citas/{cita_id}):
+número de peticiones, histograma de latencia, peticiones en curso y errores por status.
+instrument_pool() añade el tiempo de espera para obtener conexión del pool de SQLAlchemy.
+render() produce el texto que sirve GET /metrics.
+
+Cada familia tiene su propio lock y la sección crítica es un incremento, así que el coste
+por petición es de unos pocos microsegundos.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, k)} {v}" for k, v in sorted(items)]
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        if len(lines) == 2 and not self.labelnames:
+            lines.append(f"{self.name} 0.0")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contador por bucket (no acumulado) ..., +Inf, suma]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == float("inf") else repr(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+# ---------------------------------------------------------------------
+# Métricas de la aplicación
+# ---------------------------------------------------------------------
+REQUESTS = Counter("http_requests_total", "HTTP requests", ("method", "router", "route", "status"))
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "router", "route"))
+IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being served")
+ERRORS = Counter("http_request_errors_total", "HTTP responses with status >= 400", ("status",))
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a connection from the SQLAlchemy pool",
+    ("engine",), buckets=POOL_WAIT_BUCKETS,
+)
+
+REGISTRY = [REQUESTS, LATENCY, IN_PROGRESS, ERRORS, POOL_WAIT]
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def _route_labels(scope) -> Tuple[str, str]:
+    route = scope.get("route")
+    if route is None:
+        return "none", "unmatched"  # 404: no se usa la ruta real para no disparar la cardinalidad
+    tags = getattr(route, "tags", None)
+    return (str(tags[0]) if tags else "root"), route.path
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        IN_PROGRESS.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_PROGRESS.dec()
+            router, route = _route_labels(scope)
+            method = scope.get("method", "")
+            status = str(status_holder[0])
+            REQUESTS.inc((method, router, route, status))
+            LATENCY.observe(elapsed, (method, router, route))
+            if status_holder[0] >= 400:
+                ERRORS.inc((status,))
+
+
+def instrument_pool(engine, name: str = "primary") -> None:
+    """
+    Mide la espera de pool.connect() del engine. Se envuelve la instancia del pool:
+    si se llama a engine.dispose() hay que volver a instrumentarlo.
+    """
+    pool = engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, (name,))
+
+    pool.connect = timed_connect
+    pool._metrics_instrumented = True
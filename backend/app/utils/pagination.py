@@ -0,0 +1,46 @@
+"""
+Helpers de paginación por clave (keyset).
+
+El cursor es opaco para el cliente: JSON en base64url con los valores de la clave de
+ordenación de la última fila devuelta. Los listados devuelven el siguiente cursor en la
+cabecera X-Next-Cursor (ausente en la última página), así el cuerpo sigue siendo la lista.
+"""
+import base64
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Devuelve el dict del cursor o None; 400 si el cursor no es válido."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key) -> list:
+    """
+    rows se ha consultado con LIMIT limit+1: si sobra una fila hay página siguiente.
+    key(row) -> dict con la clave de ordenación. Devuelve las filas de esta página.
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .security import hash_password as _hash_password, verify_password as _verify_password
+
+# ---------------------------------------------------------------------
+# Configuración del pool de hashing
+# ---------------------------------------------------------------------
+# pbkdf2 es CPU puro: se ejecuta en procesos aparte para no competir por el GIL
+# con el resto de endpoints. PASSWORD_POOL_WORKERS=0 lo ejecuta en el hilo de la petición
+# (sin procesos; útil en tests o con un solo núcleo).
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# peticiones en vuelo (ejecutándose + en cola) antes de responder 503
+PASSWORD_POOL_MAX_PENDING = max(1, PASSWORD_POOL_WORKERS) * 8
+
+
+class PoolSaturated(Exception):
+    """La cola del pool de hashing está llena."""
+
+
+class PasswordPool:
+    """
+    Pool de procesos de tamaño fijo con límite de profundidad de cola.
+
+    run() bloquea el hilo llamante (del threadpool de FastAPI) hasta tener el resultado,
+    pero el trabajo de CPU se hace en otro proceso (con workers=0, en el propio hilo). Si ya
+    hay max_pending trabajos en vuelo lanza PoolSaturated sin encolar nada.
+    """
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PoolSaturated()
+            self.pending += 1
+            self.submitted += 1
+            executor = self._get_executor() if self.workers > 0 else None
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = executor.submit(fn, *args).result() if executor else fn(*args)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.pending -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_seconds": (self.total_seconds / done) if done else 0.0,
+                "max_seconds": self.max_seconds,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_pool = PasswordPool()
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password ejecutado en el pool (puede lanzar PoolSaturated)."""
+    return password_pool.run(_verify_password, plain_password, hashed_password)
+
+
+def hash_password(plain_password: str) -> str:
+    """hash_password ejecutado en el pool (puede lanzar PoolSaturated)."""
+    return password_pool.run(_hash_password, plain_password)
@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Any
+
+# ---------------------------------------------------------------------
+# Límites de intentos de login (token bucket)
+# ---------------------------------------------------------------------
+LOGIN_USER_CAPACITY = 10            # ráfaga de intentos por usuario
+LOGIN_USER_PER_SECOND = 10 / 60.0   # recarga: 10 intentos/minuto
+LOGIN_IP_CAPACITY = 50              # ráfaga de intentos por IP
+LOGIN_IP_PER_SECOND = 1.0
+LOGIN_MAX_KEYS = 10000              # claves en memoria por limitador
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket por clave con memoria acotada.
+
+    Cada clave tiene `capacity` fichas que se recargan a `rate` fichas/s. Se guardan como
+    mucho `max_keys` claves en orden LRU; las que llevan inactivas lo bastante para estar
+    llenas se descartan al pasar (equivalen a no existir), y si aún sobran se expulsa la
+    menos reciente.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = LOGIN_MAX_KEYS,
+                 timer: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self._timer = timer
+        self._buckets: "OrderedDict[Hashable, list]" = OrderedDict()  # key -> [tokens, last]
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def _refill_seconds(self) -> float:
+        return self.capacity / self.rate if self.rate > 0 else math.inf
+
+    def _evict(self, now: float) -> None:
+        idle = self._refill_seconds()
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if now - last < idle and len(self._buckets) <= self.max_keys:
+                break
+            del self._buckets[key]
+            self.evictions += 1
+
+    def acquire(self, key: Hashable) -> float:
+        """
+        Consume una ficha de `key`. Devuelve 0 si se permite o los segundos que faltan
+        para tener una ficha si se rechaza.
+        """
+        with self._lock:
+            now = self._timer()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.capacity), now]
+            else:
+                tokens, last = bucket
+                bucket[0] = min(self.capacity, tokens + (now - last) * self.rate)
+                bucket[1] = now
+                self._buckets.move_to_end(key)
+            self._evict(now)
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0.0
+            self.rejected += 1
+            return (1 - bucket[0]) / self.rate if self.rate > 0 else math.inf
+
+    def refund(self, key: Hashable) -> None:
+        """Devuelve una ficha (p. ej. tras un login correcto)."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.capacity, bucket[0] + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "keys": len(self._buckets),
+                "max_keys": self.max_keys,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+            }
+
+
+login_user_limiter = TokenBucketLimiter(LOGIN_USER_CAPACITY, LOGIN_USER_PER_SECOND)
+login_ip_limiter = TokenBucketLimiter(LOGIN_IP_CAPACITY, LOGIN_IP_PER_SECOND)
+
+
+def check_login_allowed(username: str, client_ip: str) -> float:
+    """
+    Consume una ficha de los límites por usuario y por IP.
+    Devuelve 0 si el intento puede seguir o los segundos de espera (Retry-After) si no.
+    """
+    ip_wait = login_ip_limiter.acquire(client_ip)
+    if ip_wait:
+        return ip_wait
+    user_wait = login_user_limiter.acquire(username.lower())
+    if user_wait:
+        login_ip_limiter.refund(client_ip)
+        return user_wait
+    return 0.0
+
+
+def login_succeeded(username: str, client_ip: str) -> None:
+    """Un login correcto no cuenta contra los límites."""
+    login_user_limiter.refund(username.lower())
+    login_ip_limiter.refund(client_ip)
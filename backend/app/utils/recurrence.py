@@ -0,0 +1,133 @@
+"""
+Reglas de repetición de citas (subconjunto de RRULE, RFC 5545).
+
+    FREQ=WEEKLY;INTERVAL=1;COUNT=52;BYDAY=MO,TH
+    FREQ=MONTHLY;UNTIL=20311231
+
+- FREQ: DAILY, WEEKLY o MONTHLY; INTERVAL (por defecto 1).
+- COUNT o UNTIL (al menos uno): la serie siempre es finita y como mucho tiene
+  MAX_SERIES_OCCURRENCES citas.
+- BYDAY solo con WEEKLY (por defecto, el día de la semana de la primera cita).
+- MONTHLY repite el mismo día del mes; los meses que no lo tienen (31 de abril) se saltan.
+Las citas conservan la hora de la primera.
+"""
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+MAX_SERIES_OCCURRENCES = 520  # 10 años semanales
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+class Recurrence(NamedTuple):
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    byday: Tuple[int, ...] = ()  # 0 = lunes
+
+
+def _parse_until(value: str) -> datetime:
+    value = value.rstrip("Z")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            until = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        # UNTIL con solo fecha incluye todo ese día
+        return until if "T" in value else until + timedelta(days=1, microseconds=-1)
+    raise ValueError(f"Invalid UNTIL {value!r} (expected YYYYMMDD or YYYYMMDDTHHMMSSZ)")
+
+
+def parse_rrule(text: str) -> Recurrence:
+    """Lanza ValueError con un mensaje para el cliente si la regla no es válida."""
+    parts = {}
+    for item in text.strip().upper().removeprefix("RRULE:").split(";"):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid rule part {item!r}")
+        parts[key] = value
+    unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY"}
+    if unknown:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unknown))}")
+
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise ValueError("INTERVAL and COUNT must be integers")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+    if count is None and until is None:
+        raise ValueError("The rule needs COUNT or UNTIL")
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = tuple(sorted({WEEKDAYS.index(d) for d in parts["BYDAY"].split(",")}))
+        except ValueError:
+            raise ValueError(f"BYDAY days must be in {', '.join(WEEKDAYS)}")
+    return Recurrence(freq, interval, count, until, byday)
+
+
+def format_rrule(rule: Recurrence) -> str:
+    parts = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        parts.append(f"INTERVAL={rule.interval}")
+    if rule.count is not None:
+        parts.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        parts.append(f"UNTIL={rule.until:%Y%m%dT%H%M%S}Z")
+    if rule.byday:
+        parts.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in rule.byday))
+    return ";".join(parts)
+
+
+def _add_months(day: date, months: int) -> Optional[date]:
+    month = day.month - 1 + months
+    try:
+        return day.replace(year=day.year + month // 12, month=month % 12 + 1)
+    except ValueError:
+        return None  # el mes no tiene ese día
+
+
+def _candidates(rule: Recurrence, start: datetime):
+    """Fechas de la regla en orden, sin límite (las corta occurrences)."""
+    step = 0
+    while True:
+        if rule.freq == "DAILY":
+            yield start + timedelta(days=step * rule.interval)
+        elif rule.freq == "WEEKLY":
+            monday = start - timedelta(days=start.weekday()) + timedelta(weeks=step * rule.interval)
+            for weekday in rule.byday or (start.weekday(),):
+                when = monday + timedelta(days=weekday)
+                if when >= start:
+                    yield when
+        else:
+            day = _add_months(start.date(), step * rule.interval)
+            if day is not None:
+                yield datetime.combine(day, start.time())
+        step += 1
+
+
+def occurrences(rule: Recurrence, start: datetime) -> List[datetime]:
+    """Inicios de las citas de la serie; ValueError si pasan de MAX_SERIES_OCCURRENCES."""
+    found = []
+    for index, when in enumerate(_candidates(rule, start)):
+        if rule.until is not None and when > rule.until:
+            break
+        if rule.count is not None and len(found) == rule.count:
+            break
+        if len(found) == MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"The rule produces more than {MAX_SERIES_OCCURRENCES} appointments")
+        if index > 100 * MAX_SERIES_OCCURRENCES:  # p. ej. solo 29 de febrero con UNTIL lejano
+            break
+        found.append(when)
+    return found
@@ -0,0 +1,152 @@
+"""
+Caché en memoria de la agenda diaria de cada veterinario.
+
+Clave (veterinarian_id, día) -> tupla con las citas (dict de columnas) que empiezan ese día,
+ordenadas por fecha. La vista de agenda y la disponibilidad de /citas leen de aquí; los días
+que faltan se cargan con una sola consulta por rango sobre ix_appointments_veterinarian_id_date.
+El nombre y el horario de cada veterinario también se guardan (veterinarian_cache), así una
+lectura con la caché caliente no consulta la BDD.
+
+Invalidación: al confirmar una transacción que ha insertado, modificado o borrado citas con el
+ORM se eliminan los días afectados (el de antes y el de después si la cita se mueve). Cada
+invalidación sube la generación del veterinario, y una carga que empezó antes no guarda su
+resultado, así no se cachea una lectura anterior al commit. Los cambios hechos fuera del ORM
+deben llamar a invalidate_days; los de otro proceso se ven como tarde al caducar (TTL).
+La comprobación de solapamientos al reservar no usa la caché: siempre consulta la BDD.
+"""
+import threading
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from typing import AbstractSet, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.appointment import Appointment
+from ..models.veterinarian import Veterinarian
+from .cache import TTLCache
+
+DAY_SCHEDULE_CACHE_MAXSIZE = 20000    # días (30 veterinarios x 1 año caben de sobra)
+DAY_SCHEDULE_CACHE_TTL_SECONDS = 300  # staleness máxima si otro proceso cambia citas
+
+day_schedule_cache = TTLCache(maxsize=DAY_SCHEDULE_CACHE_MAXSIZE, ttl=DAY_SCHEDULE_CACHE_TTL_SECONDS)
+veterinarian_cache = TTLCache(maxsize=1024, ttl=DAY_SCHEDULE_CACHE_TTL_SECONDS)
+
+
+class VetHours(NamedTuple):
+    id: int
+    name: str
+    work_start: time
+    work_end: time
+    weekdays: AbstractSet[int]
+    active: bool
+
+DaySchedule = Tuple[dict, ...]
+
+_generations: Dict[int, int] = {}
+_generations_lock = threading.Lock()
+
+
+def _generation(veterinarian_id: int) -> int:
+    with _generations_lock:
+        return _generations.get(veterinarian_id, 0)
+
+
+def invalidate_days(veterinarian_id: int, days: Iterable[date]) -> None:
+    with _generations_lock:
+        _generations[veterinarian_id] = _generations.get(veterinarian_id, 0) + 1
+    for day in days:
+        day_schedule_cache.invalidate((veterinarian_id, day))
+
+
+def invalidate_veterinarian(veterinarian_id: int) -> None:
+    """Todos los días en caché del veterinario (p. ej. tras un UPDATE masivo de sus citas)."""
+    with _generations_lock:
+        _generations[veterinarian_id] = _generations.get(veterinarian_id, 0) + 1
+    day_schedule_cache.invalidate_where(lambda rows: any(r["veterinarian_id"] == veterinarian_id for r in rows))
+
+
+def day_range_statement(veterinarian_id: int, first_day: date, last_day: date):
+    """Citas del veterinario que empiezan entre first_day y last_day (ambos incluidos)."""
+    return (
+        select(*Appointment.__table__.columns)
+        .where(
+            Appointment.veterinarian_id == veterinarian_id,
+            Appointment.date >= datetime.combine(first_day, time.min),
+            Appointment.date < datetime.combine(last_day + timedelta(days=1), time.min),
+        )
+        .order_by(Appointment.date, Appointment.id)
+    )
+
+
+async def get_veterinarian(db: AsyncSession, veterinarian_id: int) -> Optional[VetHours]:
+    vet = veterinarian_cache.get(veterinarian_id)
+    if vet is None:
+        row = await db.get(Veterinarian, veterinarian_id)
+        if row is None:
+            return None
+        vet = VetHours(row.id, row.name, row.work_start, row.work_end, frozenset(row.weekdays), row.active)
+        veterinarian_cache.set(veterinarian_id, vet)
+    return vet
+
+
+async def load_days(db: AsyncSession, veterinarian_id: int, first_day: date, last_day: date) -> Dict[date, DaySchedule]:
+    """Agenda de cada día entre first_day y last_day; como mucho una consulta para los que no están en caché."""
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    schedules = {day: day_schedule_cache.get((veterinarian_id, day)) for day in days}
+    missing = [day for day, rows in schedules.items() if rows is None]
+    if not missing:
+        return schedules
+
+    generation = _generation(veterinarian_id)
+    result = await db.execute(day_range_statement(veterinarian_id, missing[0], missing[-1]))
+    loaded: Dict[date, list] = {day: [] for day in days if missing[0] <= day <= missing[-1]}
+    for row in result.mappings():
+        loaded[row["date"].date()].append(dict(row))
+    store = _generation(veterinarian_id) == generation
+    for day, rows in loaded.items():
+        schedules[day] = tuple(rows)
+        if store:
+            day_schedule_cache.set((veterinarian_id, day), schedules[day])
+    return schedules
+
+
+# ---------------------------------------------------------------------
+# Invalidación por eventos del ORM
+# ---------------------------------------------------------------------
+def _affected_days(obj: Appointment):
+    """(veterinarian_id, día) antes y después del cambio."""
+    state = inspect(obj)
+    vet, when = state.attrs.veterinarian_id.history, state.attrs.date.history
+    current = ((vet.added or vet.unchanged or [None])[0], (when.added or when.unchanged or [None])[0])
+    previous = ((vet.deleted or [current[0]])[0], (when.deleted or [current[1]])[0])
+    for vet_id, start in (current, previous):
+        if vet_id is not None and isinstance(start, datetime):
+            yield vet_id, start.date()
+
+
+@event.listens_for(Veterinarian, "after_update")
+@event.listens_for(Veterinarian, "after_delete")
+def _invalidate_veterinarian_hours(mapper, connection, target):
+    veterinarian_cache.invalidate(target.id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_days(session, flush_context):
+    keys = session.info.setdefault("day_schedule_keys", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Appointment):
+            keys.update(_affected_days(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_days(session):
+    keys = session.info.pop("day_schedule_keys", None)
+    for vet_id, day in keys or ():
+        invalidate_days(vet_id, [day])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_days(session):
+    session.info.pop("day_schedule_keys", None)
@@ -0,0 +1,203 @@
+"""
+Búsqueda de texto de clientes y del historial clínico.
+
+SQLite: tabla virtual FTS5 `clients_fts` (contenido externo sobre `clients`, rowid = id)
+que los triggers de la migración 4 mantienen al día en cada INSERT/UPDATE/DELETE.
+Postgres: índice GIN de trigramas (pg_trgm) sobre la concatenación de los campos, en minúsculas y
+sin acentos (unaccent, migración 15); cada palabra se busca con una expresión regular anclada al
+principio de palabra ('\\mana'), que el índice de trigramas también resuelve.
+
+Cada palabra de la consulta se busca como prefijo y deben aparecer todas
+("ana gar" encuentra "Ana García"). Los resultados se ordenan por relevancia.
+
+En SQLite se puntúan con bm25 todas las coincidencias (ORDER BY rank dentro de FTS5), así
+que el coste crece con ellas: un prefijo corto y frecuente ("ana" en 1M clientes son decenas
+de miles) tarda bastante más que una consulta concreta (DNI, email, teléfono, nombre y
+apellido).
+
+Historial clínico (diagnóstico, tratamiento, observaciones): FTS5 `medical_history_fts`
+(migración 8) o tsvector 'spanish' en Postgres. La consulta admite palabras (todas deben
+aparecer), "frases exactas" y prefijos (palabra*). SQLite no tiene stemming en español:
+los acentos se ignoran y el prefijo (fractur*) cubre las variantes de una palabra.
+Igual que en clientes, se puntúan todas las notas que cumplen la consulta y los filtros.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import bindparam, select, text
+
+from ..models.client import Client
+
+CLIENT_SEARCH_FIELDS = ("name", "dni", "email", "phone", "address")
+# pesos bm25 por campo (mismo orden que CLIENT_SEARCH_FIELDS)
+CLIENT_SEARCH_WEIGHTS = (10.0, 10.0, 5.0, 5.0, 1.0)
+
+# índices de prefijo de FTS5: "ana"* se resuelve sin recorrer todos los términos que empiezan por "ana"
+FTS_PREFIX_LENGTHS = (2, 3, 4)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_QUERY_PART = re.compile(r'"([^"]*)"|(\w+)(\*?)', re.UNICODE)
+
+HISTORY_SEARCH_FIELDS = ("diagnosis", "treatment", "observations")
+# pesos bm25 por campo (mismo orden que HISTORY_SEARCH_FIELDS)
+HISTORY_SEARCH_WEIGHTS = (5.0, 2.0, 1.0)
+# tsvector indexado en Postgres; debe coincidir exactamente con el del índice
+PG_HISTORY_SEARCH_TSV = (
+    "to_tsvector('spanish', " + " || ' ' || ".join(f"coalesce({f}, '')" for f in HISTORY_SEARCH_FIELDS) + ")"
+)
+
+# unaccent() no es IMMUTABLE y no se puede indexar: la migración 15 crea este envoltorio que sí lo es
+PG_UNACCENT_FUNCTION = "clinica_unaccent"
+# expresión indexada en Postgres; debe coincidir exactamente con la del índice
+PG_CLIENT_SEARCH_EXPR = (
+    f"{PG_UNACCENT_FUNCTION}(lower(" + " || ' ' || ".join(f"coalesce({f}, '')" for f in CLIENT_SEARCH_FIELDS) + "))"
+)
+
+
+def search_terms(q: str) -> List[str]:
+    return _WORD.findall(q.lower())
+
+
+def fts_match_query(q: str) -> Optional[str]:
+    """'ana gar' -> '"ana"* AND "gar"*' (sintaxis FTS5). None si no hay palabras."""
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return " AND ".join(f'"{t}"*' for t in terms)
+
+
+def client_search_statement(dialect_name: str, q: str, limit: int):
+    """
+    Sentencia ORM que devuelve Clients ordenados por relevancia, o None si la consulta
+    no tiene palabras buscables.
+    """
+    if dialect_name == "postgresql":
+        terms = search_terms(q)
+        if not terms:
+            return None
+        # \m = principio de palabra: "ana" encuentra "Ana" y "ana.garcia@", no "Mariana"
+        # (los términos solo tienen caracteres \w, no hace falta escaparlos en la regex)
+        conditions = " AND ".join(
+            f"{PG_CLIENT_SEARCH_EXPR} ~ {PG_UNACCENT_FUNCTION}(:t{i})" for i in range(len(terms))
+        )
+        stmt = text(
+            f"SELECT clients.* FROM clients WHERE {conditions} "
+            f"ORDER BY similarity({PG_CLIENT_SEARCH_EXPR}, {PG_UNACCENT_FUNCTION}(:q)) DESC, clients.id LIMIT :limit"
+        ).bindparams(q=" ".join(terms), limit=limit, **{f"t{i}": f"\\m{t}" for i, t in enumerate(terms)})
+        return select(Client).from_statement(stmt)
+
+    match = fts_match_query(q)
+    if match is None:
+        return None
+    # ORDER BY rank lo resuelve FTS5 (rank = bm25 con los pesos de "rank MATCH"): puntúa todas las
+    # coincidencias y se queda con las `limit` mejores sin ordenar todas las filas en SQLite
+    stmt = text(
+        "SELECT clients.* FROM ("
+        "SELECT rowid AS id, rank FROM clients_fts "
+        "WHERE clients_fts MATCH :match AND rank MATCH :rank ORDER BY rank LIMIT :limit"
+        ") AS hits JOIN clients ON clients.id = hits.id ORDER BY hits.rank, hits.id"
+    ).bindparams(
+        bindparam("match", match),
+        bindparam("rank", f"bm25({', '.join(str(w) for w in CLIENT_SEARCH_WEIGHTS)})"),
+        bindparam("limit", limit),
+    )
+    return select(Client).from_statement(stmt)
+
+
+# ---------------------------------------------------------------------
+# Historial clínico
+# ---------------------------------------------------------------------
+class QueryPart(NamedTuple):
+    words: List[str]   # más de una palabra = frase
+    prefix: bool
+
+
+def parse_text_query(q: str) -> List[QueryPart]:
+    """'otitis "dolor agudo" fractur*' -> [otitis], [dolor, agudo] (frase), [fractur] (prefijo)."""
+    parts = []
+    for match in _QUERY_PART.finditer(q.lower()):
+        phrase, word, star = match.groups()
+        if phrase is not None:
+            words = _WORD.findall(phrase)
+            if words:
+                parts.append(QueryPart(words, False))
+        else:
+            parts.append(QueryPart([word], bool(star)))
+    return parts
+
+
+def fts5_query(parts: List[QueryPart]) -> str:
+    return " AND ".join('"' + " ".join(p.words) + '"' + ("*" if p.prefix else "") for p in parts)
+
+
+def pg_tsquery(parts: List[QueryPart]) -> str:
+    return " & ".join(
+        "(" + " <-> ".join(p.words) + ")" if len(p.words) > 1 else p.words[0] + (":*" if p.prefix else "")
+        for p in parts
+    )
+
+
+def history_search_statement(
+    dialect_name: str,
+    q: str,
+    limit: int,
+    species: Optional[str] = None,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+):
+    """
+    Sentencia textual con las columnas de MedicalHistory más pet_name y species, ordenada por
+    relevancia; None si la consulta no tiene palabras buscables.
+    """
+    parts = parse_text_query(q)
+    if not parts:
+        return None
+    columns = ("medical_history.id, medical_history.client_id, medical_history.pet_id, medical_history.event, "
+               "medical_history.timestamp, medical_history.diagnosis, medical_history.treatment, "
+               "medical_history.observations, medical_history.created_by, pets.name AS pet_name, pets.species")
+    filters, params = [], {"limit": limit}
+    if species:
+        filters.append("pets.species = :species")
+        params["species"] = species
+    if fecha_inicio:
+        filters.append("medical_history.timestamp >= :desde")
+        params["desde"] = datetime.combine(fecha_inicio, time.min)
+    if fecha_fin:
+        filters.append("medical_history.timestamp < :hasta")
+        params["hasta"] = datetime.combine(fecha_fin + timedelta(days=1), time.min)
+    where = "".join(f" AND {f}" for f in filters)
+
+    if dialect_name == "postgresql":
+        params["tsq"] = pg_tsquery(parts)
+        sql = (
+            f"SELECT {columns} FROM medical_history JOIN pets ON pets.id = medical_history.pet_id "
+            f"WHERE {PG_HISTORY_SEARCH_TSV} @@ to_tsquery('spanish', :tsq){where} "
+            f"ORDER BY ts_rank({PG_HISTORY_SEARCH_TSV}, to_tsquery('spanish', :tsq)) DESC, "
+            "medical_history.timestamp DESC LIMIT :limit"
+        )
+    else:
+        # rank = bm25 con los pesos de "rank MATCH": se puntúan todas las coincidencias que cumplen
+        # los filtros, no solo las más recientes. Sin filtros, FTS5 ordena por rank por sí sola y
+        # solo se unen las `limit` mejores; con filtros hay que unir cada coincidencia para filtrarla
+        params.update(match=fts5_query(parts), rank=f"bm25({', '.join(str(w) for w in HISTORY_SEARCH_WEIGHTS)})")
+        if filters:
+            hits = (
+                "SELECT medical_history_fts.rowid AS id, medical_history_fts.rank AS rank FROM medical_history_fts "
+                "JOIN medical_history ON medical_history.id = medical_history_fts.rowid "
+                "JOIN pets ON pets.id = medical_history.pet_id "
+                f"WHERE medical_history_fts MATCH :match AND medical_history_fts.rank MATCH :rank{where} "
+                "ORDER BY medical_history_fts.rank, medical_history.timestamp DESC LIMIT :limit"
+            )
+        else:
+            hits = (
+                "SELECT rowid AS id, rank FROM medical_history_fts "
+                "WHERE medical_history_fts MATCH :match AND rank MATCH :rank ORDER BY rank LIMIT :limit"
+            )
+        sql = (
+            f"SELECT {columns} FROM ({hits}) AS hits "
+            "JOIN medical_history ON medical_history.id = hits.id "
+            "JOIN pets ON pets.id = medical_history.pet_id "
+            "ORDER BY hits.rank, medical_history.timestamp DESC"
+        )
+    return text(sql).bindparams(**params)
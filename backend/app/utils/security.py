@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+import os
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
@@ -10,6 +13,9 @@ from jose import JWTError, jwt
 SECRET_KEY = "malaspulgas"           # <- tu SECRET_KEY (dev)
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 1 día, ajustar si hace falta
+# "lookup": el rol se lee de la BDD (con caché) en cada petición.
+# "claims": el rol y el id van firmados en el token; la autorización no toca la BDD.
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "lookup")
 
 # Usamos pbkdf2_sha256 para evitar dependencias nativas de bcrypt en dev.
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
@@ -35,12 +41,36 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_token(user_id: int, email: str, role_name: Optional[str], token_version: int,
+                      full_name: Optional[str] = None) -> str:
+    """
+    Token de usuario con los claims de autorización firmados:
+    sub (email), uid, role y ver (users.token_version al emitirlo), más name (full_name al
+    emitirlo) para mostrarlo sin consultar la BDD en modo "claims".
+    """
+    return create_access_token(
+        data={"sub": email, "uid": user_id, "role": role_name, "ver": token_version, "name": full_name}
+    )
+
 def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         return payload
     except JWTError:
         return None
+
+# ---------------------------------------------------------------------
+# Feeds de calendario (.ics)
+# ---------------------------------------------------------------------
+# Las apps de calendario se suscriben a una URL fija y no envían cabeceras: el feed de cada
+# veterinario se autoriza con un token en la URL, firmado con SECRET_KEY junto con su
+# versión (veterinarians.calendar_token_version). Subir la versión revoca la URL anterior.
+def calendar_feed_token(veterinarian_id: int, version: int) -> str:
+    message = f"calendar:{veterinarian_id}:{version}".encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+def verify_calendar_feed_token(veterinarian_id: int, version: int, token: Optional[str]) -> bool:
+    return bool(token) and hmac.compare_digest(token, calendar_feed_token(veterinarian_id, version))
     
 # ----------------------------
 # FastAPI auth/depends helpers
@@ -74,66 +104,190 @@ def get_current_user_payload(payload: dict = Depends(get_token_payload)) -> dict
     """
     return payload
 
-def require_role(role_name: str):
-    """
-    Factory: devuelve una dependencia que exige que payload['role']==role_name.
-    Uso: Depends(require_role('admin'))
-    """
-    def _dep(payload: dict = Depends(get_current_user_payload)):
-        role = payload.get("role")
-        if role != role_name:
-            raise HTTPException(status_code=403, detail="Operation requires role: %s" % role_name)
-        return payload
-    return _dep
-
-# Dependencia concreta para admin (usada por informes.py)
-require_admin = require_role("admin")
-
 # --- Dependencias / helpers para FastAPI (añadir al final de app/utils/security.py) ---
+from dataclasses import dataclass
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select, update
 from sqlalchemy.orm import Session
 from typing import Optional
 
 # evita import circular: importa get_db desde tu módulo de db
 from ..database import get_db
-from ..models.user import User
-from jose import JWTError
+from ..models.user import User, Role
+from .cache import TTLCache
 
 # reuse oauth2 scheme — el tokenUrl coincide con tu router /auth/token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+# ---------------------------------------------------------------------
+# Caché de usuarios autenticados (principal)
+# ---------------------------------------------------------------------
+PRINCIPAL_CACHE_MAXSIZE = 1024       # entradas (0 = desactivada)
+PRINCIPAL_CACHE_TTL_SECONDS = 60     # staleness máxima si otro proceso cambia el usuario
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Datos mínimos del usuario autenticado que necesitan las dependencias de autorización."""
+    id: int
+    email: str
+    role_name: Optional[str] = None
+    is_active: bool = True
+    full_name: Optional[str] = None
+
+
+# clave: 'sub' del token (email)
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# ---------------------------------------------------------------------
+# Revocación (modo "claims")
+# ---------------------------------------------------------------------
+# users.token_version es la versión mínima válida de los tokens del usuario. Cambiar su rol o
+# desactivarlo la incrementa en la misma transacción, así que un rollback no revoca nada y
+# todos los workers ven el cambio. Cada proceso guarda las versiones en memoria hasta
+# TOKEN_VERSION_CACHE_TTL_SECONDS (se invalidan al confirmar los cambios hechos en él): la
+# autorización no consulta la BDD por petición y otro worker tarda como mucho ese TTL en revocar.
+TOKEN_VERSION_CACHE_TTL_SECONDS = 5
+_REVOKED_KEY = "revoked_token_versions"  # Session.info: ids de usuario (None = todos)
+
+# clave: id de usuario
+token_version_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=TOKEN_VERSION_CACHE_TTL_SECONDS)
+
+
+def current_token_version(db: Session, user_id: int) -> Optional[int]:
+    """users.token_version (desde la caché si está); None si el usuario no existe."""
+    version = token_version_cache.get(user_id)
+    if version is None:
+        version = db.execute(select(User.token_version).where(User.id == user_id)).scalar()
+        if version is not None:
+            token_version_cache.set(user_id, version)
+    return version
+
+
+def _revoke_on_commit(session: Optional[Session], user_id: Optional[int]) -> None:
+    if session is not None:
+        session.info.setdefault(_REVOKED_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_revoked_versions(session):
+    revoked = session.info.pop(_REVOKED_KEY, None)
+    if revoked and None in revoked:
+        token_version_cache.clear()
+    elif revoked:
+        for user_id in revoked:
+            token_version_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_revoked_versions(session):
+    session.info.pop(_REVOKED_KEY, None)
+
+
+def _load_principal(db: Session, email: str) -> Optional[Principal]:
+    # una sola consulta (users LEFT JOIN roles) en lugar de user + lazy-load de user.role
+    row = (
+        db.query(User.id, User.email, User.full_name, User.is_active, Role.name)
+        .outerjoin(Role, User.role_id == Role.id)
+        .filter(User.email == email)
+        .first()
+    )
+    if row is None:
+        return None
+    return Principal(
+        id=row[0],
+        email=row[1],
+        full_name=row[2],
+        is_active=row[3] is not False,
+        role_name=row[4],
+    )
+
+
+def _principal_from_claims(payload: dict) -> Optional[Principal]:
+    uid = payload.get("uid")
+    if uid is None or "role" not in payload:
+        return None  # token antiguo sin claims: se resuelve por BDD
+    return Principal(id=uid, email=payload["sub"], role_name=payload.get("role"), full_name=payload.get("name"))
+
+
+# Invalidación: cualquier cambio en users/roles hecho vía ORM limpia las entradas afectadas.
+# (Los UPDATE masivos con query.update() no disparan estos eventos; el TTL acota ese caso.)
+@event.listens_for(User, "before_update")
+def _revoke_user_tokens(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.role_id.history.has_changes() or state.attrs.is_active.history.has_changes():
+        target.token_version = User.token_version + 1  # va en el mismo UPDATE
+        _revoke_on_commit(state.session, target.id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target):
+    principal_cache.invalidate(target.email)
+    principal_cache.invalidate_where(lambda p: p.id == target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _revoke_deleted_user(mapper, connection, target):
+    _revoke_on_commit(inspect(target).session, target.id)
+
+
+@event.listens_for(Role, "after_update")
+@event.listens_for(Role, "after_delete")
+def _invalidate_role(mapper, connection, target):
+    principal_cache.clear()
+    # el nombre del rol va en los tokens: se revocan los de sus usuarios
+    users = User.__table__
+    connection.execute(
+        update(users).where(users.c.role_id == target.id).values(token_version=users.c.token_version + 1)
+    )
+    _revoke_on_commit(inspect(target).session, None)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     """
-    Decodifica token y devuelve el usuario actual de la BDD.
-    Levanta 401 si no hay token válido o el usuario no existe.
+    Decodifica token y devuelve el usuario actual (Principal).
+    En modo "claims" se construye desde el token (sin BDD); si no, desde la caché o la BDD.
+    Levanta 401 si no hay token válido, está revocado, el usuario no existe o está desactivado.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = decode_access_token(token)  # función que ya deberías tener aquí
-        # payload debería contener 'sub' con email
-        email: Optional[str] = payload.get("sub") if isinstance(payload, dict) else None
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_access_token(token)
+    # payload debería contener 'sub' con email
+    email: Optional[str] = payload.get("sub") if isinstance(payload, dict) else None
+    if email is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise credentials_exception
-    return user
+    if AUTH_TOKEN_MODE == "claims":
+        principal = _principal_from_claims(payload)
+        if principal is not None:
+            version = current_token_version(db, principal.id)
+            if version is None or payload.get("ver", 0) < version:
+                raise _unauth_exc("Token revoked")
+            return principal
+
+    principal = principal_cache.get(email)
+    if principal is None:
+        principal = _load_principal(db, email)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.set(email, principal)
+    if not principal.is_active:
+        raise _unauth_exc("Inactive user")
+    return principal
 
 def require_role(role_name: str):
     """
     Dependency factory: exige un role concreto (p. ej. 'admin').
     Uso en router: Depends(require_role('admin'))
     """
-    def inner(user: User = Depends(get_current_user)):
-        if not getattr(user, "role", None) or user.role.name != role_name:
+    def inner(user: Principal = Depends(get_current_user)):
+        if user.role_name != role_name:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
         return user
     return inner
@@ -143,11 +297,11 @@ def require_any_role(*role_names: str):
     Dependency factory: permite varios roles (p. ej. 'admin','receptionist').
     Uso en router: Depends(require_any_role('admin','receptionist'))
     """
-    def inner(user: User = Depends(get_current_user)):
-        if getattr(user, "role", None) and user.role.name in role_names:
+    def inner(user: Principal = Depends(get_current_user)):
+        if user.role_name in role_names:
             return user
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     return inner
 
 # conveniencia para admin
-require_admin = require_role("admin")
\ No newline at end of file
+require_admin = require_role("admin")
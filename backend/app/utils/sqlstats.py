@@ -0,0 +1,152 @@
+"""
+Instrumentación SQL por petición.
+
+Los eventos de cursor de SQLAlchemy (registrados en la clase Engine, así cubren el engine
+síncrono, el async y las réplicas) suman sentencias y tiempo en un RequestStats guardado
+en un ContextVar. SQLStatsMiddleware crea ese objeto por petición, añade la cabecera
+Server-Timing y avisa en el log de formas de sentencia repetidas (posible N+1).
+
+Para tests:
+    with sqlstats.capture() as requests:
+        client.get("/citas/", headers=...)
+    assert requests[-1].statements <= 2
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# misma forma de sentencia repetida este número de veces en una petición => aviso N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+_IN_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)")
+_NUMBER = re.compile(r"\b\d+\b")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normaliza una sentencia para agrupar las que solo difieren en parámetros."""
+    shape = _IN_LIST.sub("(?)", statement)
+    shape = _NUMBER.sub("?", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+class RequestStats:
+    __slots__ = ("method", "path", "status", "statements", "db_seconds", "shapes")
+
+    def __init__(self, method: str = "", path: str = ""):
+        self.method = method
+        self.path = path
+        self.status: Optional[int] = None
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD):
+        return [(shape, n) for shape, n in self.shapes.items() if n >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.db_seconds * 1000:.2f};desc="{self.statements} queries"'
+
+    def __repr__(self):
+        return f"<RequestStats {self.method} {self.path} statements={self.statements} db={self.db_seconds * 1000:.2f}ms>"
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sqlstats_current", default=None)
+_listeners: List[Callable[[RequestStats], None]] = []
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+# ---------------------------------------------------------------------
+# Eventos de engine
+# ---------------------------------------------------------------------
+_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("sqlstats_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("sqlstats_start")
+    if starts:
+        stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def install() -> None:
+    """Registra los eventos de cursor en todos los engines (idempotente)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _installed = True
+
+
+# ---------------------------------------------------------------------
+# Middleware ASGI
+# ---------------------------------------------------------------------
+class SQLStatsMiddleware:
+    def __init__(self, app, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope.get("method", ""), scope.get("path", ""))
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                stats.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._finish(stats)
+
+    def _finish(self, stats: RequestStats) -> None:
+        for shape, n in stats.repeated_shapes(self.threshold):
+            logger.warning("Possible N+1 in %s %s: %d x %s", stats.method, stats.path, n, shape)
+        for listener in list(_listeners):
+            listener(stats)
+
+
+@contextmanager
+def capture():
+    """Recoge los RequestStats de las peticiones completadas dentro del bloque."""
+    collected: List[RequestStats] = []
+    _listeners.append(collected.append)
+    try:
+        yield collected
+    finally:
+        _listeners.remove(collected.append)
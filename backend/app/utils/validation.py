@@ -0,0 +1,6 @@
+from pydantic import ValidationError
+
+
+def validation_message(exc: ValidationError) -> str:
+    """Errores de pydantic en una línea: 'campo: mensaje; otro: mensaje'."""
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
@@ -0,0 +1,136 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Cada benchmark trabaja sobre una base SQLite temporal (no toca clinica.db) y
+se ejecuta desde la carpeta backend:  python -m benchmarks.<nombre>
+"""
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from contextlib import contextmanager
+
+import uvicorn
+
+from sqlalchemy.orm import sessionmaker
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import build_engine, build_async_engine, get_db, get_async_db, to_async_url
+from app.main import app
+from app.migrations import run_migrations
+from app.models.user import User, Role
+from app.utils.security import hash_password
+
+ADMIN_EMAIL = "bench-admin@example.com"
+ADMIN_PASSWORD = "benchpass"
+
+
+@contextmanager
+def temp_database(profile="default", url=None):
+    """
+    Crea una BDD con el esquema y un admin, y la inyecta en la app.
+    Por defecto es un SQLite temporal; url permite apuntar a otra BDD (p. ej. Postgres vacío).
+    """
+    if url is None:
+        tmpdir = tempfile.mkdtemp(prefix="clinica-bench-")
+        url = "sqlite:///" + os.path.join(tmpdir, "bench.db")
+    engine = build_engine(url, profile)
+    run_migrations(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    role = Role(name="admin")
+    db.add(role)
+    db.flush()
+    db.add(User(email=ADMIN_EMAIL, hashed_password=hash_password(ADMIN_PASSWORD), full_name="Bench", role_id=role.id))
+    db.commit()
+    db.close()
+
+    def _get_db():
+        s = Session()
+        try:
+            yield s
+        finally:
+            s.close()
+
+    async_engine = build_async_engine(to_async_url(url), profile)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def _get_async_db():
+        async with AsyncSession() as s:
+            yield s
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_async_db] = _get_async_db
+    try:
+        yield engine, Session
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_async_db, None)
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+
+
+def admin_headers(client):
+    r = client.post("/auth/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+def rps(fn, n):
+    """Ejecuta fn n veces y devuelve peticiones por segundo."""
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - start)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[k]
+
+
+@contextmanager
+def running_server(app=app, log_level="warning"):
+    """Arranca uvicorn en un hilo sobre un puerto libre y devuelve la URL base."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level=log_level))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def http(method, url, headers=None, data=None, json_body=None):
+    """Petición HTTP mínima con urllib; devuelve (status, body)."""
+    headers = dict(headers or {})
+    body = None
+    if json_body is not None:
+        body = json.dumps(json_body).encode()
+        headers["Content-Type"] = "application/json"
+    elif data is not None:
+        body = urllib.parse.urlencode(data).encode()
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    req = urllib.request.Request(url, data=body, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=60) as r:
+            return r.status, r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
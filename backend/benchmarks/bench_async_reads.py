@@ -0,0 +1,84 @@
+"""
+Rendimiento de GET /citas/ (async, AsyncSession) frente a una copia síncrona del mismo
+handler (Session bloqueante en el threadpool) con 50, 200 y 1000 conexiones concurrentes.
+
+    python -m benchmarks.bench_async_reads [SECONDS] [CONCURRENCIAS...]
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from urllib.parse import urlsplit
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.main import app
+from app.models.appointment import Appointment
+from app.schemas.appointment import AppointmentOut
+from app.utils.security import get_current_user
+from fastapi.testclient import TestClient
+from ._common import temp_database, running_server, admin_headers, percentile
+
+SYNC_PATH = "/_bench/citas-sync"
+
+
+@app.get(SYNC_PATH, response_model=List[AppointmentOut], include_in_schema=False)
+def _list_citas_sync(limit: int = 100, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    return db.query(Appointment).order_by(Appointment.date.desc()).limit(limit).all()
+
+
+async def _connection(host, port, path, headers, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+               + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n").encode()
+    try:
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            (latencies if status < 400 else errors).append((time.perf_counter() - start) * 1000)
+    finally:
+        writer.close()
+
+
+async def _run(base, path, headers, concurrency, seconds):
+    url = urlsplit(base)
+    latencies, errors = [], []
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*[
+        _connection(url.hostname, url.port, path, headers, deadline, latencies, errors) for _ in range(concurrency)
+    ])
+    return latencies, errors
+
+
+def main(seconds: float = 5.0, levels=(50, 200, 1000)):
+    with temp_database() as (engine, Session):
+        db = Session()
+        now = datetime.utcnow()
+        db.add_all([Appointment(date=now + timedelta(hours=i), reason="control", veterinarian="Dr. Bench")
+                    for i in range(500)])
+        db.commit()
+        db.close()
+        headers = admin_headers(TestClient(app))
+
+        # los 500 por agotamiento del pool se cuentan como errores; no se imprimen las trazas
+        with running_server(log_level="critical") as base:
+            for concurrency in levels:
+                for label, path in (("sync ", SYNC_PATH), ("async", "/citas/")):
+                    lat, errors = asyncio.run(_run(base, path, headers, concurrency, seconds))
+                    print(f"c={concurrency:5d} {label}: {len(lat) / seconds:8.1f} req/s  "
+                          f"p50={percentile(lat, 50):7.1f} ms  p99={percentile(lat, 99):7.1f} ms  errores={len(errors)}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(float(args[0]) if args else 5.0, tuple(int(a) for a in args[1:]) or (50, 200, 1000))
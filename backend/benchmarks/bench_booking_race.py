@@ -0,0 +1,90 @@
+"""
+Reservas simultáneas del mismo hueco contra un servidor uvicorn real.
+
+    python -m benchmarks.bench_booking_race [HILOS] [RONDAS] [PERFIL]
+
+En cada ronda HILOS hilos piden a la vez POST /citas/ para el mismo veterinario con citas que
+se solapan; debe ganar exactamente una (201) y el resto recibir 409. Muestra el rendimiento
+(reservas resueltas por segundo) y la latencia. PERFIL: default | sqlite (WAL).
+"""
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.models.client import Client
+from app.models.pet import Pet
+from app.models.user import Role, User
+from app.models.veterinarian import Veterinarian
+from app.utils.security import hash_password
+from ._common import temp_database, running_server, http, percentile
+
+RECEP_EMAIL = "bench-recep@example.com"
+RECEP_PASSWORD = "benchpass"
+
+
+def _seed(Session):
+    db = Session()
+    try:
+        role = Role(name="receptionist")
+        db.add(role)
+        db.flush()
+        db.add(User(email=RECEP_EMAIL, hashed_password=hash_password(RECEP_PASSWORD), full_name="Recepción",
+                    role_id=role.id))
+        owner = Client(dni="BENCH", name="Bench")
+        db.add(owner)
+        db.flush()
+        pet = Pet(name="Bench", species="perro", owner_id=owner.id)
+        vet = Veterinarian(name="Vet carrera")
+        db.add_all([pet, vet])
+        db.commit()
+        return owner.id, pet.id, vet.id
+    finally:
+        db.close()
+
+
+def main(threads_n: int = 200, rounds: int = 5, profile: str = "default"):
+    with temp_database(profile) as (_, Session):
+        owner_id, pet_id, vet_id = _seed(Session)
+        with running_server() as base:
+            _, body = http("POST", base + "/auth/token", data={"username": RECEP_EMAIL, "password": RECEP_PASSWORD})
+            headers = {"Authorization": "Bearer " + json.loads(body)["access_token"]}
+
+            latencies, total, elapsed = [], 0, 0.0
+            for rnd in range(rounds):
+                slot = (datetime.utcnow() + timedelta(days=30 + rnd)).replace(hour=10, minute=0, second=0, microsecond=0)
+                barrier = threading.Barrier(threads_n + 1)
+                statuses = []
+
+                def attempt(i):
+                    payload = {"date": (slot + timedelta(minutes=i % 20)).isoformat(), "duration_minutes": 30,
+                               "veterinarian_id": vet_id, "pet_id": pet_id, "client_id": owner_id}
+                    barrier.wait()
+                    t0 = time.perf_counter()
+                    status, _ = http("POST", base + "/citas/", headers=headers, json_body=payload)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    statuses.append(status)
+
+                threads = [threading.Thread(target=attempt, args=(i,)) for i in range(threads_n)]
+                for t in threads:
+                    t.start()
+                barrier.wait()
+                start = time.perf_counter()
+                for t in threads:
+                    t.join()
+                elapsed += time.perf_counter() - start
+                total += len(statuses)
+                winners = statuses.count(201)
+                others = {s: statuses.count(s) for s in set(statuses) if s not in (201, 409)}
+                print(f"  ronda {rnd + 1}: 201={winners} 409={statuses.count(409)}"
+                      + (f" otros={others}" if others else "")
+                      + ("" if winners == 1 else "   <-- ERROR: debe ganar exactamente una"))
+
+    print(f"{total} reservas en {rounds} rondas de {threads_n} hilos ({profile}): {total / elapsed:,.0f} reservas/s, "
+          f"latencia p50={percentile(latencies, 50):.1f} ms p95={percentile(latencies, 95):.1f} ms")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(a) for a in args[:2]), *args[2:])
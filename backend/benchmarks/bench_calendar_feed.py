@@ -0,0 +1,87 @@
+"""
+Feed iCalendar de un veterinario: descarga completa frente a sondeos condicionales.
+
+    python -m benchmarks.bench_calendar_feed [VETERINARIOS] [DIAS] [N]
+
+Llena la agenda de VETERINARIOS veterinarios durante DIAS días (desde hoy) y mide
+GET /citas/calendar/{vet}.ics sin cabeceras condicionales (genera el .ics en streaming) y con
+If-None-Match / If-Modified-Since de la respuesta anterior (304). Muestra latencia, tamaño y
+sentencias SQL por petición.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import sqlstats
+from app.utils.security import calendar_feed_token
+from ._common import temp_database, percentile
+
+
+def _populate(engine, vets, days):
+    rnd = random.Random(1)
+    first = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
+    rows = []
+    for v in range(vets):
+        for d in range(days):
+            t = (first + timedelta(days=d)).replace(hour=9)
+            while t.hour < 19:
+                minutes = rnd.choice((15, 30, 30, 45, 60))
+                rows.append((t.isoformat(sep=" "), minutes, v + 1, f"Vet {v}", rnd.choice(("Revisión", "Vacuna"))))
+                t += timedelta(minutes=minutes + rnd.choice((0, 15)))
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO veterinarians (id, name, work_start, work_end, work_days, active, schedule_version, "
+            "schedule_changed_at) VALUES (?, ?, '09:00:00.000000', '19:00:00.000000', '1,2,3,4,5', 1, 0, ?)",
+            [(v + 1, f"Vet {v}", datetime.utcnow().isoformat(sep=" ")) for v in range(vets)],
+        )
+        cur.executemany(
+            "INSERT INTO appointments (date, duration_minutes, veterinarian_id, veterinarian, reason, completed) "
+            "VALUES (?, ?, ?, ?, ?, 0)", rows,
+        )
+        raw.commit()
+        cur.execute("ANALYZE")
+    finally:
+        raw.close()
+    return len(rows)
+
+
+def main(vets: int = 30, days: int = 365, n: int = 50):
+    with temp_database() as (engine, Session):
+        total = _populate(engine, vets, days)
+        print(f"{total} citas de {vets} veterinarios en {days} días")
+        client = TestClient(app)
+        rnd = random.Random(2)
+
+        results = {}
+        for mode in ("completa", "If-None-Match", "If-Modified-Since"):
+            times, statements, sizes = [], [], []
+            for _ in range(n):
+                vet = rnd.randrange(vets) + 1
+                url = f"/citas/calendar/{vet}.ics?token={calendar_feed_token(vet, 0)}"
+                headers = {}
+                if mode != "completa":
+                    first = client.get(url)
+                    key = "etag" if mode == "If-None-Match" else "last-modified"
+                    headers = {mode: first.headers[key]}
+                with sqlstats.capture() as requests:
+                    t0 = time.perf_counter()
+                    r = client.get(url, headers=headers)
+                    times.append((time.perf_counter() - t0) * 1000)
+                assert r.status_code == (200 if mode == "completa" else 304), r.status_code
+                statements.append(requests[0].statements)
+                sizes.append(len(r.content))
+            results[mode] = percentile(times, 50)
+            print(f"  {mode:>18}: p50={percentile(times, 50):7.2f} ms  p95={percentile(times, 95):7.2f} ms  "
+                  f"{percentile(sizes, 50) / 1024:7.1f} KiB  sentencias={percentile(statements, 50):.0f}")
+        print(f"  sondeo sin cambios {results['completa'] / results['If-None-Match']:.0f}x más rápido")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
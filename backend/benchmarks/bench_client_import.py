@@ -0,0 +1,59 @@
+"""
+Importación masiva de clientes frente a un POST /clientes/ por cliente.
+
+    python -m benchmarks.bench_client_import [FILAS] [MUESTRA_POST]
+
+Genera un CSV de FILAS clientes (por defecto 200.000, con un 1% de DNI repetidos),
+lo sube a POST /clientes/import y compara las filas/s con MUESTRA_POST (2.000) altas
+individuales por POST /clientes/.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from ._common import temp_database, admin_headers
+
+
+def _write_csv(path, rows):
+    rnd = random.Random(1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("dni,name,email,phone\n")
+        for i in range(rows):
+            n = rnd.randrange(i) if i and rnd.random() < 0.01 else i
+            f.write(f"L{n:08d},Cliente {n},c{n}@example.com,6{n:08d}\n")
+
+
+def main(rows: int = 200000, sample: int = 2000):
+    path = os.path.join(tempfile.mkdtemp(prefix="clinica-bench-"), "clientes.csv")
+    _write_csv(path, rows)
+    with temp_database():
+        client = TestClient(app)
+        headers = admin_headers(client)
+
+        start = time.perf_counter()
+        for i in range(sample):
+            r = client.post("/clientes/", json={"dni": f"P{i:08d}", "name": f"Cliente {i}", "email": f"p{i}@example.com"},
+                            headers=headers)
+            assert r.status_code == 200, r.text
+        single = sample / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with open(path, "rb") as f:
+            r = client.post("/clientes/import", files={"file": ("clientes.csv", f, "text/csv")}, headers=headers)
+        elapsed = time.perf_counter() - start
+        assert r.status_code == 200, r.text
+        report = r.json()
+
+    print(f"POST /clientes/ x{sample}: {single:8.0f} filas/s  (200k ≈ {200000 / single / 60:.1f} min)")
+    print(f"POST /clientes/import   : {rows / elapsed:8.0f} filas/s  ({elapsed:.1f} s; "
+          f"insertadas={report['inserted']} existentes={report['existing']} errores={report['error_count']})")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,74 @@
+"""
+Latencia por página de GET /clientes/ (keyset) con tablas de distinto tamaño.
+
+    python -m benchmarks.bench_clientes_pagination [FILAS ...] [N]
+
+Por defecto compara 1.000 y 1.000.000 clientes. Para cada tamaño mide la primera
+página, una del medio y la última (cursor sobre id), y un filtro por prefijo de nombre.
+Con keyset la latencia no debe depender del tamaño de la tabla ni de la posición.
+"""
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.pagination import encode_cursor
+from ._common import temp_database, admin_headers
+
+BATCH = 50000
+NAMES = ("Ana", "Bruno", "Carmen", "David", "Elena", "Fernando", "Gloria", "Hugo")
+
+
+def _populate(engine, rows):
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for start in range(0, rows, BATCH):
+            cur.executemany(
+                "INSERT INTO clients (dni, name, email) VALUES (?, ?, ?)",
+                [(f"D{i:08d}", f"{NAMES[i % len(NAMES)]} {i:08d}", f"c{i}@example.com")
+                 for i in range(start, min(rows, start + BATCH))],
+            )
+        raw.commit()
+        cur.execute("ANALYZE")
+    finally:
+        raw.close()
+
+
+def _median_ms(client, headers, params, n):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.get("/clientes/", params=params, headers=headers)
+        times.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200, r.text
+    return statistics.median(times)
+
+
+def main(sizes=(1000, 1000000), n: int = 200):
+    print(f"{'filas':>10} {'inicio':>9} {'medio':>9} {'final':>9} {'prefijo':>9}  (ms, mediana de {n})")
+    for rows in sizes:
+        with temp_database() as (engine, _):
+            _populate(engine, rows)
+            client = TestClient(app)
+            headers = admin_headers(client)
+            cases = [
+                {"limit": 100},
+                {"limit": 100, "cursor": encode_cursor({"id": rows // 2})},
+                {"limit": 100, "cursor": encode_cursor({"id": rows - 100})},
+                {"limit": 100, "name": "Gloria 0000"},
+            ]
+            results = [_median_ms(client, headers, params, n) for params in cases]
+        print(f"{rows:>10} " + " ".join(f"{ms:9.2f}" for ms in results))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    if len(args) >= 2:
+        main(tuple(args[:-1]), args[-1])
+    elif args:
+        main(tuple(args))
+    else:
+        main()
@@ -0,0 +1,85 @@
+"""
+Latencia de GET /clientes/search (FTS5) con muchos clientes.
+
+    python -m benchmarks.bench_clientes_search [FILAS] [N]
+
+Por defecto 1.000.000 clientes y 300 búsquedas variadas (prefijo de nombre, nombre y
+apellido, DNI, email y teléfono). Todas las coincidencias se puntúan, así que el p95 lo marcan
+los prefijos de nombre (decenas de miles de coincidencias). Se muestra la latencia total
+(TestClient incluido) y el tiempo de BDD de la cabecera Server-Timing.
+"""
+import random
+import re
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from ._common import temp_database, admin_headers, percentile
+
+BATCH = 50000
+_DB_DUR = re.compile(r"db;dur=([\d.]+)")
+FIRST = ("Ana", "Bruno", "Carmen", "David", "Elena", "Fernando", "Gloria", "Hugo", "Irene", "Javier",
+         "Lucía", "Manuel", "Nuria", "Óscar", "Pilar", "Ramón", "Sara", "Tomás", "Úrsula", "Víctor")
+LAST = ("García", "Fernández", "González", "Rodríguez", "López", "Martínez", "Sánchez", "Pérez",
+        "Gómez", "Martín", "Jiménez", "Ruiz", "Hernández", "Díaz", "Moreno", "Muñoz", "Álvarez")
+STREETS = ("Mayor", "Real", "Sol", "Luna", "Constitución", "Paz", "Iglesia", "Estación")
+
+
+def _row(i, rnd):
+    first, last = rnd.choice(FIRST), rnd.choice(LAST)
+    return (f"{i:08d}X", f"{first} {last} {rnd.choice(LAST)}", f"{first.lower()}.{i}@example.com",
+            f"6{i:08d}", f"Calle {rnd.choice(STREETS)} {rnd.randint(1, 200)}")
+
+
+def _populate(engine, rows):
+    rnd = random.Random(1)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        start_time = time.perf_counter()
+        for start in range(0, rows, BATCH):
+            cur.executemany(
+                "INSERT INTO clients (dni, name, email, phone, address) VALUES (?, ?, ?, ?, ?)",
+                [_row(i, rnd) for i in range(start, min(rows, start + BATCH))],
+            )
+            raw.commit()
+        print(f"insertados {rows} clientes (índice FTS por triggers) en {time.perf_counter() - start_time:.1f} s")
+    finally:
+        raw.close()
+
+
+def _queries(rows, n):
+    rnd = random.Random(2)
+    kinds = [
+        lambda: rnd.choice(FIRST)[:3],
+        lambda: f"{rnd.choice(FIRST)} {rnd.choice(LAST)[:4]}",
+        lambda: f"{rnd.randrange(rows):08d}",
+        lambda: f"{rnd.choice(FIRST).lower()}.{rnd.randrange(rows)}@",
+        lambda: f"6{rnd.randrange(rows):08d}"[:7],
+    ]
+    return [kinds[i % len(kinds)]() for i in range(n)]
+
+
+def main(rows: int = 1000000, n: int = 300):
+    with temp_database() as (engine, _):
+        _populate(engine, rows)
+        client = TestClient(app)
+        headers = admin_headers(client)
+        times, db_times = [], []
+        for q in _queries(rows, n):
+            start = time.perf_counter()
+            r = client.get("/clientes/search", params={"q": q, "limit": 20}, headers=headers)
+            times.append((time.perf_counter() - start) * 1000)
+            assert r.status_code == 200, r.text
+            db_times.append(float(_DB_DUR.search(r.headers["server-timing"]).group(1)))
+    print(f"{n} búsquedas sobre {rows} clientes:")
+    for label, values in (("total", times), ("BDD", db_times)):
+        print(f"  {label:>5}: p50={percentile(values, 50):.2f} ms  p95={percentile(values, 95):.2f} ms  "
+              f"p99={percentile(values, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,134 @@
+"""
+Motor de disponibilidad con la agenda de un año para 30 veterinarios.
+
+    python -m benchmarks.bench_disponibilidad [VETERINARIOS] [DIAS] [N]
+
+Mide GET /citas/disponibilidad con ventanas de un día, una semana y un mes y GET /citas/agenda
+de un día, con la caché de agendas vacía en cada petición (fría) y ya cargada (caliente); la
+comprobación de solapamiento de create_cita (find_conflicts: una consulta por rango + búsqueda
+binaria) y el coste de VetSchedule.is_free sobre el año completo de un veterinario frente a
+recorrer todas sus citas.
+"""
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.availability import find_conflicts, load_schedule
+from app.utils.schedule_cache import day_schedule_cache, veterinarian_cache
+from ._common import temp_database, admin_headers, percentile
+
+DURATIONS = (15, 30, 30, 45, 60)
+_DB_DUR = re.compile(r"db;dur=([\d.]+)")
+START = datetime(2030, 1, 1)
+
+
+def _populate(engine, vets, days):
+    rnd = random.Random(1)
+    rows = []
+    for v in range(vets):
+        for d in range(days):
+            day = START + timedelta(days=d)
+            if day.weekday() == 6:
+                continue
+            t = day.replace(hour=9)
+            while t < day.replace(hour=19):
+                minutes = rnd.choice(DURATIONS)
+                rows.append((t, minutes, v, "Revisión"))
+                t += timedelta(minutes=minutes + rnd.choice((0, 0, 15, 30)))
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany(
+            "INSERT INTO veterinarians (id, name, work_start, work_end, work_days, active, schedule_version) "
+            "VALUES (?, ?, '09:00:00.000000', '19:00:00.000000', '1,2,3,4,5,6', 1, 0)",
+            [(v + 1, f"Vet {v}") for v in range(vets)],
+        )
+        cur.executemany(
+            "INSERT INTO appointments (date, duration_minutes, veterinarian_id, veterinarian, reason, completed) "
+            "VALUES (?, ?, ?, ?, ?, 0)",
+            [(d.isoformat(sep=" "), m, v + 1, f"Vet {v}", r) for d, m, v, r in rows],
+        )
+        raw.commit()
+        cur.execute("ANALYZE")
+    finally:
+        raw.close()
+    return len(rows)
+
+
+def _report(label, times_ms, db_ms=None):
+    line = f"  {label:>40}: p50={percentile(times_ms, 50):7.2f} ms  p95={percentile(times_ms, 95):7.2f} ms"
+    if db_ms is not None:
+        line += f"  (BDD p95={percentile(db_ms, 95):6.2f} ms)"
+    print(line)
+
+
+def main(vets: int = 30, days: int = 365, n: int = 200):
+    with temp_database() as (engine, Session):
+        start = time.perf_counter()
+        total = _populate(engine, vets, days)
+        print(f"{total} citas de {vets} veterinarios en {days} días ({time.perf_counter() - start:.1f} s)")
+
+        client = TestClient(app)
+        headers = admin_headers(client)
+        rnd = random.Random(2)
+        cases = [("disponibilidad", "día", 1), ("disponibilidad", "semana", 7), ("disponibilidad", "mes", 30),
+                 ("agenda", "día", 1)]
+        for endpoint, label, window in cases:
+            for warm in (False, True):
+                times, db_times = [], []
+                for _ in range(n):
+                    since = START + timedelta(days=rnd.randrange(days - window))
+                    vet = rnd.randrange(vets) + 1
+                    if endpoint == "agenda":
+                        params = {"vet": vet, "day": since.date().isoformat()}
+                    else:
+                        params = {"vet": vet, "from": since.isoformat(),
+                                  "to": (since + timedelta(days=window)).isoformat(), "duration": 30}
+                    if warm:
+                        client.get(f"/citas/{endpoint}", params=params, headers=headers)
+                    else:
+                        day_schedule_cache.clear()
+                        veterinarian_cache.clear()
+                    t0 = time.perf_counter()
+                    r = client.get(f"/citas/{endpoint}", params=params, headers=headers)
+                    times.append((time.perf_counter() - t0) * 1000)
+                    assert r.status_code == 200, r.text
+                    db_times.append(float(_DB_DUR.search(r.headers["server-timing"]).group(1)))
+                _report(f"GET {endpoint} ({label}, {'caliente' if warm else 'fría'})", times, db_times)
+
+        db = Session()
+        try:
+            times = []
+            for _ in range(n * 5):
+                at = START + timedelta(days=rnd.randrange(days), hours=rnd.randrange(9, 19), minutes=rnd.choice((0, 30)))
+                t0 = time.perf_counter()
+                find_conflicts(db, rnd.randrange(vets) + 1, at, 30)
+                times.append((time.perf_counter() - t0) * 1000)
+            _report("find_conflicts (create_cita)", times)
+
+            schedule = load_schedule(db, 1, START, START + timedelta(days=days))
+        finally:
+            db.close()
+
+        checks = [START + timedelta(days=rnd.randrange(days), hours=rnd.randrange(24)) for _ in range(10000)]
+        t0 = time.perf_counter()
+        for at in checks:
+            schedule.is_free(at, at + timedelta(minutes=30))
+        indexed_us = (time.perf_counter() - t0) / len(checks) * 1e6
+        t0 = time.perf_counter()
+        for at in checks[:1000]:
+            end = at + timedelta(minutes=30)
+            any(i.start < end and i.end > at for i in schedule.intervals)
+        linear_us = (time.perf_counter() - t0) / 1000 * 1e6
+        print(f"  is_free sobre {len(schedule)} citas de un veterinario: {indexed_us:.2f} µs/comprobación "
+              f"(recorrido lineal: {linear_us:.1f} µs)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,100 @@
+"""
+Latencia de GET /mascotas/historial/buscar (FTS5) sobre muchas notas clínicas.
+
+    python -m benchmarks.bench_historial_search [NOTAS] [N]
+
+Por defecto 5.000.000 de notas (50.000 mascotas) y 200 búsquedas: palabras, frases,
+prefijos y combinaciones con filtro de especie y de fechas. Muestra la latencia total y
+el tiempo de BDD (cabecera Server-Timing).
+"""
+import random
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from ._common import temp_database, admin_headers, percentile
+
+BATCH = 100000
+_DB_DUR = re.compile(r"db;dur=([\d.]+)")
+
+SPECIES = ("perro", "gato", "conejo", "hurón", "loro")
+DIAGNOSES = ("Otitis externa", "Fractura de tibia", "Dermatitis atópica", "Gastroenteritis aguda",
+             "Insuficiencia renal crónica", "Conjuntivitis", "Displasia de cadera", "Parvovirosis",
+             "Leishmaniosis", "Cistitis idiopática", "Periodontitis", "Obesidad", "Alergia alimentaria",
+             "Luxación de rótula", "Pancreatitis", "Diabetes mellitus", "Hipotiroidismo", "Sarna demodécica")
+TREATMENTS = ("Antibiótico oral 7 días", "Antiinflamatorio y reposo", "Limpieza ótica diaria", "Cirugía programada",
+              "Dieta renal", "Colirio antibiótico", "Fisioterapia", "Fluidoterapia intravenosa",
+              "Insulina dos veces al día", "Champú medicado", "Limpieza dental", "Control de peso")
+OBSERVATIONS = ("Dolor agudo a la palpación", "Buen estado general", "Apetito reducido", "Revisión en una semana",
+                "Propietario informa vómitos", "Cojera intermitente", "Prurito intenso", "Fiebre leve",
+                "Sin incidencias", "Pérdida de peso progresiva", "Herida en cicatrización", "Deshidratación moderada")
+
+
+def _populate(engine, notes):
+    rnd = random.Random(1)
+    pets = max(1, notes // 100)
+    start_ts = datetime(2015, 1, 1)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("INSERT INTO clients (id, dni, name) VALUES (1, 'BENCH', 'Bench')")
+        cur.executemany("INSERT INTO pets (id, name, species, owner_id) VALUES (?, ?, ?, 1)",
+                        [(i + 1, f"Mascota {i}", SPECIES[i % len(SPECIES)]) for i in range(pets)])
+        started = time.perf_counter()
+        for first in range(0, notes, BATCH):
+            rows = []
+            for i in range(first, min(notes, first + BATCH)):
+                rows.append((1, rnd.randint(1, pets), start_ts + timedelta(minutes=5 * i),
+                             rnd.choice(DIAGNOSES), rnd.choice(TREATMENTS), f"{rnd.choice(OBSERVATIONS)}. {rnd.choice(OBSERVATIONS)}"))
+            cur.executemany(
+                "INSERT INTO medical_history (client_id, pet_id, timestamp, diagnosis, treatment, observations) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            raw.commit()
+            done = min(notes, first + BATCH)
+            print(f"\r{done} notas ({done / (time.perf_counter() - started):,.0f}/s)", end="", file=sys.stderr, flush=True)
+        print(file=sys.stderr)
+        cur.execute("INSERT INTO medical_history_fts(medical_history_fts) VALUES ('optimize')")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def _queries(n):
+    rnd = random.Random(2)
+    kinds = [
+        lambda: {"q": rnd.choice(("leishmaniosis", "parvovirosis", "pancreatitis", "hipotiroidismo"))},
+        lambda: {"q": '"dolor agudo"'},
+        lambda: {"q": "fractur* tibia"},
+        lambda: {"q": "otitis", "species": rnd.choice(SPECIES)},
+        lambda: {"q": "insuficiencia renal", "fecha_inicio": "2020-01-01", "fecha_fin": "2020-12-31"},
+        lambda: {"q": "dermatitis prurito", "species": "perro", "fecha_inicio": "2018-01-01"},
+    ]
+    return [kinds[i % len(kinds)]() for i in range(n)]
+
+
+def main(notes: int = 5000000, n: int = 200):
+    with temp_database("sqlite") as (engine, _):
+        _populate(engine, notes)
+        client = TestClient(app)
+        headers = admin_headers(client)
+        by_kind = {}
+        for params in _queries(n):
+            start = time.perf_counter()
+            r = client.get("/mascotas/historial/buscar", params={**params, "limit": 20}, headers=headers)
+            elapsed = (time.perf_counter() - start) * 1000
+            assert r.status_code == 200, r.text
+            db_ms = float(_DB_DUR.search(r.headers["server-timing"]).group(1))
+            by_kind.setdefault(" ".join(f"{k}={v}" for k, v in params.items() if k != "species"), []).append((elapsed, db_ms))
+    print(f"{n} búsquedas sobre {notes} notas (p50 / p95 total, p95 BDD):")
+    for label, values in by_kind.items():
+        totals, dbs = [v[0] for v in values], [v[1] for v in values]
+        print(f"  {label[:60]:<60} {percentile(totals, 50):8.1f} / {percentile(totals, 95):8.1f} ms  {percentile(dbs, 95):8.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,61 @@
+"""
+Latencia p99 de GET /citas/ mientras N clientes hacen login sin parar,
+con el hashing en el hilo de la petición (workers=0) y en el pool de procesos.
+
+    python -m benchmarks.bench_login_storm [LOGIN_THREADS] [SECONDS]
+"""
+import json
+import sys
+import threading
+import time
+
+from app.utils.password_pool import password_pool, PASSWORD_POOL_WORKERS
+from ._common import temp_database, running_server, http, percentile, ADMIN_EMAIL, ADMIN_PASSWORD
+
+
+def _storm(base, login_threads, seconds):
+    stop = threading.Event()
+    statuses = {}
+    lock = threading.Lock()
+
+    def login_loop():
+        while not stop.is_set():
+            code, _ = http("POST", base + "/auth/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+            with lock:
+                statuses[code] = statuses.get(code, 0) + 1
+
+    code, body = http("POST", base + "/auth/token", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+    headers = {"Authorization": "Bearer " + json.loads(body)["access_token"]}
+
+    threads = [threading.Thread(target=login_loop, daemon=True) for _ in range(login_threads)]
+    for t in threads:
+        t.start()
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        code, _ = http("GET", base + "/citas/", headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+    stop.set()
+    for t in threads:
+        t.join()
+    return latencies, statuses
+
+
+def main(login_threads: int = 32, seconds: float = 5.0):
+    with temp_database():
+        for workers in (0, PASSWORD_POOL_WORKERS):
+            password_pool.shutdown()
+            password_pool.workers = workers
+            with running_server() as base:
+                latencies, statuses = _storm(base, login_threads, seconds)
+            label = "inline" if workers == 0 else f"pool({workers} procesos)"
+            print(f"{label:>18}: /citas/ p50={percentile(latencies, 50):7.1f} ms "
+                  f"p99={percentile(latencies, 99):7.1f} ms  n={len(latencies)}  logins={statuses}")
+        password_pool.shutdown()
+        password_pool.workers = PASSWORD_POOL_WORKERS
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 32, float(args[1]) if len(args) > 1 else 5.0)
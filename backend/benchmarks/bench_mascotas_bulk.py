@@ -0,0 +1,74 @@
+"""
+Altas y modificaciones de mascotas: /mascotas/bulk frente a una petición por mascota.
+
+    python -m benchmarks.bench_mascotas_bulk [N]
+
+Crea N mascotas (por defecto 2.000) con POST /mascotas/ y otras N con POST /mascotas/bulk
+(lotes de MAX_BULK_ITEMS), y las modifica con PUT /mascotas/{id} y con PATCH /mascotas/bulk.
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.client import Client
+from app.routers.mascotas import MAX_BULK_ITEMS
+from ._common import temp_database, admin_headers
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n: int = 2000):
+    with temp_database() as (_, Session):
+        db = Session()
+        owner = Client(dni="BULK", name="Protectora", email="p@example.com")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+        db.close()
+
+        client = TestClient(app)
+        headers = admin_headers(client)
+        pets = [{"name": f"Mascota {i}", "species": "gato", "age": 1, "owner_id": owner_id} for i in range(n)]
+        single_ids, bulk_ids = [], []
+
+        def create_single():
+            for pet in pets:
+                r = client.post("/mascotas/", json=pet, headers=headers)
+                assert r.status_code == 201, r.text
+                single_ids.append(r.json()["id"])
+
+        def create_bulk():
+            for start in range(0, n, MAX_BULK_ITEMS):
+                r = client.post("/mascotas/bulk", json=pets[start:start + MAX_BULK_ITEMS], headers=headers)
+                assert r.status_code == 200 and r.json()["errors"] == 0, r.text
+                bulk_ids.extend(x["id"] for x in r.json()["results"])
+
+        def update_single():
+            for pet_id in single_ids:
+                r = client.put(f"/mascotas/{pet_id}", json={"age": 2, "breed": "común"}, headers=headers)
+                assert r.status_code == 200, r.text
+
+        def update_bulk():
+            changes = [{"id": pet_id, "age": 2, "breed": "común"} for pet_id in bulk_ids]
+            for start in range(0, n, MAX_BULK_ITEMS):
+                r = client.patch("/mascotas/bulk", json=changes[start:start + MAX_BULK_ITEMS], headers=headers)
+                assert r.status_code == 200 and r.json()["errors"] == 0, r.text
+
+        results = [
+            ("alta", _timed(create_single), _timed(create_bulk)),
+            ("modificación", _timed(update_single), _timed(update_bulk)),
+        ]
+    print(f"{n} mascotas:")
+    for label, single, bulk in results:
+        print(f"  {label:>12}: por fila {n / single:8.0f}/s   bulk {n / bulk:8.0f}/s   (x{single / bulk:.0f})")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,79 @@
+"""
+Latencia por página de GET /mascotas/ con 500.000 mascotas.
+
+    python -m benchmarks.bench_mascotas_listing [FILAS] [N]
+
+Mide la primera página, una del medio y la última (keyset sobre id), los filtros por
+dueño, especie + raza y rango de edad, y include=owner (JOIN con clients).
+"""
+import random
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.pagination import encode_cursor
+from ._common import temp_database, admin_headers
+
+BATCH = 50000
+SPECIES = {"perro": ("labrador", "pastor alemán", "beagle", "mestizo"), "gato": ("siamés", "persa", "común europeo"),
+           "conejo": ("belier", "enano"), "hurón": ("angora",)}
+
+
+def _populate(engine, rows):
+    rnd = random.Random(1)
+    owners = max(1, rows // 2)
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for start in range(0, owners, BATCH):
+            cur.executemany("INSERT INTO clients (id, dni, name) VALUES (?, ?, ?)",
+                            [(i + 1, f"D{i:08d}", f"Cliente {i}") for i in range(start, min(owners, start + BATCH))])
+        kinds = list(SPECIES)
+        for start in range(0, rows, BATCH):
+            batch = []
+            for i in range(start, min(rows, start + BATCH)):
+                species = rnd.choice(kinds)
+                batch.append((f"Mascota {i}", species, rnd.choice(SPECIES[species]), rnd.randint(0, 18),
+                              rnd.randint(1, owners)))
+            cur.executemany("INSERT INTO pets (name, species, breed, age, owner_id) VALUES (?, ?, ?, ?, ?)", batch)
+        raw.commit()
+        cur.execute("ANALYZE")
+    finally:
+        raw.close()
+
+
+def _median_ms(client, headers, params, n):
+    times = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = client.get("/mascotas/", params=params, headers=headers)
+        times.append((time.perf_counter() - start) * 1000)
+        assert r.status_code == 200, r.text
+    return statistics.median(times)
+
+
+def main(rows: int = 500000, n: int = 100):
+    with temp_database() as (engine, _):
+        _populate(engine, rows)
+        client = TestClient(app)
+        headers = admin_headers(client)
+        cases = [
+            ("primera página", {}),
+            ("página del medio", {"cursor": encode_cursor({"id": rows // 2})}),
+            ("última página", {"cursor": encode_cursor({"id": rows - 100})}),
+            ("owner_id", {"owner_id": 1234}),
+            ("especie + raza", {"species": "gato", "breed": "persa", "cursor": encode_cursor({"id": rows // 2})}),
+            ("edad 3-4", {"age_min": 3, "age_max": 4}),
+            ("include=owner", {"include": "owner", "cursor": encode_cursor({"id": rows // 2})}),
+        ]
+        print(f"{rows} mascotas, limit=100, mediana de {n} peticiones:")
+        for label, params in cases:
+            print(f"  {label:>17}: {_median_ms(client, headers, {'limit': 100, **params}, n):7.2f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,99 @@
+"""
+Coste de MetricsMiddleware en GET /citas/.
+
+1) Micro: middleware sobre una app ASGI vacía (µs por petición).
+2) A/B: la app real frente a una copia con los mismos routers sin MetricsMiddleware,
+   con peticiones intercaladas en el mismo event loop. Objetivo: < 2 %.
+
+    python -m benchmarks.bench_metrics_overhead [N]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import auth, citas, clientes, facturacion, informes, mascotas
+from app.utils import metrics
+from app.utils.sqlstats import SQLStatsMiddleware
+from ._common import temp_database, admin_headers
+
+
+class _Route:
+    path = "/citas/"
+    tags = ["citas"]
+
+
+async def _noop_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _send(message):
+    pass
+
+
+def micro(n):
+    wrapped = metrics.MetricsMiddleware(_noop_app)
+    scope = {"type": "http", "method": "GET", "path": "/citas/"}
+
+    async def run(target):
+        start = time.perf_counter()
+        for _ in range(n):
+            await target(dict(scope), None, _send)
+        return (time.perf_counter() - start) / n
+
+    bare = asyncio.run(run(_noop_app))
+    with_metrics = asyncio.run(run(wrapped))
+    return (with_metrics - bare) * 1e6
+
+
+def _bare_app():
+    bare = FastAPI()
+    bare.add_middleware(SQLStatsMiddleware)
+    for module in (clientes, mascotas, citas, facturacion, auth, informes):
+        bare.include_router(module.router)
+    bare.dependency_overrides = app.dependency_overrides
+    return bare
+
+
+def ab(n):
+    """Peticiones intercaladas A/B en un mismo event loop; mediana de latencia por variante."""
+    import httpx
+
+    async def run(apps, headers):
+        clients = {name: httpx.AsyncClient(transport=httpx.ASGITransport(app=a), base_url="http://bench")
+                   for name, a in apps.items()}
+        timings = {name: [] for name in apps}
+        try:
+            for i in range(n):
+                order = list(clients.items()) if i % 2 == 0 else list(clients.items())[::-1]
+                for name, c in order:
+                    start = time.perf_counter()
+                    r = await c.get("/citas/", headers=headers)
+                    timings[name].append(time.perf_counter() - start)
+                    assert r.status_code == 200
+        finally:
+            for c in clients.values():
+                await c.aclose()
+        return {name: statistics.median(v) for name, v in timings.items()}
+
+    with temp_database():
+        headers = admin_headers(TestClient(app))
+        return asyncio.run(run({"con métricas": app, "sin métricas": _bare_app()}, headers))
+
+
+def main(n: int = 2000):
+    print(f"micro: MetricsMiddleware añade {micro(20000):.1f} µs por petición")
+    medians = ab(n)
+    on, off = medians["con métricas"], medians["sin métricas"]
+    print(f"GET /citas/: sin métricas {off * 1000:.3f} ms, con métricas {on * 1000:.3f} ms "
+          f"-> sobrecoste {100 * (on - off) / off:+.2f} %")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
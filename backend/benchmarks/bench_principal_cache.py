@@ -0,0 +1,43 @@
+"""
+Peticiones por segundo en un endpoint protegido con y sin caché de principal.
+
+    python -m benchmarks.bench_principal_cache [N]
+"""
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.security import principal_cache
+from ._common import temp_database, admin_headers, rps
+
+
+def main(n: int = 2000):
+    with temp_database():
+        client = TestClient(app)
+        headers = admin_headers(client)
+
+        def call():
+            r = client.get("/auth/me", headers=headers)
+            assert r.status_code == 200
+
+        original = principal_cache.maxsize
+        try:
+            principal_cache.maxsize = 0
+            principal_cache.clear()
+            without = rps(call, n)
+
+            principal_cache.maxsize = original
+            principal_cache.clear()
+            with_cache = rps(call, n)
+        finally:
+            principal_cache.maxsize = original
+
+        print(f"GET /auth/me x{n}")
+        print(f"  sin caché: {without:8.1f} req/s")
+        print(f"  con caché: {with_cache:8.1f} req/s  ({with_cache / without:.2f}x)")
+        print(f"  stats: {principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
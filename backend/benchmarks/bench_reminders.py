@@ -0,0 +1,78 @@
+"""
+Coste de una pasada de recordatorios según el tamaño de la tabla y las citas pendientes.
+
+    python -m benchmarks.bench_reminders [N]
+
+Para cada combinación (citas en la tabla, citas en la ventana de 24 h) llena una BDD temporal
+(las pasadas ya con recordatorio, las futuras fuera de la ventana sin él) y mide run_once con un
+QueueSink: tiempo, sentencias SQL y mensajes (2 citas por cliente). Entre repeticiones se
+desmarcan las citas de la ventana.
+"""
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from app.reminders import QueueSink, run_once
+from ._common import temp_database, percentile
+
+CASES = ((100_000, 1_000), (1_000_000, 1_000), (1_000_000, 10_000))
+
+
+def _ts(at):
+    return at.isoformat(sep=" ", timespec="microseconds")  # mismo formato que guarda SQLAlchemy
+
+
+def _populate(engine, total, due, now):
+    clients = max(1, due // 2)
+    past, future = (total - due) // 2, total - due - (total - due) // 2
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.executemany("INSERT INTO clients (id, dni, name, email) VALUES (?, ?, ?, ?)",
+                        [(c + 1, f"B{c}", f"Cliente {c}", f"c{c}@example.com") for c in range(clients)])
+
+        def rows():
+            for k in range(past):  # último año, con recordatorio
+                at = now - timedelta(days=365) + timedelta(seconds=k * 365 * 86400 // max(past, 1))
+                yield _ts(at), k % clients + 1, _ts(at)
+            for k in range(future):  # de 2 días a un año vista, aún sin recordatorio
+                at = now + timedelta(days=2) + timedelta(seconds=k * 363 * 86400 // max(future, 1))
+                yield _ts(at), k % clients + 1, None
+            for k in range(due):  # en la ventana
+                at = now + timedelta(seconds=k * 86000 // due)
+                yield _ts(at), k % clients + 1, None
+
+        cur.executemany("INSERT INTO appointments (date, duration_minutes, client_id, reason, completed, "
+                        "reminder_sent_at) VALUES (?, 30, ?, 'Revisión', 0, ?)", rows())
+        raw.commit()
+        cur.execute("ANALYZE")
+    finally:
+        raw.close()
+
+
+def main(n: int = 5):
+    now = datetime(2030, 6, 1, 8)
+    for total, due in CASES:
+        with temp_database() as (engine, Session):
+            _populate(engine, total, due, now)
+            statements = []
+            event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+            times, counts = [], []
+            for _ in range(n):
+                with engine.begin() as conn:
+                    conn.execute(text("UPDATE appointments SET reminder_sent_at = NULL WHERE date >= :a AND date < :b"),
+                                 {"a": now, "b": now + timedelta(hours=24)})
+                statements.clear()
+                t0 = time.perf_counter()
+                result = run_once(Session, QueueSink(), now=now)
+                times.append((time.perf_counter() - t0) * 1000)
+                counts.append(len(statements))
+                assert result.appointments == due, result
+            print(f"  {total:>9,} citas, {due:>6,} en la ventana: p50={percentile(times, 50):8.1f} ms  "
+                  f"({result.reminders} mensajes, {percentile(counts, 50)} sentencias)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:]))
@@ -0,0 +1,108 @@
+"""
+Series de citas periódicas frente a crear cada cita por separado.
+
+    python -m benchmarks.bench_series [CITAS_SERIE] [RONDAS] [DIAS_OCUPADOS]
+
+Con la agenda de un veterinario llena de 9:00 a 19:00 durante DIAS_OCUPADOS días, compara
+reservar una cita semanal CITAS_SERIE veces con POST /citas/ (una petición, una comprobación y
+una transacción por cita) y con un solo POST /citas/series (una consulta por rango para todas
+las repeticiones y una inserción). Muestra tiempo y sentencias SQL por serie.
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.client import Client
+from app.models.pet import Pet
+from app.models.user import Role, User
+from app.models.veterinarian import Veterinarian
+from app.utils import sqlstats
+from app.utils.security import hash_password
+from ._common import temp_database, percentile
+
+RECEP_EMAIL = "bench-recep@example.com"
+RECEP_PASSWORD = "benchpass"
+START = datetime(2030, 1, 7)  # lunes
+
+
+def _seed(engine, Session, busy_days):
+    db = Session()
+    try:
+        role = Role(name="receptionist")
+        db.add(role)
+        db.flush()
+        db.add(User(email=RECEP_EMAIL, hashed_password=hash_password(RECEP_PASSWORD), full_name="Recepción",
+                    role_id=role.id))
+        owner = Client(dni="BENCH", name="Bench")
+        vet = Veterinarian(name="Vet series")
+        db.add_all([owner, vet])
+        db.flush()
+        pet = Pet(name="Bench", species="perro", owner_id=owner.id)
+        db.add(pet)
+        db.commit()
+        ids = owner.id, pet.id, vet.id
+    finally:
+        db.close()
+
+    rnd = random.Random(1)
+    rows = []
+    for d in range(busy_days):
+        t = (START + timedelta(days=d)).replace(hour=9)
+        while t.hour < 19:
+            minutes = rnd.choice((15, 30, 30, 45, 60))
+            rows.append((t.isoformat(sep=" "), minutes, ids[2]))
+            t += timedelta(minutes=minutes + rnd.choice((0, 15)))
+    raw = engine.raw_connection()
+    try:
+        raw.cursor().executemany(
+            "INSERT INTO appointments (date, duration_minutes, veterinarian_id, veterinarian, completed) "
+            "VALUES (?, ?, ?, 'Vet series', 0)", rows,
+        )
+        raw.commit()
+    finally:
+        raw.close()
+    return ids, len(rows)
+
+
+def main(count: int = 52, rounds: int = 10, busy_days: int = 365):
+    with temp_database() as (engine, Session):
+        (owner_id, pet_id, vet_id), busy = _seed(engine, Session, busy_days)
+        print(f"{busy} citas ocupando {busy_days} días; series semanales de {count} citas, {rounds} rondas")
+        client = TestClient(app)
+        r = client.post("/auth/token", data={"username": RECEP_EMAIL, "password": RECEP_PASSWORD})
+        headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+
+        # cada ronda usa un hueco semanal distinto antes de las 9:00 (libre)
+        slots = iter(START + timedelta(days=k % 7, minutes=30 * (k // 7)) for k in range(7 * 18))
+        base = {"duration_minutes": 30, "veterinarian_id": vet_id, "pet_id": pet_id, "client_id": owner_id}
+        results = {}
+        for mode in ("citas sueltas", "serie"):
+            times, statements = [], []
+            for _ in range(rounds):
+                start = next(slots)
+                with sqlstats.capture() as requests:
+                    t0 = time.perf_counter()
+                    if mode == "serie":
+                        r = client.post("/citas/series", headers=headers, json={
+                            **base, "rrule": f"FREQ=WEEKLY;COUNT={count}", "start": start.isoformat()})
+                        assert r.status_code == 201, r.text
+                    else:
+                        for k in range(count):
+                            r = client.post("/citas/", headers=headers, json={
+                                **base, "date": (start + timedelta(weeks=k)).isoformat()})
+                            assert r.status_code == 201, r.text
+                    times.append((time.perf_counter() - t0) * 1000)
+                statements.append(sum(req.statements for req in requests))
+            results[mode] = percentile(times, 50)
+            print(f"  {mode:>14}: p50={percentile(times, 50):8.1f} ms  p95={percentile(times, 95):8.1f} ms  "
+                  f"sentencias={percentile(statements, 50):.0f}")
+        print(f"  serie {results['citas sueltas'] / results['serie']:.0f}x más rápida")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -18,4 +18,135 @@ def test_obtener_token_form(credentials):
     assert response.status_code == 200
     data = response.json()
     assert "access_token" in data
-    assert data["token_type"] == "bearer"
\ No newline at end of file
+    assert data["token_type"] == "bearer"
+
+def test_principal_cache_hits_and_invalidation(credentials, monkeypatch):
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.utils import security
+    from app.utils.security import principal_cache
+
+    monkeypatch.setattr(security, "AUTH_TOKEN_MODE", "lookup")  # sea cual sea el del entorno
+
+    token = client.post("/auth/token", data=credentials).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    principal_cache.clear()
+
+    hits = principal_cache.hits
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert principal_cache.hits == hits + 1
+    assert principal_cache.get(credentials["username"]) is not None
+
+    # un cambio en la fila del usuario invalida su entrada
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == credentials["username"]).first()
+        user.is_active = True
+        db.commit()
+    finally:
+        db.close()
+    assert principal_cache.get(credentials["username"]) is None
+
+
+def test_claims_token_mode_and_revocation(credentials, monkeypatch):
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.utils import security
+
+    monkeypatch.setattr(security, "AUTH_TOKEN_MODE", "claims")
+    token = client.post("/auth/token", data=credentials).json()["access_token"]
+    payload = security.decode_access_token(token)
+    assert payload["role"] == "admin" and payload["uid"]
+
+    headers = {"Authorization": f"Bearer {token}"}
+    security.principal_cache.clear()
+    misses = security.principal_cache.misses
+    r = client.get("/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["role"] == {"name": "admin"}
+    assert r.json()["full_name"] == payload["name"] and payload["name"]
+    assert security.principal_cache.misses == misses  # sin consulta a BDD
+
+    # un cambio deshecho con rollback no revoca nada
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == credentials["username"]).first()
+        user.is_active = False
+        db.flush()
+        db.rollback()
+        assert client.get("/auth/me", headers=headers).status_code == 200
+
+        # desactivar al usuario revoca sus tokens (users.token_version, en la misma transacción)
+        user.is_active = False
+        db.commit()
+        assert client.get("/auth/me", headers=headers).status_code == 401
+        # también en otro worker o tras reiniciar: la versión se lee de la BDD
+        security.token_version_cache.clear()
+        assert client.get("/auth/me", headers=headers).status_code == 401
+        user.is_active = True
+        db.commit()
+    finally:
+        db.close()
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    token = client.post("/auth/token", data=credentials).json()["access_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_password_pool_saturated_returns_503(credentials, monkeypatch):
+    from app.utils.password_pool import password_pool
+
+    monkeypatch.setattr(password_pool, "max_pending", 0)
+    rejected = password_pool.stats()["rejected"]
+    r = client.post("/auth/token", data=credentials)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+    assert password_pool.stats()["rejected"] == rejected + 1
+
+
+def test_password_pool_without_workers_runs_inline():
+    from app.utils.password_pool import PasswordPool
+    from app.utils.security import hash_password, verify_password
+
+    pool = PasswordPool(workers=0, max_pending=1)
+    hashed = pool.run(hash_password, "x")
+    assert pool.run(verify_password, "x", hashed)
+    assert pool._executor is None  # no se ha arrancado ningún proceso
+    assert (pool.stats()["completed"], pool.stats()["pending"]) == (2, 0)
+
+
+def test_auth_stats(credentials):
+    token = client.post("/auth/token", data=credentials).json()["access_token"]
+    r = client.get("/auth/stats", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200
+    stats = r.json()["password_pool"]
+    assert stats["completed"] >= 1 and stats["pending"] == 0
+
+
+def test_login_throttled_before_hashing(monkeypatch):
+    import time
+    from app.utils import ratelimit
+    from app.utils.password_pool import password_pool
+    from app.utils.security import hash_password, verify_password
+
+    monkeypatch.setattr(ratelimit, "login_user_limiter", ratelimit.TokenBucketLimiter(3, 0.01))
+    monkeypatch.setattr(ratelimit, "login_ip_limiter", ratelimit.TokenBucketLimiter(1000, 1.0))
+    bad = {"username": "admin@example.com", "password": "wrong"}
+    for _ in range(3):
+        assert client.post("/auth/token", data=bad).status_code == 400
+
+    submitted = password_pool.stats()["submitted"]
+    n = 20
+    start = time.process_time()
+    for _ in range(n):
+        r = client.post("/auth/token", data=bad)
+        assert r.status_code == 429
+        assert int(r.headers["Retry-After"]) >= 1
+    rejected_cpu = (time.process_time() - start) / n
+    assert password_pool.stats()["submitted"] == submitted  # no se ha verificado ningún hash
+
+    hashed = hash_password("x")
+    start = time.process_time()
+    verify_password("y", hashed)
+    verify_cpu = time.process_time() - start
+    assert rejected_cpu < verify_cpu / 2
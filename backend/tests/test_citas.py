@@ -0,0 +1,425 @@
+import threading
+import time
+import uuid
+from datetime import datetime, time as dtime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models.appointment import Appointment
+from app.models.client import Client
+from app.models.pet import Pet
+from app.models.veterinarian import Veterinarian
+from app.utils import sqlstats
+from app.utils.availability import Interval, ScheduleConflict, VetSchedule, book
+from app.utils.recurrence import occurrences, parse_rrule
+
+client = TestClient(app)
+
+
+def login(username, password):
+    r = client.post("/auth/token", data={"username": username, "password": password})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def _owner_and_pet():
+    db = SessionLocal()
+    try:
+        owner = Client(dni="Cit" + uuid.uuid4().hex[:10], name="Dueño Citas")
+        db.add(owner)
+        db.flush()
+        pet = Pet(name="Cita", species="perro", owner_id=owner.id)
+        db.add(pet)
+        db.commit()
+        return owner.id, pet.id
+    finally:
+        db.close()
+
+
+def _vet(prefix="Dr. ", **hours):
+    """Veterinario sin usuario; por defecto atiende todos los días de 8:00 a 20:00."""
+    db = SessionLocal()
+    try:
+        vet = Veterinarian(name=prefix + uuid.uuid4().hex[:8], work_start=hours.get("work_start", dtime(8)),
+                           work_end=hours.get("work_end", dtime(20)), work_days=hours.get("work_days", "1,2,3,4,5,6,7"))
+        db.add(vet)
+        db.commit()
+        return vet.id
+    finally:
+        db.close()
+
+
+def test_vet_schedule_conflicts_and_free_slots():
+    day = datetime(2030, 1, 7)
+    at = lambda h, m=0: day.replace(hour=h, minute=m)
+    schedule = VetSchedule(at(9), at(14), [
+        Interval(at(8), at(12), 1),        # cita larga que empieza antes de la ventana
+        Interval(at(9), at(9, 30), 2),     # solapada con la anterior
+        Interval(at(12, 30), at(13), 3),
+    ])
+    assert not schedule.is_free(at(11), at(11, 30))
+    assert schedule.is_free(at(12), at(12, 30))  # los extremos no se solapan
+    assert [i.id for i in schedule.conflicts(at(9, 15), at(12, 45))] == [1, 2, 3]
+    assert [i.id for i in schedule.conflicts(at(9, 15), at(12, 45), exclude_id=1)] == [2, 3]
+    assert schedule.free_slots(timedelta(minutes=30)) == [Interval(at(12), at(12, 30)), Interval(at(13), at(14))]
+    assert schedule.free_slots(timedelta(minutes=45)) == [Interval(at(13), at(14))]
+
+
+def test_create_cita_rejects_overlaps_and_reports_availability():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet("Dra. ")
+    day = (datetime.utcnow() + timedelta(days=30)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def book(start, minutes):
+        return client.post("/citas/", headers=headers, json={
+            "date": start.isoformat(), "duration_minutes": minutes, "veterinarian_id": vet,
+            "pet_id": pet_id, "client_id": owner_id,
+        })
+
+    r = book(day, 60)
+    assert r.status_code == 201, r.text
+    first = r.json()
+    assert first["duration_minutes"] == 60
+    assert book(day + timedelta(minutes=30), 30).status_code == 409  # dentro de la primera
+    assert book(day - timedelta(minutes=15), 30).status_code == 409  # termina dentro de la primera
+    second = book(day + timedelta(hours=1), 30)                      # justo al terminar
+    assert second.status_code == 201
+
+    # alargar la primera hasta pisar la segunda
+    r = client.put(f"/citas/{first['id']}", headers=headers, json={"duration_minutes": 90})
+    assert r.status_code == 409
+    r = client.put(f"/citas/{first['id']}", headers=headers, json={"duration_minutes": 45})
+    assert r.status_code == 200 and r.json()["duration_minutes"] == 45
+
+    r = client.get("/citas/disponibilidad", headers=headers, params={
+        "vet": vet, "from": day.isoformat(), "to": (day + timedelta(hours=3)).isoformat(), "duration": 30,
+    })
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [b["id"] for b in body["busy"]] == [first["id"], second.json()["id"]]
+    assert body["free"] == [{
+        "start": (day + timedelta(minutes=90)).isoformat(), "end": (day + timedelta(hours=3)).isoformat(),
+    }]
+    # el hueco de 15 minutos entre 9:45 y 10:00 solo aparece si cabe la duración pedida
+    r = client.get("/citas/disponibilidad", headers=headers, params={
+        "vet": vet, "from": day.isoformat(), "to": (day + timedelta(hours=3)).isoformat(), "duration": 15,
+    })
+    assert r.json()["free"][0] == {
+        "start": (day + timedelta(minutes=45)).isoformat(), "end": (day + timedelta(hours=1)).isoformat(),
+    }
+
+    r = client.get("/citas/disponibilidad", headers=headers, params={
+        "vet": vet, "from": day.isoformat(), "to": day.isoformat(),
+    })
+    assert r.status_code == 400
+
+
+def test_book_rechecks_when_another_booking_commits_first():
+    vet = _vet()
+    start = datetime(2031, 3, 3, 10)
+    db, other = SessionLocal(), SessionLocal()
+    writes = []
+
+    def write():
+        writes.append(start)
+        if len(writes) == 1:
+            # otra reserva del mismo hueco se confirma entre la comprobación y el commit
+            book(other, vet, start, 30, lambda: other.add(Appointment(date=start, veterinarian_id=vet)))
+        db.add(Appointment(date=start + timedelta(minutes=15), veterinarian_id=vet))
+
+    try:
+        with pytest.raises(ScheduleConflict):
+            book(db, vet, start + timedelta(minutes=15), 30, write)
+        assert len(writes) == 1  # el segundo intento ya ve la cita de la otra sesión
+        assert db.query(Appointment).filter(Appointment.veterinarian_id == vet).count() == 1
+    finally:
+        db.close()
+        other.close()
+
+
+def test_concurrent_bookings_of_the_same_slot_have_one_winner():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet()
+    slot = (datetime.utcnow() + timedelta(days=60)).replace(hour=10, minute=0, second=0, microsecond=0)
+    threads_n = 200
+    barrier = threading.Barrier(threads_n)
+    statuses = []
+
+    def attempt(i):
+        payload = {"date": (slot + timedelta(minutes=i % 20)).isoformat(), "duration_minutes": 30,
+                   "veterinarian_id": vet, "pet_id": pet_id, "client_id": owner_id}
+        barrier.wait()
+        statuses.append(client.post("/citas/", headers=headers, json=payload).status_code)
+
+    threads = [threading.Thread(target=attempt, args=(i,)) for i in range(threads_n)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    print(f"{threads_n} reservas simultáneas en {elapsed:.2f} s ({threads_n / elapsed:.0f}/s)")
+
+    # todas se solapan (inicio entre 10:00 y 10:19, 30 minutos): solo una puede ganar
+    assert statuses.count(201) == 1
+    assert statuses.count(409) == threads_n - 1
+    r = client.get("/citas/disponibilidad", headers=headers, params={
+        "vet": vet, "from": slot.isoformat(), "to": (slot + timedelta(hours=1)).isoformat(),
+    })
+    assert len(r.json()["busy"]) == 1
+
+
+def test_agenda_and_availability_read_day_schedules_from_cache():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    # lunes a viernes de 9:00 a 13:00
+    vet = _vet(work_start=dtime(9), work_end=dtime(13), work_days="1,2,3,4,5")
+    monday = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=14)
+    monday -= timedelta(days=monday.weekday())
+    r = client.post("/citas/", headers=headers, json={
+        "date": (monday + timedelta(hours=10)).isoformat(), "veterinarian_id": vet,
+        "pet_id": pet_id, "client_id": owner_id, "reason": "Revisión",
+    })
+    assert r.status_code == 201, r.text
+    cita = r.json()
+
+    params = {"vet": vet, "day": monday.date().isoformat(), "days": 7}
+    with sqlstats.capture() as requests:
+        cold = client.get("/citas/agenda", headers=headers, params=params)
+        warm = client.get("/citas/agenda", headers=headers, params=params)
+    assert [c["id"] for c in cold.json()] == [cita["id"]] and warm.json() == cold.json()
+    assert requests[0].statements >= 2 and requests[1].statements == 0  # caliente: ni veterinario ni citas
+
+    # el horario limita los huecos: sábado y domingo no aparecen
+    r = client.get("/citas/disponibilidad", headers=headers, params={
+        "vet": vet, "from": monday.isoformat(), "to": (monday + timedelta(days=7)).isoformat(), "duration": 60,
+    })
+    free = [(f["start"], f["end"]) for f in r.json()["free"]]
+    assert free[:2] == [((monday + timedelta(hours=9)).isoformat(), (monday + timedelta(hours=10)).isoformat()),
+                        ((monday + timedelta(hours=10, minutes=30)).isoformat(), (monday + timedelta(hours=13)).isoformat())]
+    assert len(free) == 6  # lunes partido en dos + martes a viernes
+
+    # mover la cita al martes invalida los dos días en caché
+    tuesday = monday + timedelta(days=1, hours=11)
+    r = client.put(f"/citas/{cita['id']}", headers=headers, json={"date": tuesday.isoformat()})
+    assert r.status_code == 200, r.text
+    assert client.get("/citas/agenda", headers=headers, params={"vet": vet, "day": monday.date().isoformat()}).json() == []
+    moved = client.get("/citas/agenda", headers=headers, params={"vet": vet, "day": tuesday.date().isoformat()}).json()
+    assert [c["date"] for c in moved] == [tuesday.isoformat()]
+
+
+def test_create_cita_by_veterinarian_name():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet("Dra. Nombre ")
+    db = SessionLocal()
+    name = db.get(Veterinarian, vet).name
+    db.close()
+    payload = {"date": (datetime.utcnow() + timedelta(days=40)).isoformat(), "pet_id": pet_id, "client_id": owner_id}
+    r = client.post("/citas/", headers=headers, json={**payload, "veterinarian": name})
+    assert r.status_code == 201 and r.json()["veterinarian_id"] == vet
+    r = client.post("/citas/", headers=headers, json={**payload, "veterinarian": "Dr. Inexistente " + uuid.uuid4().hex})
+    assert r.status_code == 404
+    r = client.get("/citas/", headers=headers, params={"veterinarian": name})
+    assert [c["veterinarian_id"] for c in r.json()] == [vet]
+
+
+def test_recurrence_rules():
+    start = datetime(2030, 1, 31, 10)  # jueves
+    assert occurrences(parse_rrule("FREQ=DAILY;INTERVAL=2;COUNT=3"), start) == [
+        datetime(2030, 1, 31, 10), datetime(2030, 2, 2, 10), datetime(2030, 2, 4, 10)]
+    weekly = occurrences(parse_rrule("FREQ=WEEKLY;BYDAY=MO,TH;UNTIL=20300211"), start)
+    assert [d.day for d in weekly] == [31, 4, 7, 11]
+    # los meses sin día 31 se saltan
+    assert [d.month for d in occurrences(parse_rrule("FREQ=MONTHLY;COUNT=3"), start)] == [1, 3, 5]
+    for bad in ("FREQ=YEARLY;COUNT=2", "FREQ=WEEKLY", "FREQ=DAILY;COUNT=0", "FREQ=MONTHLY;BYDAY=MO;COUNT=2"):
+        with pytest.raises(ValueError):
+            parse_rrule(bad)
+    with pytest.raises(ValueError):
+        occurrences(parse_rrule("FREQ=DAILY;UNTIL=20401231"), start)
+
+
+def test_series_is_checked_with_one_range_query_and_inserted_atomically():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet()
+    start = (datetime.utcnow() + timedelta(days=7)).replace(hour=10, minute=0, second=0, microsecond=0)
+    taken = start + timedelta(weeks=20, minutes=15)
+    r = client.post("/citas/", headers=headers, json={
+        "date": taken.isoformat(), "veterinarian_id": vet, "pet_id": pet_id, "client_id": owner_id,
+    })
+    assert r.status_code == 201
+    payload = {"rrule": "FREQ=WEEKLY;COUNT=52", "start": start.isoformat(), "duration_minutes": 30,
+               "veterinarian_id": vet, "pet_id": pet_id, "client_id": owner_id, "reason": "Control"}
+
+    with sqlstats.capture() as requests:
+        r = client.post("/citas/series", headers=headers, json=payload)
+    assert r.status_code == 409
+    assert r.json()["detail"]["conflicts"] == [
+        {"start": (start + timedelta(weeks=20)).isoformat(), "end": (start + timedelta(weeks=20, minutes=30)).isoformat()}]
+    db = SessionLocal()
+    assert db.query(Appointment).filter(Appointment.veterinarian_id == vet).count() == 1  # nada insertado
+    db.close()
+
+    r = client.post("/citas/series", headers=headers, json={**payload, "start": (start + timedelta(hours=2)).isoformat()})
+    assert r.status_code == 201, r.text
+    series = r.json()
+    assert len(series["appointments"]) == 52 and {a["series_id"] for a in series["appointments"]} == {series["id"]}
+    # las validaciones no dependen del número de citas (sin contar el login y el refresco final)
+    assert requests[0].statements <= 8
+
+
+def test_series_edit_and_cancel_this_and_following():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet, other_vet = _vet(), _vet()
+    start = (datetime.utcnow() + timedelta(days=7)).replace(hour=9, minute=0, second=0, microsecond=0)
+    r = client.post("/citas/series", headers=headers, json={
+        "rrule": "FREQ=WEEKLY;COUNT=10", "start": start.isoformat(), "veterinarian_id": vet,
+        "pet_id": pet_id, "client_id": owner_id,
+    })
+    series = r.json()
+    ids = [a["id"] for a in series["appointments"]]
+
+    # mover a las 11:00 desde la cuarta parte la serie
+    r = client.patch(f"/citas/series/{series['id']}", headers=headers, params={"cita_id": ids[3]},
+                     json={"shift_minutes": 120, "veterinarian_id": other_vet})
+    assert r.status_code == 200, r.text
+    tail = r.json()
+    assert tail["id"] != series["id"] and [a["id"] for a in tail["appointments"]] == ids[3:]
+    assert all(a["date"].endswith("T11:00:00") and a["veterinarian_id"] == other_vet for a in tail["appointments"])
+    head = client.get(f"/citas/series/{series['id']}", headers=headers).json()
+    assert [a["id"] for a in head["appointments"]] == ids[:3] and "UNTIL=" in head["rrule"]
+    agenda = client.get("/citas/agenda", headers=headers,
+                        params={"vet": other_vet, "day": (start + timedelta(weeks=3)).date().isoformat()}).json()
+    assert [a["id"] for a in agenda] == [ids[3]]
+
+    # un cambio que choca no aplica nada
+    blocker = client.post("/citas/", headers=headers, json={
+        "date": (start + timedelta(weeks=8, hours=3)).isoformat(), "veterinarian_id": other_vet,
+        "pet_id": pet_id, "client_id": owner_id,
+    })
+    assert blocker.status_code == 201
+    r = client.patch(f"/citas/series/{tail['id']}", headers=headers, json={"shift_minutes": 60})
+    assert r.status_code == 409 and len(r.json()["detail"]["conflicts"]) == 1
+
+    r = client.delete(f"/citas/series/{tail['id']}", headers=headers, params={"cita_id": ids[6]})
+    assert r.status_code == 204
+    remaining = client.get(f"/citas/series/{tail['id']}", headers=headers).json()["appointments"]
+    assert [a["id"] for a in remaining] == ids[3:6]
+    assert client.get(f"/citas/{ids[6]}", headers=headers).status_code == 404
+    # anular la serie entera la borra
+    assert client.delete(f"/citas/series/{tail['id']}", headers=headers).status_code == 204
+    assert client.get(f"/citas/series/{tail['id']}", headers=headers).status_code == 404
+
+
+def test_series_without_pivot_leaves_past_occurrences_alone():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet()
+    start = (datetime.utcnow() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    series = client.post("/citas/series", headers=headers, json={
+        "rrule": "FREQ=WEEKLY;COUNT=3", "start": start.isoformat(), "veterinarian_id": vet,
+        "pet_id": pet_id, "client_id": owner_id,
+    }).json()
+    ids = [a["id"] for a in series["appointments"]]
+    # la primera ya pasó y nadie la marcó como completada
+    past = start - timedelta(days=7)
+    db = SessionLocal()
+    try:
+        db.get(Appointment, ids[0]).date = past
+        db.commit()
+    finally:
+        db.close()
+
+    r = client.patch(f"/citas/series/{series['id']}", headers=headers, json={"shift_minutes": 60})
+    assert r.status_code == 200, r.text
+    assert [a["id"] for a in r.json()["appointments"]] == ids[1:]
+    assert client.get(f"/citas/{ids[0]}", headers=headers).json()["date"] == past.isoformat()
+
+    assert client.delete(f"/citas/series/{series['id']}", headers=headers).status_code == 204
+    remaining = client.get(f"/citas/series/{series['id']}", headers=headers).json()["appointments"]
+    assert [a["id"] for a in remaining] == [ids[0]]
+
+
+def test_calendar_feed_with_conditional_get():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet, other_vet = _vet(), _vet()
+    day = (datetime.utcnow() + timedelta(days=5)).replace(hour=9, minute=0, second=0, microsecond=0)
+    ids = []
+    for hours, reason in ((0, "Vacuna; anual"), (2, "Revisión")):
+        r = client.post("/citas/", headers=headers, json={
+            "date": (day + timedelta(hours=hours)).isoformat(), "veterinarian_id": vet, "reason": reason,
+            "pet_id": pet_id, "client_id": owner_id,
+        })
+        ids.append(r.json()["id"])
+
+    url = client.get(f"/citas/calendar/{vet}/suscripcion", headers=headers).json()["url"]
+    assert client.get(f"/citas/calendar/{vet}.ics", params={"token": "x"}).status_code == 401
+    r = client.get(url)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/calendar")
+    body = r.text
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.count("BEGIN:VEVENT") == 2
+    assert f"UID:cita-{ids[0]}@" in body and "SUMMARY:Vacuna\\; anual - Cita\r\n" in body
+    assert f"DTSTART:{day:%Y%m%dT%H%M%SZ}" in body
+    etag, last_modified = r.headers["etag"], r.headers["last-modified"]
+
+    # sondeos sin cambios: 304 leyendo solo la fila del veterinario
+    with sqlstats.capture() as requests:
+        by_etag = client.get(url, headers={"If-None-Match": etag})
+        by_date = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert by_etag.status_code == by_date.status_code == 304 and by_etag.headers["etag"] == etag
+    assert requests[0].statements == requests[1].statements == 1
+
+    # mover una cita a otro veterinario cambia la agenda de los dos; borrarla, también
+    versions = [etag]
+    r = client.put(f"/citas/{ids[1]}", headers=headers, json={"veterinarian_id": other_vet})
+    assert r.status_code == 200
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.text.count("BEGIN:VEVENT") == 1
+    versions.append(r.headers["etag"])
+    client.delete(f"/citas/{ids[0]}", headers=login("admin@example.com", "adminpass"))
+    r = client.get(url, headers={"If-None-Match": versions[-1]})
+    assert r.status_code == 200 and "BEGIN:VEVENT" not in r.text
+    assert len(set(versions + [r.headers["etag"]])) == 3
+
+    # nueva URL: la anterior deja de valer; la recepción no puede rotarla, un veterinario ajeno tampoco
+    admin = login("admin@example.com", "adminpass")
+    assert client.post(f"/citas/calendar/{vet}/suscripcion", headers=headers).status_code == 403
+    assert client.post(f"/citas/calendar/{vet}/suscripcion", headers=login("vet@example.com", "vetpass")).status_code == 403
+    rotated = client.post(f"/citas/calendar/{vet}/suscripcion", headers=admin).json()["url"]
+    assert rotated != url and client.get(url).status_code == 401
+    assert client.get(rotated).status_code == 200
+    assert client.get(f"/citas/calendar/{vet}/suscripcion", headers=headers).json()["url"] == rotated
+    assert client.get("/citas/calendar/999999999.ics", params={"token": rotated.split("token=")[1]}).status_code == 401
+
+
+def test_calendar_feed_changes_when_a_pet_is_renamed():
+    headers = login("recep@example.com", "receppass")
+    owner_id, pet_id = _owner_and_pet()
+    vet = _vet()
+    start = (datetime.utcnow() + timedelta(days=6)).replace(hour=10, minute=0, second=0, microsecond=0)
+    r = client.post("/citas/", headers=headers, json={
+        "date": start.isoformat(), "veterinarian_id": vet, "reason": "Vacuna", "pet_id": pet_id, "client_id": owner_id,
+    })
+    assert r.status_code == 201, r.text
+    url = client.get(f"/citas/calendar/{vet}/suscripcion", headers=headers).json()["url"]
+    etag = client.get(url).headers["etag"]
+
+    assert client.put(f"/mascotas/{pet_id}", headers=headers, json={"name": "Rocky"}).status_code == 200
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and "SUMMARY:Vacuna - Rocky\r\n" in r.text
+    etag = r.headers["etag"]
+
+    r = client.patch("/mascotas/bulk", headers=headers, json=[{"id": pet_id, "name": "Bobby"}])
+    assert r.json()["applied"] == 1
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200 and "SUMMARY:Vacuna - Bobby\r\n" in r.text
+    # otros cambios de la mascota no tocan la agenda
+    etag = r.headers["etag"]
+    assert client.put(f"/mascotas/{pet_id}", headers=headers, json={"age": 4}).status_code == 200
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
@@ -1,6 +1,20 @@
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
 from app.main import app
+from app.database import SessionLocal
+from app.models.appointment import Appointment
+from app.models.client import Client
+from app.models.history import MedicalHistory
+from app.models.invoice import Invoice
+from app.models.payment import Payment
+from app.models.pet import Pet
+from app.utils import sqlstats
 
 client = TestClient(app)
 
@@ -13,6 +27,14 @@ def login_admin():
     return r.json()["access_token"]
 
 
+def login_recep():
+    r = client.post("/auth/token", data={
+        "username": "recep@example.com",
+        "password": "receppass"
+    })
+    return r.json()["access_token"]
+
+
 def test_list_clientes():
     token = login_admin()
     r = client.get("/clientes/", headers={"Authorization": f"Bearer {token}"})
@@ -33,4 +55,260 @@ def test_create_cliente():
     r = client.post("/clientes/", json=nuevo, headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200
     data = r.json()
-    assert data["dni"] == "XYZ123"
\ No newline at end of file
+    assert data["dni"] == "XYZ123"
+
+def test_list_clientes_keyset_pagination_and_filters():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+    prefix = "Pag" + uuid.uuid4().hex[:8]
+    ids = []
+    for i in range(3):
+        r = client.post("/clientes/", json={
+            "dni": f"{prefix}-{i}", "name": f"{prefix} {i}", "email": f"{prefix}{i}@example.com",
+        }, headers=headers)
+        assert r.status_code == 200
+        ids.append(r.json()["id"])
+
+    r = client.get("/clientes/", params={"name": prefix, "limit": 2}, headers=headers)
+    assert r.status_code == 200
+    assert [c["id"] for c in r.json()] == ids[:2]
+    cursor = r.headers["x-next-cursor"]
+
+    r = client.get("/clientes/", params={"name": prefix, "limit": 2, "cursor": cursor}, headers=headers)
+    assert [c["id"] for c in r.json()] == ids[2:]
+    assert "x-next-cursor" not in r.headers
+
+    r = client.get("/clientes/", params={"dni": f"{prefix}-1"}, headers=headers)
+    assert [c["id"] for c in r.json()] == [ids[1]]
+    r = client.get("/clientes/", params={"email": f"{prefix}2@example.com"}, headers=headers)
+    assert [c["id"] for c in r.json()] == [ids[2]]
+    r = client.get("/clientes/", params={"name": prefix, "plan": "no-existe"}, headers=headers)
+    assert r.json() == []
+
+
+def test_list_clientes_name_prefix_ending_in_max_code_point():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    tag = "Max" + uuid.uuid4().hex[:8]
+    r = client.post("/clientes/", json={"dni": tag, "name": f"{tag}\U0010ffffz", "email": f"{tag}@example.com"},
+                    headers=headers)
+    assert r.status_code == 200, r.text
+    for prefix in (f"{tag}\U0010ffff", "\U0010ffff"):
+        r = client.get("/clientes/", params={"name": prefix}, headers=headers)
+        assert r.status_code == 200, r.text
+    r = client.get("/clientes/", params={"name": f"{tag}\U0010ffff"}, headers=headers)
+    assert [c["dni"] for c in r.json()] == [tag]
+
+
+def test_list_and_create_clientes_as_receptionist():
+    headers = {"Authorization": f"Bearer {login_recep()}"}
+    tag = "Rec" + uuid.uuid4().hex[:8]
+    r = client.post("/clientes/", json={"dni": tag, "name": tag, "email": f"{tag}@example.com"}, headers=headers)
+    assert r.status_code == 200, r.text
+    r = client.get("/clientes/", params={"name": tag}, headers=headers)
+    assert r.status_code == 200 and [c["dni"] for c in r.json()] == [tag]
+
+
+def test_list_clientes_invalid_cursor():
+    token = login_admin()
+    r = client.get("/clientes/", params={"cursor": "no-es-un-cursor"}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 400
+
+
+def test_search_clientes_prefix_and_sync_with_writes():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+    tag = "zq" + uuid.uuid4().hex[:8]
+    r = client.post("/clientes/", json={
+        "dni": tag.upper(), "name": f"Ramón {tag}", "email": f"{tag}@example.com", "phone": "611222333",
+    }, headers=headers)
+    cid = r.json()["id"]
+
+    for q in (tag[:6], f"ramon {tag[:5]}", tag.upper(), f"{tag}@exa"):
+        r = client.get("/clientes/search", params={"q": q}, headers=headers)
+        assert r.status_code == 200
+        assert cid in [c["id"] for c in r.json()], q
+
+    r = client.get("/clientes/search", params={"q": f"{tag} otro"}, headers=headers)
+    assert r.json() == []
+    r = client.get("/clientes/search", params={"q": "***"}, headers=headers)
+    assert r.json() == []
+
+    client.delete(f"/clientes/{cid}", headers=headers)
+    r = client.get("/clientes/search", params={"q": tag}, headers=headers)
+    assert r.json() == []
+
+
+def test_search_clientes_as_receptionist():
+    headers = {"Authorization": f"Bearer {login_recep()}"}
+    r = client.get("/clientes/search", params={"q": "a"}, headers=headers)
+    assert r.status_code == 200, r.text
+
+
+def test_client_search_postgres_matches_word_prefixes_without_accents():
+    from sqlalchemy.dialects import postgresql
+    from app.utils.search import client_search_statement
+
+    compiled = client_search_statement("postgresql", "Ána gar", 20).compile(dialect=postgresql.dialect())
+    # prefijo de palabra (no subcadena: "ana" no debe encontrar "Mariana") y sin acentos en ambos lados
+    assert (compiled.params["t0"], compiled.params["t1"]) == ("\\mána", "\\mgar")
+    assert "clinica_unaccent(%(t0)s)" in str(compiled) and " LIKE " not in str(compiled)
+
+
+def test_search_clientes_ranks_every_match():
+    # más de 1000 coincidencias: la mejor (el término en el nombre) es la más nueva
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    tag = "zr" + uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Client), [
+            {"dni": f"{tag}-{i}", "name": f"Cliente {i}", "email": f"c{i}@example.com", "address": f"Calle {tag}"}
+            for i in range(1001)
+        ])
+        best = Client(dni=f"{tag}-best", name=f"Ramón {tag}", email="best@example.com")
+        db.add(best)
+        db.commit()
+        r = client.get("/clientes/search", params={"q": tag, "limit": 1}, headers=headers)
+        assert [c["id"] for c in r.json()] == [best.id]
+    finally:
+        db.execute(delete(Client).where(Client.dni.like(f"{tag}-%")))
+        db.commit()
+        db.close()
+
+
+def test_import_clientes_csv_report():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+    tag = "Imp" + uuid.uuid4().hex[:8]
+    client.post("/clientes/", json={"dni": f"{tag}-0", "name": "Ya existe", "email": "x@example.com"}, headers=headers)
+    csv_body = (
+        "dni,name,email,phone\n"
+        f"{tag}-0,Existente,e@example.com,\n"
+        f"{tag}-1,Uno,uno@example.com,600000001\n"
+        f"{tag}-2,Dos,dos@example.com,\n"
+        f"{tag}-1,Uno otra vez,uno@example.com,\n"
+        f"{tag}-3,,sin-nombre@example.com,\n"
+    )
+    r = client.post("/clientes/import", files={"file": ("clientes.csv", csv_body, "text/csv")}, headers=headers)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert (report["total"], report["inserted"], report["existing"], report["error_count"]) == (5, 2, 1, 2)
+    assert [(e["row"], e["dni"]) for e in report["errors"]] == [(5, f"{tag}-1"), (6, f"{tag}-3")]
+    assert "línea 3" in report["errors"][0]["error"]
+
+    r = client.get("/clientes/", params={"dni": f"{tag}-2"}, headers=headers)
+    assert [c["name"] for c in r.json()] == ["Dos"]
+
+
+def test_import_clientes_ndjson():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+    tag = "Nd" + uuid.uuid4().hex[:8]
+    body = f'{{"dni": "{tag}-1", "name": "Uno", "email": "u@example.com"}}\n{{roto\n'
+    r = client.post("/clientes/import", files={"file": ("clientes.ndjson", body, "application/x-ndjson")}, headers=headers)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert (report["inserted"], report["error_count"]) == (1, 1)
+    assert report["errors"][0]["row"] == 2
+
+
+def test_import_clientes_malformed_mid_file_keeps_earlier_rows():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+    tag = "Bad" + uuid.uuid4().hex[:8]
+    # un campo mayor que csv.field_size_limit() hace fallar al lector en la línea 3
+    csv_body = f"dni,name,email\n{tag}-1,Uno,uno@example.com\n{tag}-2,{'x' * 200000},dos@example.com\n"
+    r = client.post("/clientes/import", files={"file": ("clientes.csv", csv_body, "text/csv")}, headers=headers)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert (report["inserted"], report["aborted_at"]) == (1, 3)
+    assert report["errors"][-1]["row"] == 3
+    r = client.get("/clientes/", params={"dni": f"{tag}-1"}, headers=headers)
+    assert [c["name"] for c in r.json()] == ["Uno"]
+
+    # si no se llegó a guardar nada, sigue siendo un 400
+    bad_only = f"dni,name,email\n{tag}-3,{'x' * 200000},tres@example.com\n"
+    r = client.post("/clientes/import", files={"file": ("clientes.csv", bad_only, "text/csv")}, headers=headers)
+    assert r.status_code == 400
+    assert "línea 2" in r.json()["detail"]
+
+
+def _seed_client_with_activity(n_pets):
+    db = SessionLocal()
+    try:
+        c = Client(dni="Ov" + uuid.uuid4().hex[:10], name="Ficha", email="ficha@example.com")
+        db.add(c)
+        db.flush()
+        for i in range(n_pets):
+            pet = Pet(name=f"Mascota {i}", species="perro", owner_id=c.id)
+            db.add(pet)
+            db.flush()
+            db.add(Appointment(date=datetime.now() + timedelta(days=i + 1), reason="Revisión", pet_id=pet.id, client_id=c.id))
+            db.add(Appointment(date=datetime.now() - timedelta(days=30), reason="Pasada", pet_id=pet.id, client_id=c.id))
+            db.add(MedicalHistory(client_id=c.id, pet_id=pet.id, event="vacuna", timestamp=datetime.now() - timedelta(days=i)))
+            inv = Invoice(client_id=c.id, date=date.today(), total=100.0, pet_id=pet.id, paid=False)
+            inv.payments = [Payment(amount=30.0), Payment(amount=20.0)]
+            db.add(inv)
+            db.add(Invoice(client_id=c.id, date=date.today(), total=10.0, paid=True))
+        db.commit()
+        return c.id
+    finally:
+        db.close()
+
+
+def test_client_overview_with_bounded_queries():
+    # la ficha es para recepción
+    headers = {"Authorization": f"Bearer {login_recep()}"}
+    statements = []
+    for n_pets in (1, 4):
+        cid = _seed_client_with_activity(n_pets)
+        with sqlstats.capture() as requests:
+            r = client.get(f"/clientes/{cid}/overview", headers=headers)
+        assert r.status_code == 200, r.text
+        statements.append(requests[-1].statements)
+        data = r.json()
+        assert data["id"] == cid and len(data["pets"]) == n_pets
+        assert len(data["upcoming_appointments"]) == n_pets
+        assert all(a["reason"] == "Revisión" for a in data["upcoming_appointments"])
+        assert len(data["open_invoices"]) == n_pets
+        assert data["open_invoices"][0]["paid_amount"] == 50.0
+        assert data["open_invoices"][0]["pending_amount"] == 50.0
+        assert len(data["recent_history"]) == n_pets
+
+    # mismo número de consultas con 1 y con 4 mascotas (sin N+1)
+    assert statements[0] == statements[1] <= 7, statements
+
+    r = client.get(f"/clientes/{cid}/overview", params={"limit": 2}, headers=headers)
+    assert len(r.json()["upcoming_appointments"]) == 2 and len(r.json()["recent_history"]) == 2
+    assert client.get("/clientes/999999999/overview", headers=headers).status_code == 404
+
+
+@pytest.fixture
+def utc_plus_3():
+    # el host en UTC+3: datetime.now() va 3 horas por delante de las fechas guardadas (UTC)
+    old = os.environ.get("TZ")
+    os.environ["TZ"] = "Etc/GMT-3"
+    time.tzset()
+    yield
+    if old is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = old
+    time.tzset()
+
+
+def test_client_overview_splits_upcoming_in_utc(utc_plus_3):
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    db = SessionLocal()
+    try:
+        c = Client(dni="Utc" + uuid.uuid4().hex[:10], name="Ficha UTC", email="utc@example.com")
+        db.add(c)
+        db.flush()
+        db.add(Appointment(date=datetime.utcnow() + timedelta(minutes=5), reason="Dentro de 5 min", client_id=c.id))
+        db.add(Appointment(date=datetime.utcnow() - timedelta(minutes=5), reason="Hace 5 min", client_id=c.id))
+        db.commit()
+        cid = c.id
+    finally:
+        db.close()
+    r = client.get(f"/clientes/{cid}/overview", headers=headers)
+    assert r.status_code == 200, r.text
+    assert [a["reason"] for a in r.json()["upcoming_appointments"]] == ["Dentro de 5 min"]
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import text
+
+from app.database import build_engine
+
+
+def test_sqlite_profile_applies_pragmas(tmp_path):
+    engine = build_engine(f"sqlite:///{tmp_path / 'perfil.db'}", "sqlite")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+    engine.dispose()
+
+
+def test_unknown_profile_rejected():
+    with pytest.raises(ValueError):
+        build_engine("sqlite://", "turbo")
+
+
+def test_to_async_url():
+    from app.database import to_async_url
+
+    assert to_async_url("sqlite:///./clinica.db") == "sqlite+aiosqlite:///./clinica.db"
+    assert to_async_url("postgresql://u:p@db/clinica") == "postgresql+asyncpg://u:p@db/clinica"
+
+
+def test_read_replica_and_read_your_writes():
+    from fastapi.testclient import TestClient
+    from sqlalchemy.exc import OperationalError
+    from app import database
+    from app.main import app
+
+    import uuid
+
+    client = TestClient(app)
+    dni = f"RYW-{uuid.uuid4().hex[:8]}"
+    token = client.post("/auth/token", data={"username": "admin@example.com", "password": "adminpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    database.configure_read_replica(database.DATABASE_URL, read_your_writes_seconds=60)
+    try:
+        # la réplica local es una conexión SQLite aparte en modo query_only
+        db = database.ReadSessionLocal()
+        with pytest.raises(OperationalError):
+            db.execute(text("UPDATE clients SET name = name"))
+        db.close()
+
+        assert client.get("/clientes/", headers=headers).status_code == 200
+        assert database.recent_writers.get(headers["Authorization"]) is None
+
+        r = client.post("/clientes/", json={"dni": dni, "name": "Lectura", "email": "ryw@example.com"}, headers=headers)
+        assert r.status_code == 200
+        assert database.recent_writers.get(headers["Authorization"]) is not None
+        assert any(c["dni"] == dni for c in client.get("/clientes/", params={"dni": dni}, headers=headers).json())
+    finally:
+        database.configure_read_replica(None, read_your_writes_seconds=0)
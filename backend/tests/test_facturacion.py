@@ -22,4 +22,16 @@ def test_crear_factura():
     }
 
     r = client.post("/facturacion/crear", json=nuevo, headers={"Authorization": f"Bearer {token}"})
-    assert r.status_code in (200, 201)
\ No newline at end of file
+    assert r.status_code in (200, 201)
+
+def test_listar_facturas_y_pagos():
+    token = login_admin()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.get("/facturacion/", headers=headers)
+    assert r.status_code == 200
+    assert all(isinstance(inv["payments"], list) for inv in r.json())
+
+    r = client.get("/facturacion/payments", headers=headers)
+    assert r.status_code == 200
+    assert isinstance(r.json(), list)
@@ -1,5 +1,14 @@
+import uuid
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
+from sqlalchemy import insert
 from app.main import app
+from app.database import SessionLocal
+from app.models.client import Client
+from app.models.history import MedicalHistory
+from app.models.pet import Pet
+from app.utils import sqlstats
 
 client = TestClient(app)
 
@@ -16,4 +25,219 @@ def test_list_mascotas():
     token = login_admin()
     r = client.get("/mascotas/", headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200
-    assert isinstance(r.json(), list)
\ No newline at end of file
+    assert isinstance(r.json(), list)
+
+def test_list_mascotas_keyset_filters_and_owner():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    db = SessionLocal()
+    try:
+        owner = Client(dni="Pet" + uuid.uuid4().hex[:10], name="Dueña Filtros", email="f@example.com")
+        db.add(owner)
+        db.flush()
+        pets = [Pet(name=f"P{i}", species="hurón", breed="angora" if i % 2 else "común", age=i, owner_id=owner.id)
+                for i in range(5)]
+        db.add_all(pets)
+        db.commit()
+        owner_id, ids = owner.id, [p.id for p in pets]
+    finally:
+        db.close()
+
+    r = client.get("/mascotas/", params={"owner_id": owner_id, "limit": 3}, headers=headers)
+    assert [p["id"] for p in r.json()] == ids[:3]
+    r = client.get("/mascotas/", params={"owner_id": owner_id, "limit": 3, "cursor": r.headers["x-next-cursor"]},
+                   headers=headers)
+    assert [p["id"] for p in r.json()] == ids[3:]
+    assert "x-next-cursor" not in r.headers
+
+    r = client.get("/mascotas/", params={"owner_id": owner_id, "species": "hurón", "breed": "angora"}, headers=headers)
+    assert [p["id"] for p in r.json()] == [ids[1], ids[3]]
+    r = client.get("/mascotas/", params={"owner_id": owner_id, "age_min": 1, "age_max": 2}, headers=headers)
+    assert [p["age"] for p in r.json()] == [1, 2]
+
+    with sqlstats.capture() as requests:
+        r = client.get("/mascotas/", params={"owner_id": owner_id, "include": "owner"}, headers=headers)
+    assert {p["owner_name"] for p in r.json()} == {"Dueña Filtros"}
+    assert requests[-1].statements <= 2  # usuario (si la caché está fría) + una consulta con JOIN
+    r = client.get("/mascotas/", params={"owner_id": owner_id}, headers=headers)
+    assert r.json()[0]["owner_name"] is None
+    assert client.get("/mascotas/", params={"include": "otro"}, headers=headers).status_code == 422
+
+
+def _new_owner():
+    db = SessionLocal()
+    try:
+        owner = Client(dni="Bulk" + uuid.uuid4().hex[:10], name="Protectora", email="p@example.com")
+        db.add(owner)
+        db.commit()
+        return owner.id
+    finally:
+        db.close()
+
+
+def test_create_and_update_mascota():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    owner_id = _new_owner()
+    r = client.post("/mascotas/", json={"name": "Toby", "species": "perro", "owner_id": owner_id}, headers=headers)
+    assert r.status_code == 201, r.text
+    pet_id = r.json()["id"]
+    r = client.put(f"/mascotas/{pet_id}", json={"breed": "beagle", "weight": 12}, headers=headers)
+    assert r.json()["breed"] == "beagle" and r.json()["owner_id"] == owner_id
+    r = client.post("/mascotas/", json={"name": "Nadie", "owner_id": 999999999}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_bulk_create_and_patch_mascotas():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    owner_id = _new_owner()
+    items = [{"name": f"Cachorro {i}", "species": "perro", "age": 0, "owner_id": owner_id} for i in range(3)]
+    items.insert(1, {"name": "Sin dueño", "owner_id": 999999999})
+    items.append({"species": "gato", "owner_id": owner_id})  # falta name
+
+    with sqlstats.capture() as requests:
+        r = client.post("/mascotas/bulk", json=items, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert (body["applied"], body["errors"]) == (3, 2)
+    assert [x["status"] for x in body["results"]] == ["created", "error", "created", "created", "error"]
+    assert body["results"][1]["error"] == "Owner not found"
+    assert "name" in body["results"][4]["error"]
+    # usuario + dueños + un INSERT multi-fila (no una sentencia por mascota)
+    assert requests[-1].statements <= 3, requests[-1].shapes
+    ids = [x["id"] for x in body["results"] if x["status"] == "created"]
+
+    r = client.get("/mascotas/", params={"owner_id": owner_id}, headers=headers)
+    assert [p["name"] for p in r.json()] == ["Cachorro 0", "Cachorro 1", "Cachorro 2"]
+    # cada id devuelto es el de la mascota de ese índice
+    names = {p["id"]: p["name"] for p in r.json()}
+    assert [names[i] for i in ids] == ["Cachorro 0", "Cachorro 1", "Cachorro 2"]
+
+    twins = [{"name": "Gemelo", "species": "gato", "weight": w, "owner_id": owner_id} for w in (5, 3, 4)]
+    body = client.post("/mascotas/bulk", json=twins, headers=headers).json()
+    for item, result in zip(twins, body["results"]):
+        assert client.get(f"/mascotas/{result['id']}", headers=headers).json()["weight"] == item["weight"]
+
+    changes = [
+        {"id": ids[0], "name": "Luna"},
+        {"id": ids[1], "breed": "mestizo", "age": 1},
+        {"id": ids[2], "owner_id": 999999999},
+        {"id": 999999999, "name": "X"},
+        {"id": ids[0], "age": 3},
+    ]
+    r = client.patch("/mascotas/bulk", json=changes, headers=headers)
+    body = r.json()
+    assert [x["status"] for x in body["results"]] == ["updated", "updated", "error", "error", "error"]
+    pets = {p["id"]: p for p in client.get("/mascotas/", params={"owner_id": owner_id}, headers=headers).json()}
+    assert pets[ids[0]]["name"] == "Luna" and pets[ids[0]]["age"] == 0
+    assert (pets[ids[1]]["breed"], pets[ids[1]]["age"]) == ("mestizo", 1)
+
+
+def test_bulk_mascotas_requires_admin_or_receptionist():
+    r = client.post("/auth/token", data={"username": "vet@example.com", "password": "vetpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    items = [{"name": "Intrusa", "owner_id": _new_owner()}]
+    assert client.post("/mascotas/bulk", json=items, headers=headers).status_code == 403
+    assert client.patch("/mascotas/bulk", json=[{"id": 1, "name": "X"}], headers=headers).status_code == 403
+
+
+def test_bulk_mascotas_limit():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    r = client.post("/mascotas/bulk", json=[{"name": "x", "owner_id": 1}] * 1001, headers=headers)
+    assert r.status_code == 413
+
+
+def test_historial_keyset_newest_first_and_summary():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    owner_id = _new_owner()
+    r = client.post("/mascotas/", json={"name": "Kira", "species": "gato", "owner_id": owner_id}, headers=headers)
+    pet_id = r.json()["id"]
+
+    t0 = datetime(2024, 1, 1, 10, 0)
+    ids = []
+    for i, (minutes, diagnosis) in enumerate([(0, "otitis"), (5, None), (5, "dermatitis"), (10, None), (20, "alta")]):
+        r = client.post(f"/mascotas/{pet_id}/historial", json={
+            "event": f"visita {i}", "diagnosis": diagnosis, "date": (t0 + timedelta(minutes=minutes)).isoformat(),
+        }, headers=headers)
+        assert r.status_code == 201, r.text
+        ids.append(r.json()["id"])
+    assert r.json()["created_by"] and r.json()["client_id"] == owner_id
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get(f"/mascotas/{pet_id}/historial", params=params, headers=headers)
+        assert r.status_code == 200
+        seen += [h["id"] for h in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    # más reciente primero; a igual timestamp, el id mayor primero
+    assert seen == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+    r = client.get("/mascotas/historial/resumen", params={"limit": 1000}, headers=headers)
+    mine = [s for s in r.json() if s["pet_id"] == pet_id]
+    assert len(mine) == 1 and (mine[0]["diagnosis"], mine[0]["history_id"]) == ("alta", ids[4])
+
+    assert client.get("/mascotas/999999999/historial", headers=headers).status_code == 404
+    assert client.post("/mascotas/999999999/historial", json={"diagnosis": "x"}, headers=headers).status_code == 404
+
+
+def test_historial_search_phrase_prefix_accents_and_filters():
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    owner_id = _new_owner()
+    tag = "zx" + uuid.uuid4().hex[:8]
+    pets = {}
+    for name, species in (("Rex", "perro"), ("Mimi", "gato")):
+        pets[name] = client.post("/mascotas/", json={"name": name, "species": species, "owner_id": owner_id},
+                                 headers=headers).json()["id"]
+    notes = [
+        ("Rex", "2024-03-01T10:00:00", f"Fractura de tibia {tag}", "Inmovilización", "Dolor agudo al apoyar"),
+        ("Rex", "2024-06-01T10:00:00", f"Otitis externa {tag}", "Gotas óticas", None),
+        ("Mimi", "2024-05-01T10:00:00", f"Fracturas costales {tag}", None, "Dolor leve, agudo no"),
+    ]
+    ids = []
+    for pet, ts, diagnosis, treatment, observations in notes:
+        r = client.post(f"/mascotas/{pets[pet]}/historial", json={
+            "date": ts, "diagnosis": diagnosis, "treatment": treatment, "observations": observations,
+        }, headers=headers)
+        ids.append(r.json()["id"])
+
+    def search(q, **params):
+        r = client.get("/mascotas/historial/buscar", params={"q": f"{tag} {q}", **params}, headers=headers)
+        assert r.status_code == 200, r.text
+        return sorted(h["id"] for h in r.json())
+
+    assert search("fractur*") == [ids[0], ids[2]]
+    assert search("fractura") == [ids[0]]
+    assert search('"dolor agudo"') == [ids[0]]
+    assert search("oticas") == [ids[1]]  # sin acento encuentra "óticas"
+    assert search("fractur*", species="gato") == [ids[2]]
+    assert search("fractur*", fecha_inicio="2024-04-01", fecha_fin="2024-05-01") == [ids[2]]
+    r = client.get("/mascotas/historial/buscar", params={"q": tag}, headers=headers)
+    assert {h["pet_name"] for h in r.json()} == {"Rex", "Mimi"}
+
+
+def test_historial_search_ranks_every_match():
+    # la nota más relevante (el término en el diagnóstico) es la más antigua de más de 1000
+    headers = {"Authorization": f"Bearer {login_admin()}"}
+    owner_id = _new_owner()
+    pet_id = client.post("/mascotas/", json={"name": "Vieja", "species": "perro", "owner_id": owner_id},
+                         headers=headers).json()["id"]
+    tag = "zh" + uuid.uuid4().hex[:8]
+    start = datetime(2020, 1, 1)
+    db = SessionLocal()
+    try:
+        best = MedicalHistory(client_id=owner_id, pet_id=pet_id, timestamp=start, diagnosis=f"Otitis {tag}")
+        db.add(best)
+        db.flush()
+        db.execute(insert(MedicalHistory), [
+            {"client_id": owner_id, "pet_id": pet_id, "timestamp": start + timedelta(days=i + 1),
+             "diagnosis": "Revisión", "observations": f"Control rutinario sin hallazgos, ver {tag}"}
+            for i in range(1001)
+        ])
+        db.commit()
+        best_id = best.id
+    finally:
+        db.close()
+    r = client.get("/mascotas/historial/buscar", params={"q": tag, "limit": 1}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert [h["id"] for h in r.json()] == [best_id]
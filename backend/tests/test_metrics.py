@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import metrics
+
+client = TestClient(app)
+
+
+def login_admin():
+    r = client.post("/auth/token", data={
+        "username": "admin@example.com",
+        "password": "adminpass"
+    })
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_metrics_exposition():
+    headers = login_admin()
+    assert client.get("/citas/", headers=headers).status_code == 200
+    assert client.get("/citas/999999", headers=headers).status_code == 404
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    body = r.text
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_requests_total{method="GET",router="citas",route="/citas/",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",router="citas",route="/citas/{cita_id}",le="+Inf"}' in body
+    assert 'http_request_errors_total{status="404"}' in body
+    assert "http_requests_in_progress" in body
+
+
+def test_pool_checkout_wait_histogram(tmp_path):
+    from sqlalchemy import text
+    from app.database import build_engine
+
+    engine = build_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    metrics.instrument_pool(engine, "test")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+    assert 'db_pool_checkout_wait_seconds_count{engine="test"} 1' in metrics.render()
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, tuple_
+
+from app.migrations import MIGRATIONS, applied_versions, run_migrations
+from app.models.appointment import Appointment
+from app.models.client import Client
+from app.models.history import MedicalHistory
+from app.models.invoice import Invoice
+from app.models.payment import Payment
+from app.models.pet import Pet
+from app.reminders import due_statement
+from app.utils.availability import schedule_statement
+
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'migraciones.db'}")
+    run_migrations(eng)
+    yield eng
+    eng.dispose()
+
+
+def _query_plan(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[k] for k in compiled.positiontup)
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def test_migrations_are_versioned_and_idempotent(engine):
+    assert applied_versions(engine) == [m.version for m in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+
+# Consultas de los routers que deben resolverse con índice
+HOT_QUERIES = {
+    "ix_appointments_veterinarian_id_date": schedule_statement(1, datetime(2030, 1, 1, 10), datetime(2030, 1, 2)),
+    "ix_invoices_date": select(Invoice).where(
+        Invoice.date >= date(2030, 1, 1), Invoice.date <= date(2030, 1, 31)
+    ).order_by(Invoice.date),
+    "ix_payments_invoice_id": select(func.coalesce(func.sum(Payment.amount), 0.0)).where(Payment.invoice_id == 1),
+    "ix_pets_owner_id": select(Pet).where(Pet.owner_id == 1),
+    "ix_medical_history_pet_id_timestamp_id": select(MedicalHistory).where(
+        MedicalHistory.pet_id == 1,
+        tuple_(MedicalHistory.timestamp, MedicalHistory.id) < (datetime(2030, 1, 1), 100),
+    ).order_by(MedicalHistory.timestamp.desc(), MedicalHistory.id.desc()).limit(51),
+    "ix_medical_history_client_id_timestamp": select(MedicalHistory).where(
+        MedicalHistory.client_id == 1
+    ).order_by(MedicalHistory.timestamp.desc()).limit(10),
+    "ix_appointments_client_id_date": select(Appointment).where(
+        Appointment.client_id == 1, Appointment.date >= datetime(2030, 1, 1)
+    ).order_by(Appointment.date).limit(10),
+    "ix_appointments_series_id": select(Appointment).where(
+        Appointment.series_id == 1, Appointment.completed.isnot(True), Appointment.date >= datetime(2030, 1, 1)
+    ).order_by(Appointment.date),
+    "ix_appointments_reminder_due": due_statement(datetime(2030, 1, 1), datetime(2030, 1, 2), (datetime(2030, 1, 1), 1)),
+    "ix_invoices_client_id": select(Invoice).where(Invoice.client_id == 1, Invoice.paid.isnot(True)),
+    "ix_pets_species": select(Pet).where(Pet.species == "gato", Pet.id > 100).order_by(Pet.id).limit(101),
+    "ix_pets_breed": select(Pet).where(Pet.breed == "siamés", Pet.id > 100).order_by(Pet.id).limit(101),
+    "ix_pets_age": select(Pet).where(Pet.age >= 2, Pet.age <= 4),
+    "ix_clients_name": select(Client).where(Client.name >= "Ana", Client.name < "Anb").order_by(Client.id).limit(101),
+    "ix_clients_email": select(Client).where(Client.email == "ana@example.com").order_by(Client.id).limit(101),
+    "ix_clients_subscription_id": select(Client).where(Client.subscription_id == 1).order_by(Client.id).limit(101),
+}
+
+
+@pytest.mark.parametrize("index_name", sorted(HOT_QUERIES))
+def test_hot_queries_use_index(engine, index_name):
+    with engine.connect() as conn:
+        plan = _query_plan(conn, HOT_QUERIES[index_name])
+    assert index_name in plan, plan
+    assert "USING" in plan and "INDEX" in plan, plan
+
+
+def test_indexes_exist(engine):
+    insp = inspect(engine)
+    names = {ix["name"] for table in insp.get_table_names() for ix in insp.get_indexes(table)}
+    assert set(HOT_QUERIES) <= names
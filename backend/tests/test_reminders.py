@@ -0,0 +1,84 @@
+import json
+import uuid
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models.appointment import Appointment
+from app.models.client import Client
+from app.models.pet import Pet
+from app.reminders import FileSink, QueueSink, run_once
+
+
+def _owner_with_appointments(*starts, completed=False):
+    db = SessionLocal()
+    try:
+        owner = Client(dni="Rec" + uuid.uuid4().hex[:10], name="Dueño Recordatorio", email="dueno@example.com")
+        db.add(owner)
+        db.flush()
+        pet = Pet(name="Toby", species="perro", owner_id=owner.id)
+        db.add(pet)
+        db.flush()
+        ids = []
+        for start in starts:
+            a = Appointment(date=start, reason="Vacuna", pet_id=pet.id, client_id=owner.id, completed=completed)
+            db.add(a)
+            db.flush()
+            ids.append(a.id)
+        db.commit()
+        return owner.id, ids
+    finally:
+        db.close()
+
+
+class FailingSink:
+    def deliver(self, reminder):
+        raise ConnectionError("smtp down")
+
+
+def test_reminders_are_batched_per_owner_and_sent_once(tmp_path):
+    now = datetime.utcnow().replace(microsecond=0) + timedelta(days=3650)
+    owner, (first, second, _later) = _owner_with_appointments(
+        now + timedelta(hours=2), now + timedelta(hours=20), now + timedelta(hours=30))
+    other, (other_id,) = _owner_with_appointments(now + timedelta(hours=5))
+    _owner_with_appointments(now + timedelta(hours=6), completed=True)
+
+    # la entrega falla: las citas se desmarcan y la siguiente pasada las vuelve a intentar
+    assert run_once(SessionLocal, FailingSink(), now=now, scan_batch=2).reminders == 0
+
+    sink = FileSink(str(tmp_path / "reminders.ndjson"))
+    result = run_once(SessionLocal, sink, now=now, scan_batch=2)  # varias consultas de 2 filas
+    messages = {m["client_id"]: m for m in map(json.loads, open(sink.path, encoding="utf-8"))}
+    assert [a["appointment_id"] for a in messages[owner]["appointments"]] == [first, second]
+    assert [a["appointment_id"] for a in messages[other]["appointments"]] == [other_id]
+    assert messages[owner]["appointments"][0]["pet"] == "Toby" and result.scanned >= 3
+
+    # una pasada posterior (o tras reiniciar) no ve nada ya enviado
+    again = QueueSink()
+    assert run_once(SessionLocal, again, now=now).scanned == 0 and again.queue.empty()
+    # la cita de dentro de 30 horas entra en la ventana después
+    run_once(SessionLocal, again, now=now + timedelta(hours=12))
+    later = again.queue.get_nowait()
+    assert later.client_id == owner and len(later.appointments) == 1 and again.queue.empty()
+
+
+def test_rescheduled_appointment_is_reminded_again():
+    now = datetime.utcnow().replace(microsecond=0) + timedelta(days=3660)
+    owner, (cita,) = _owner_with_appointments(now + timedelta(hours=2))
+    assert run_once(SessionLocal, QueueSink(), now=now).appointments == 1
+
+    db = SessionLocal()
+    try:
+        a = db.get(Appointment, cita)
+        a.reason = "Vacuna anual"  # otros cambios no quitan la marca
+        db.commit()
+        assert a.reminder_sent_at is not None
+        a.date = now + timedelta(hours=5)
+        db.commit()
+        assert a.reminder_sent_at is None
+    finally:
+        db.close()
+
+    sink = QueueSink()
+    run_once(SessionLocal, sink, now=now)
+    reminder = sink.queue.get_nowait()
+    assert reminder.client_id == owner and reminder.appointments[0].date == now + timedelta(hours=5)
@@ -0,0 +1,47 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import sqlstats
+
+client = TestClient(app)
+
+
+def login_admin():
+    r = client.post("/auth/token", data={
+        "username": "admin@example.com",
+        "password": "adminpass"
+    })
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_server_timing_header():
+    headers = login_admin()
+    r = client.get("/citas/", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["Server-Timing"].startswith("db;dur=")
+
+
+# máximo de sentencias por endpoint (incluye la carga del usuario si la caché está fría)
+QUERY_BUDGET = {
+    "/citas/": 2,
+    "/mascotas/": 2,
+    "/clientes/": 2,
+    "/facturacion/": 3,  # facturas + selectinload de pagos
+    "/auth/me": 1,
+}
+
+
+def test_query_budget_per_endpoint():
+    headers = login_admin()
+    for path, budget in QUERY_BUDGET.items():
+        with sqlstats.capture() as requests:
+            assert client.get(path, headers=headers).status_code == 200
+        assert requests[-1].statements <= budget, (path, requests[-1].shapes)
+
+
+def test_repeated_statement_shapes_detected():
+    stats = sqlstats.RequestStats("GET", "/x")
+    for pet_id in range(6):
+        stats.record(f"SELECT * FROM payments WHERE invoice_id = {pet_id}", 0.001)
+    stats.record("SELECT * FROM invoices WHERE id IN (?, ?, ?)", 0.001)
+    assert stats.repeated_shapes(5) == [("SELECT * FROM payments WHERE invoice_id = ?", 6)]
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models.appointment import Appointment
+from app.models.user import Role, User
+from app.utils.security import hash_password
+
+client = TestClient(app)
+
+
+def login_admin():
+    r = client.post("/auth/token", data={
+        "username": "admin@example.com",
+        "password": "adminpass"
+    })
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def _user(role_name):
+    db = SessionLocal()
+    try:
+        role = db.query(Role).filter(Role.name == role_name).one()
+        tag = uuid.uuid4().hex[:8]
+        user = User(email=f"{tag}@vets.example.com", hashed_password=hash_password("x"),
+                    full_name=f"Dr. Usuario {tag}", role_id=role.id)
+        db.add(user)
+        db.commit()
+        return user.id, user.full_name
+    finally:
+        db.close()
+
+
+def test_create_and_update_veterinarian():
+    headers = login_admin()
+    user_id, full_name = _user("veterinarian")
+    r = client.post("/veterinarios/", headers=headers, json={"user_id": user_id, "work_days": [5, 1, 3]})
+    assert r.status_code == 201, r.text
+    vet = r.json()
+    assert vet["name"] == full_name and vet["work_days"] == [1, 3, 5] and vet["work_start"] == "09:00:00"
+    assert client.post("/veterinarios/", headers=headers, json={"user_id": user_id}).status_code == 409
+
+    recep_id, _ = _user("receptionist")
+    assert client.post("/veterinarios/", headers=headers, json={"user_id": recep_id}).status_code == 400
+    bad_hours = {"user_id": user_id, "work_start": "18:00", "work_end": "09:00"}
+    assert client.post("/veterinarios/", headers=headers, json=bad_hours).status_code == 422
+
+    # renombrar actualiza la copia del nombre en sus citas
+    db = SessionLocal()
+    try:
+        cita = Appointment(date=datetime.utcnow() + timedelta(days=3), veterinarian_id=vet["id"], veterinarian=full_name)
+        db.add(cita)
+        db.commit()
+        cita_id = cita.id
+    finally:
+        db.close()
+    new_name = full_name + " (Cirugía)"
+    r = client.patch(f"/veterinarios/{vet['id']}", headers=headers, json={"name": new_name, "work_end": "15:30"})
+    assert r.status_code == 200 and r.json()["work_end"] == "15:30:00"
+    assert client.get(f"/citas/{cita_id}", headers=headers).json()["veterinarian"] == new_name
+    assert new_name in [v["name"] for v in client.get("/veterinarios/", headers=headers).json()]
@@ -12,6 +12,7 @@ API_BASE = st.secrets.get("API_BASE", "http://127.0.0.1:8000").rstrip("/")
 ROUTE_CLIENTES = "/clientes/"
 ROUTE_MASCOTAS = "/mascotas/"
 ROUTE_CITAS = "/citas/"
+ROUTE_VETERINARIOS = "/veterinarios/"
 ROUTE_FACTURAS = "/facturas/"
 ROUTE_TOKEN = "/auth/token"
 ROUTE_INFORMES_INGRESOS = "/informes/ingresos"
@@ -40,6 +41,25 @@ def api_get(path, params=None):
         st.session_state["last_api_error"] = str(e)
         return None
 
+def api_get_all(path, params=None, page_size=1000):
+    """Listados paginados: sigue la cabecera X-Next-Cursor hasta la última página."""
+    rows, params = [], {**(params or {}), "limit": page_size}
+    while True:
+        try:
+            r = requests.get(API_BASE + path, headers=headers_with_token(), params=params, timeout=6)
+            r.raise_for_status()
+        except requests.HTTPError as e:
+            st.session_state["last_api_error"] = f"{r.status_code}: {r.text}"
+            return None
+        except Exception as e:
+            st.session_state["last_api_error"] = str(e)
+            return None
+        rows.extend(r.json())
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows
+        params["cursor"] = cursor
+
 def api_post(path, payload):
     try:
         r = requests.post(API_BASE + path, headers={**headers_with_token(), "Content-Type":"application/json"}, json=payload, timeout=6)
@@ -133,7 +153,11 @@ def page_pacientes():
 
     # CLIENTES
     st.subheader("Listado de clientes")
-    clientes_data = api_get(ROUTE_CLIENTES)
+    busqueda = st.text_input("Buscar cliente (nombre, DNI, email, teléfono o dirección)", key="buscar_cliente")
+    if busqueda.strip():
+        clientes_data = api_get(f"{ROUTE_CLIENTES}search", params={"q": busqueda, "limit": 50})
+    else:
+        clientes_data = api_get_all(ROUTE_CLIENTES)
     if clientes_data is None:
         st.error(f"Error listando clientes: {st.session_state.get('last_api_error')}")
     else:
@@ -144,6 +168,24 @@ def page_pacientes():
         else:
             st.info("No hay clientes registrados.")
 
+    # Ficha de cliente: una sola llamada a /clientes/{id}/overview
+    if clientes_data:
+        opciones = {f"{c.get('name')} ({c.get('dni')})": c.get("id") for c in clientes_data}
+        elegido = st.selectbox("Ver ficha de cliente", ["—"] + list(opciones), key="ficha_cliente")
+        if elegido != "—":
+            ficha = api_get(f"{ROUTE_CLIENTES}{opciones[elegido]}/overview")
+            if ficha is None:
+                st.error(f"Error cargando la ficha: {st.session_state.get('last_api_error')}")
+            else:
+                st.write(f"**{ficha['name']}** — {ficha.get('email') or ''} — {ficha.get('phone') or ''}")
+                for titulo, clave in (("Mascotas", "pets"), ("Próximas citas", "upcoming_appointments"),
+                                      ("Facturas pendientes", "open_invoices"), ("Historial reciente", "recent_history")):
+                    st.caption(titulo)
+                    if ficha[clave]:
+                        st.dataframe(pd.DataFrame(ficha[clave]).drop(columns=["payments"], errors="ignore"))
+                    else:
+                        st.write("—")
+
     st.markdown("---")
     # Crear cliente (phone requested)
     st.subheader("Crear nuevo cliente")
@@ -189,14 +231,14 @@ def page_pacientes():
     # MASCOTAS (side-by-side)
     st.markdown("---")
     st.subheader("Mascotas (CRUD)")
-    mascotas_data = api_get(ROUTE_MASCOTAS)
+    mascotas_data = api_get_all(ROUTE_MASCOTAS, params={"include": "owner"})
     if mascotas_data is None:
         st.error(f"Error listando mascotas: {st.session_state.get('last_api_error')}")
     else:
         dfm = pd.DataFrame(mascotas_data)
         if not dfm.empty:
-            cols_show = [c for c in ("name","species","breed","age","owner_id","id") if c in dfm.columns]
-            st.dataframe(dfm[cols_show].rename(columns={"name":"Nombre","species":"Especie","breed":"Raza","age":"Edad","owner_id":"Owner ID","id":"ID"}))
+            cols_show = [c for c in ("name","species","breed","age","owner_name","owner_id","id") if c in dfm.columns]
+            st.dataframe(dfm[cols_show].rename(columns={"name":"Nombre","species":"Especie","breed":"Raza","age":"Edad","owner_name":"Dueño","owner_id":"Owner ID","id":"ID"}))
         else:
             st.info("No hay mascotas.")
 
@@ -210,7 +252,7 @@ def page_pacientes():
         edad = st.number_input("Edad", min_value=0, value=0, key="edad")
         submitted_pet = st.form_submit_button("Crear mascota")
         if submitted_pet:
-            payload = {"client_id": owner_id, "name": pet_name, "species": especie, "breed": raza, "age": edad}
+            payload = {"owner_id": owner_id, "name": pet_name, "species": especie, "breed": raza, "age": edad}
             res = api_post(ROUTE_MASCOTAS, payload)
             if res is None:
                 st.error(f"No creado: {st.session_state.get('last_api_error')}")
@@ -244,15 +286,16 @@ def page_pacientes():
 def page_citas():
     st.title("Citas")
     st.subheader("Crear cita")
+    veterinarios = {v["name"]: v["id"] for v in (api_get(ROUTE_VETERINARIOS) or []) if v.get("active")}
     with st.form("form_crear_cita"):
         fecha_hora = st.text_input("Fecha y hora (YYYY/MM/DD HH:MM)", value=datetime.now().strftime("%Y/%m/%d %H:%M"), key="c_fecha")
         motivo = st.text_input("Motivo", key="c_motivo")
-        veterinario = st.text_input("Veterinario", value="Dr. Ana", key="c_vet")
+        veterinario = st.selectbox("Veterinario", list(veterinarios), key="c_vet")
         pet_id = st.number_input("pet_id", min_value=1, value=1, key="c_pet")
         client_id = st.number_input("client_id", min_value=1, value=1, key="c_client")
         created = st.form_submit_button("Crear cita")
         if created:
-            payload = {"date": fecha_hora, "reason": motivo, "veterinarian": veterinario, "pet_id": int(pet_id), "client_id": int(client_id)}
+            payload = {"date": fecha_hora, "reason": motivo, "veterinarian_id": veterinarios.get(veterinario), "pet_id": int(pet_id), "client_id": int(client_id)}
             res = api_post(ROUTE_CITAS, payload)
             if res is None:
                 st.error(f"Error creando cita: {st.session_state.get('last_api_error')}")